@@ -0,0 +1,58 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+
+def users_by_email(email):
+    """
+    Users whose email matches, ignoring case.
+
+    Filters on LOWER(email) = %s so the lower(email) index from the
+    accounts migrations serves it (``email__iexact`` compiles to UPPER()
+    on PostgreSQL and would not).
+    """
+    User = get_user_model()
+    return User._default_manager.alias(email_lower=Lower("email")).filter(
+        # Same predicate as the partial index, or it can't be used
+        email__gt="",
+        email_lower=(email or "").strip().lower(),
+    )
+
+
+# ===============================
+# EMAIL LOGIN
+# ===============================
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with ``email=`` and a password in a single indexed query.
+
+    Username logins (the admin) fall through to ModelBackend.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+
+        # [:2] rather than first(): no ORDER BY id to tempt the planner
+        # away from the email index. A second row means accounts that differ
+        # only in case (MySQL/Oracle can't enforce uniqueness); refuse rather
+        # than guess which one is meant.
+        matches = list(users_by_email(email)[:2])
+        if len(matches) != 1:
+            if matches:
+                logger.warning(
+                    "Email login refused: users %s share an email ignoring case",
+                    sorted(user.pk for user in matches),
+                )
+            # Hash anyway so a missing account takes as long as a wrong password
+            get_user_model()().set_password(password)
+            return None
+
+        user = matches[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
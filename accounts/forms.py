@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 import re
 
+from .backends import users_by_email
+
 class SignupForm(forms.ModelForm):
     email = forms.EmailField(
         required=True,
@@ -53,7 +55,7 @@ class SignupForm(forms.ModelForm):
     # email uniqueness validation moved here (so form shows error)
     def clean_email(self):
         email = self.cleaned_data.get("email")
-        if User.objects.filter(email=email).exists():
+        if users_by_email(email).exists():
             raise ValidationError("Email already exists")
         return email
 
@@ -0,0 +1,125 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.backends import EmailBackend, users_by_email
+
+BENCH_PREFIX = "bench-login-"
+BENCH_PASSWORD = "Bench-pass-1!"
+
+
+def bench_email(n):
+    # Mixed case on purpose: lookups must be case-insensitive
+    return f"{BENCH_PREFIX}{n}@Example.COM"
+
+
+class Command(BaseCommand):
+    help = "Time email login lookups as auth_user grows, to show they stay flat."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000,100000,1000000",
+            help="Comma-separated user counts to measure at (default: 1k,10k,100k,1M).",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=500,
+            help="Logins timed at each size (default: 500).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Users inserted per bulk_create (default: 5000).",
+        )
+        parser.add_argument(
+            "--full-login",
+            action="store_true",
+            help="Time EmailBackend.authenticate(), password hashing included.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Leave the generated users in place.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run even with DEBUG off (it writes up to a million users).",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Refusing to fill auth_user with DEBUG off; pass --force.")
+
+        try:
+            sizes = sorted(int(size) for size in options["sizes"].split(","))
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+
+        User = get_user_model()
+        self.password_hash = make_password(BENCH_PASSWORD)
+        plan = users_by_email(bench_email(0))[:1].explain()
+        self.stdout.write(f"Query plan: {plan}")
+        self.stdout.write(f"{'users':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+
+        created = 0
+        try:
+            for size in sizes:
+                created = self.grow(User, created, size, options["batch_size"])
+                timings = self.measure(size, options["lookups"], options["full_login"])
+                q = statistics.quantiles(timings, n=100)
+                self.stdout.write(
+                    f"{size:>10} {q[49]:>9.3f} {q[94]:>9.3f} {q[98]:>9.3f} {max(timings):>9.3f}"
+                )
+        finally:
+            if not options["keep"]:
+                self.cleanup(User)
+
+    def grow(self, User, created, size, batch_size):
+        while created < size:
+            upto = min(size, created + batch_size)
+            User.objects.bulk_create(
+                User(
+                    username=f"{BENCH_PREFIX}{n}",
+                    email=bench_email(n),
+                    password=self.password_hash,
+                )
+                for n in range(created, upto)
+            )
+            created = upto
+        return created
+
+    def measure(self, size, lookups, full_login):
+        backend = EmailBackend()
+        timings = []
+        for _ in range(max(lookups, 2)):
+            email = bench_email(random.randrange(size)).lower()
+            started = time.perf_counter()
+            if full_login:
+                user = backend.authenticate(None, email=email, password=BENCH_PASSWORD)
+            else:
+                user = list(users_by_email(email)[:1])
+            timings.append((time.perf_counter() - started) * 1000)
+            if not user:
+                raise CommandError(f"Lookup for {email} found nobody")
+        return timings
+
+    def cleanup(self, User):
+        # One statement: bench users have no related rows, and a
+        # Collector-based delete of a million users would take longer
+        # than the benchmark itself.
+        table = connection.ops.quote_name(User._meta.db_table)
+        username = connection.ops.quote_name("username")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE {username} LIKE %s", [BENCH_PREFIX + "%"])
+            removed = cursor.rowcount
+        self.stdout.write(f"Removed {removed} benchmark users")
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+INDEX_NAME = "auth_user_email_lower_uniq"
+
+
+def _case_duplicates(cursor, limit=10):
+    cursor.execute(
+        "SELECT LOWER(email) FROM auth_user WHERE email > '' "
+        "GROUP BY LOWER(email) HAVING COUNT(*) > 1 ORDER BY 1"
+    )
+    return [row[0] for row in cursor.fetchmany(limit)]
+
+
+def create_email_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        duplicates = _case_duplicates(cursor)
+    if duplicates:
+        raise RuntimeError(
+            "auth_user has emails that differ only in case, which email login "
+            "can't tell apart. Merge or change these accounts and migrate "
+            "again: " + ", ".join(duplicates)
+        )
+
+    if vendor in ("postgresql", "sqlite"):
+        # Partial, so users without an email (createsuperuser) don't collide.
+        # users_by_email() repeats the email > '' term so planners can use it.
+        schema_editor.execute(
+            f"CREATE UNIQUE INDEX {INDEX_NAME} ON auth_user (LOWER(email)) WHERE email > ''"
+        )
+    elif vendor == "mysql":
+        # MySQL 8.0.13+ functional key parts; no partial indexes, so not unique
+        schema_editor.execute(f"CREATE INDEX {INDEX_NAME} ON auth_user ((LOWER(email)))")
+    elif vendor == "oracle":
+        schema_editor.execute(f"CREATE INDEX {INDEX_NAME} ON auth_user (LOWER(email))")
+
+
+def drop_email_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        schema_editor.execute(f"DROP INDEX {INDEX_NAME} ON auth_user")
+    elif vendor in ("postgresql", "sqlite", "oracle"):
+        schema_editor.execute(f"DROP INDEX {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
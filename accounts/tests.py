@@ -1,3 +1,100 @@
+from importlib import import_module
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from .backends import EmailBackend, users_by_email
+from .forms import SignupForm
+
+PASSWORD = "Str0ng-pass!"
+email_index_migration = import_module("accounts.migrations.0001_user_email_lower_index")
+
+
+class EmailBackendTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada@example.com", "Ada@Example.com", PASSWORD)
+
+    def test_login_ignores_email_case_in_one_query(self):
+        with self.assertNumQueries(1):
+            user = EmailBackend().authenticate(None, email="ADA@example.COM", password=PASSWORD)
+        self.assertEqual(user, self.user)
+
+    def test_wrong_password_and_unknown_email_fail(self):
+        backend = EmailBackend()
+        self.assertIsNone(backend.authenticate(None, email="ada@example.com", password="nope"))
+        self.assertIsNone(backend.authenticate(None, email="bob@example.com", password=PASSWORD))
+
+    def test_inactive_user_cannot_log_in(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(email="ada@example.com", password=PASSWORD))
+
+    def test_username_login_still_works(self):
+        # The admin logs in by username through ModelBackend
+        self.assertEqual(authenticate(username="ada@example.com", password=PASSWORD), self.user)
+
+    def test_lookup_uses_lower_email_index(self):
+        indexes = connection.introspection.get_constraints(connection.cursor(), "auth_user")
+        self.assertIn("auth_user_email_lower_uniq", indexes)
+        if connection.vendor == "sqlite":
+            plan = users_by_email("ada@example.com")[:1].explain()
+            self.assertIn("auth_user_email_lower_uniq", plan)
+
+    def drop_email_index(self):
+        # Rolled back with the test; stands in for a database whose index
+        # can't be unique (MySQL/Oracle)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {email_index_migration.INDEX_NAME}")
+        User.objects.create_user("ada2", "ADA@example.com", PASSWORD)
+
+    def test_ambiguous_email_is_refused(self):
+        self.drop_email_index()
+        with self.assertLogs("accounts.backends", "WARNING"):
+            user = EmailBackend().authenticate(None, email="ada@example.com", password=PASSWORD)
+        self.assertIsNone(user)
+
+    def test_migration_stops_on_case_duplicates(self):
+        self.drop_email_index()
+        with self.assertRaisesMessage(RuntimeError, "ada@example.com"):
+            email_index_migration.create_email_index(None, mock.Mock(connection=connection))
+
+    def test_login_view(self):
+        response = self.client.post(
+            reverse("login"), {"username": "ADA@example.com", "password": PASSWORD}
+        )
+        self.assertEqual(response.json(), {"success": True, "redirect": "/dashboard/"})
+
+        response = self.client.post(reverse("login"), {"username": "ada@example.com", "password": "x"})
+        self.assertFalse(response.json()["success"])
+
+
+class SignupEmailTests(TestCase):
+
+    def form(self, email):
+        return SignupForm({
+            "username": "someone",
+            "email": email,
+            "password1": PASSWORD,
+            "password2": PASSWORD,
+        })
+
+    def test_taken_email_is_rejected_whatever_the_case(self):
+        User.objects.create_user("ada@example.com", "ada@example.com", PASSWORD)
+        form = self.form("ADA@Example.com")
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["email"], ["Email already exists"])
 
-# Create your tests here.
+    def test_register_checks_email_once(self):
+        response = self.client.post(reverse("register"), {
+            "username": "someone",
+            "email": "new@example.com",
+            "password1": PASSWORD,
+            "password2": PASSWORD,
+        })
+        self.assertTrue(response.json()["success"])
+        self.assertTrue(User.objects.filter(email="new@example.com").exists())
@@ -1,6 +1,5 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.models import User
 from django.http import JsonResponse
 from .forms import SignupForm
 
@@ -28,19 +27,8 @@ def login_view(request):
             {"success": False, "error": "Email and password are required"}
         )
 
-    try:
-        user_obj = User.objects.get(email=email)
-    except User.DoesNotExist:
-        return JsonResponse(
-            {"success": False, "error": "Invalid email or password"}
-        )
-
-    # 🔑 Authenticate using username (which we set = email)
-    user = authenticate(
-        request,
-        username=user_obj.username,
-        password=password
-    )
+    # One indexed lookup by lower(email), see accounts.backends
+    user = authenticate(request, email=email, password=password)
 
     if user is None:
         return JsonResponse(
@@ -67,13 +55,8 @@ def register_view(request):
     form = SignupForm(request.POST)
 
     if form.is_valid():
+        # clean_email already rejected taken addresses
         email = form.cleaned_data["email"]
-
-        if User.objects.filter(email=email).exists():
-            return JsonResponse(
-                {"success": False, "error": "Email already exists"}
-            )
-
         user = form.save(commit=False)
 
         # 🔥 MOST IMPORTANT FIX
@@ -81,7 +64,7 @@ def register_view(request):
         user.set_password(form.cleaned_data["password1"])
         user.save()
 
-        login(request, user)
+        login(request, user, backend="accounts.backends.EmailBackend")
 
         return JsonResponse(
             {"success": True, "redirect": "/dashboard/"}
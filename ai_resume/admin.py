@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import CompletionCache
 
-# Register your models here.
+
+@admin.register(CompletionCache)
+class CompletionCacheAdmin(admin.ModelAdmin):
+    list_display = ("field", "model", "hits", "size", "last_used_at", "expires_at")
+    list_filter = ("field", "model")
+    readonly_fields = ("key", "created_at")
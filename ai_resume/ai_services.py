@@ -1,22 +1,7 @@
-import requests
-import os
+from .providers import get_provider
 
-HF_API_TOKEN = os.getenv("HF_API_TOKEN")
 
 def improve_text(text):
-    url = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
-    headers = {
-        "Authorization": f"Bearer {HF_API_TOKEN}"
-    }
-
-    payload = {
-        "inputs": f"Improve this resume text professionally:\n{text}"
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-
-    if response.status_code != 200:
-        raise Exception("AI service failed")
-
-    data = response.json()
-    return data[0]["summary_text"]
+    return get_provider("huggingface").complete(
+        "Improve this resume text professionally:", text
+    )
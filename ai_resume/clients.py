@@ -0,0 +1,329 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import groq
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class UpstreamError(Exception):
+    """Non-2xx answer from an AI provider."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider that keeps failing."""
+
+
+# ===============================
+# CIRCUIT BREAKER
+# ===============================
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is down.
+
+    After ``threshold`` consecutive failures the circuit opens and calls
+    are rejected for ``reset_after`` seconds. The first call after that is
+    let through as a probe: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, name, threshold, reset_after):
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._probing):
+                raise CircuitOpenError(f"{self.name} is unavailable, try again shortly")
+            if state == "half-open":
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                threshold=settings.AI_BREAKER_THRESHOLD,
+                reset_after=settings.AI_BREAKER_RESET,
+            )
+        return _breakers[name]
+
+
+# ===============================
+# RETRIES
+# ===============================
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+def status_of(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_retryable(exc):
+    if isinstance(exc, CircuitOpenError):
+        return False
+
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+
+    # No HTTP status: connection refused/reset or a timeout
+    return isinstance(exc, (
+        groq.APIConnectionError,
+        httpx.TransportError,
+        requests.ConnectionError,
+        requests.Timeout,
+    ))
+
+
+def backoff_delay(attempt, exc=None):
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = headers.get("retry-after")
+
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), settings.AI_BACKOFF_MAX)
+    except (TypeError, ValueError):
+        pass
+
+    # Full jitter: spreads retries from many workers over the window
+    ceiling = min(settings.AI_BACKOFF_MAX, settings.AI_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def retry_budget():
+    """Longest a call with every retry and backoff can legitimately take."""
+    attempts = settings.AI_MAX_RETRIES + 1
+    per_attempt = settings.AI_CONNECT_TIMEOUT + settings.AI_READ_TIMEOUT
+    return attempts * per_attempt + settings.AI_MAX_RETRIES * settings.AI_BACKOFF_MAX
+
+
+def call_with_retries(name, fn):
+    breaker = get_breaker(name)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = fn()
+        except Exception as exc:
+            if not is_retryable(exc):
+                # Not an outage (bad request, missing key...): don't trip
+                # the breaker, and release a half-open probe.
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= settings.AI_MAX_RETRIES:
+                raise
+            time.sleep(backoff_delay(attempt, exc))
+            attempt += 1
+        else:
+            breaker.record_success()
+            return result
+
+
+async def acall_with_retries(name, fn):
+    breaker = get_breaker(name)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = await fn()
+        except Exception as exc:
+            if not is_retryable(exc):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= settings.AI_MAX_RETRIES:
+                raise
+            await asyncio.sleep(backoff_delay(attempt, exc))
+            attempt += 1
+        else:
+            breaker.record_success()
+            return result
+
+
+# ===============================
+# POOLED CLIENTS
+# ===============================
+def http_timeout():
+    return httpx.Timeout(settings.AI_READ_TIMEOUT, connect=settings.AI_CONNECT_TIMEOUT)
+
+
+def http_limits():
+    return httpx.Limits(
+        max_connections=settings.AI_POOL_SIZE,
+        max_keepalive_connections=settings.AI_POOL_SIZE,
+    )
+
+
+_local = {"pid": None}
+_local_lock = threading.Lock()
+
+
+def _process_cached(name, factory):
+    # One client per process: connection pools must not be shared
+    # across a gunicorn fork.
+    with _local_lock:
+        if _local["pid"] != os.getpid():
+            _local.clear()
+            _local["pid"] = os.getpid()
+        if name not in _local:
+            _local[name] = factory()
+        return _local[name]
+
+
+def _groq_api_key():
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY is not configured")
+    return api_key
+
+
+def get_groq_client():
+    api_key = _groq_api_key()
+    return _process_cached("groq", lambda: groq.Groq(
+        api_key=api_key,
+        base_url=settings.GROQ_BASE_URL,
+        timeout=http_timeout(),
+        # Retries are ours, so they share the circuit breaker
+        max_retries=0,
+        http_client=httpx.Client(timeout=http_timeout(), limits=http_limits()),
+    ))
+
+
+# ===============================
+# SHARED EVENT LOOP (ASYNC CLIENTS)
+# ===============================
+# httpx.AsyncClient is bound to the loop it first ran on, and under WSGI
+# async_to_sync builds a new loop for every request. So every async
+# provider call runs on one long-lived loop per process, which owns the
+# pooled clients; callers on any loop await it through a thread-safe
+# future, and cancelling the caller cancels the call.
+_END = object()
+
+
+def _start_pool_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(
+        target=loop.run_forever, name="ai-client-loop", daemon=True
+    )
+    thread.start()
+    return loop
+
+
+def pool_loop():
+    return _process_cached("pool_loop", _start_pool_loop)
+
+
+async def on_pool_loop(coro):
+    loop = pool_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def iterate_on_pool_loop(aiterator):
+    """Re-yield an async iterator that must be advanced on the pool loop."""
+
+    async def step():
+        try:
+            return await aiterator.__anext__()
+        except StopAsyncIteration:
+            return _END
+
+    try:
+        while True:
+            item = await on_pool_loop(step())
+            if item is _END:
+                return
+            yield item
+    finally:
+        aclose = getattr(aiterator, "aclose", None)
+        if aclose is not None:
+            await on_pool_loop(aclose())
+
+
+def get_async_groq_client():
+    # Only use from coroutines running on pool_loop()
+    api_key = _groq_api_key()
+    return _process_cached("async_groq", lambda: groq.AsyncGroq(
+        api_key=api_key,
+        base_url=settings.GROQ_BASE_URL,
+        timeout=http_timeout(),
+        max_retries=0,
+        http_client=httpx.AsyncClient(timeout=http_timeout(), limits=http_limits()),
+    ))
+
+
+def get_http_session():
+    def build():
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.AI_POOL_SIZE,
+            pool_maxsize=settings.AI_POOL_SIZE,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return _process_cached("http_session", build)
+
+
+def request_timeout():
+    # (connect, read) tuple for requests
+    return (settings.AI_CONNECT_TIMEOUT, settings.AI_READ_TIMEOUT)
+
+
+def get_async_http_client():
+    # Only use from coroutines running on pool_loop()
+    return _process_cached("async_http", lambda: httpx.AsyncClient(
+        timeout=http_timeout(), limits=http_limits()
+    ))
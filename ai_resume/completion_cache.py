@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import CompletionCache, CompletionCacheStats
+
+STATS_ID = 1
+
+# Per-process bookkeeping: writes since the last eviction sweep and
+# lookups not yet added to the shared stats row
+_lock = threading.Lock()
+_writes = 0
+_pending = {"hits": 0, "misses": 0}
+_flushed_at = time.monotonic()
+
+
+# ===============================
+# KEYS
+# ===============================
+def normalize_text(text):
+    # Collapse runs of whitespace but keep line breaks: skills and
+    # education are one entry per line and the prompt depends on that.
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def completion_key(field, text, system_prompt, model, temperature, max_tokens):
+    raw = json.dumps(
+        [field, normalize_text(text), system_prompt, model, temperature, max_tokens],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# ===============================
+# READ / WRITE
+# ===============================
+def get_completion(key, count=True):
+    # count=False: internal re-checks that shouldn't skew the hit ratio
+    now = timezone.now()
+    entry = (
+        CompletionCache.objects
+        .filter(key=key, expires_at__gt=now)
+        .only("id", "result")
+        .first()
+    )
+
+    if entry is None:
+        if count:
+            _count("misses")
+        return None
+
+    CompletionCache.objects.filter(id=entry.id).update(
+        hits=F("hits") + 1,
+        last_used_at=now,
+    )
+    if count:
+        _count("hits")
+    return entry.result
+
+
+def store_completion(key, field, model, result):
+    if not result:
+        # An empty answer is a provider hiccup, not something to replay for days
+        return
+
+    now = timezone.now()
+    CompletionCache.objects.update_or_create(
+        key=key,
+        defaults={
+            "field": field,
+            "model": model,
+            "result": result,
+            "size": len(result.encode()),
+            "last_used_at": now,
+            "expires_at": now + timedelta(seconds=settings.AI_CACHE_TTL),
+        },
+    )
+    if _eviction_due():
+        evict()
+
+
+def _eviction_due():
+    # Summing the whole table on every write costs more than the write, so
+    # sweep every AI_CACHE_EVICT_EVERY writes; the budget can be overshot by
+    # that many rows per worker in between.
+    global _writes
+    with _lock:
+        _writes += 1
+        if _writes < settings.AI_CACHE_EVICT_EVERY:
+            return False
+        _writes = 0
+        return True
+
+
+def evict():
+    """Drop expired rows, then least-recently-used rows until under budget."""
+    CompletionCache.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    usage = CompletionCache.objects.aggregate(total=Sum("size"))
+    entries = CompletionCache.objects.count()
+    total_bytes = usage["total"] or 0
+
+    if entries <= settings.AI_CACHE_MAX_ENTRIES and total_bytes <= settings.AI_CACHE_MAX_BYTES:
+        return 0
+
+    evicted = 0
+    oldest = CompletionCache.objects.order_by("last_used_at").values_list("id", "size")
+    doomed = []
+    for entry_id, size in oldest.iterator():
+        if entries <= settings.AI_CACHE_MAX_ENTRIES and total_bytes <= settings.AI_CACHE_MAX_BYTES:
+            break
+        doomed.append(entry_id)
+        entries -= 1
+        total_bytes -= size
+
+    if doomed:
+        evicted, _ = CompletionCache.objects.filter(id__in=doomed).delete()
+    return evicted
+
+
+# Async views reach the ORM through the thread-sensitive executor
+aget_completion = sync_to_async(get_completion)
+astore_completion = sync_to_async(store_completion)
+
+
+# ===============================
+# STATS
+# ===============================
+def cache_stats():
+    flush_stats()
+    usage = CompletionCache.objects.aggregate(total=Sum("size"))
+    counters = CompletionCacheStats.objects.filter(id=STATS_ID).values("hits", "misses").first()
+    hits = counters["hits"] if counters else 0
+    misses = counters["misses"] if counters else 0
+    lookups = hits + misses
+
+    return {
+        "entries": CompletionCache.objects.count(),
+        "bytes": usage["total"] or 0,
+        "max_entries": settings.AI_CACHE_MAX_ENTRIES,
+        "max_bytes": settings.AI_CACHE_MAX_BYTES,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def _count(counter):
+    # Counted in memory and added to the shared row in batches, so a lookup
+    # doesn't serialize every worker on one UPDATE
+    with _lock:
+        _pending[counter] += 1
+        due = (
+            sum(_pending.values()) >= settings.AI_CACHE_STATS_FLUSH_EVERY
+            or time.monotonic() - _flushed_at >= settings.AI_CACHE_STATS_FLUSH_SECONDS
+        )
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Add this process's pending hit/miss counts to the shared stats row."""
+    global _flushed_at
+    with _lock:
+        counts = {name: value for name, value in _pending.items() if value}
+        for name in _pending:
+            _pending[name] = 0
+        _flushed_at = time.monotonic()
+    if not counts:
+        return
+
+    # One row for all workers, so the ratio covers the whole deployment
+    increments = {name: F(name) + value for name, value in counts.items()}
+    updated = CompletionCacheStats.objects.filter(id=STATS_ID).update(**increments)
+    if not updated:
+        CompletionCacheStats.objects.get_or_create(id=STATS_ID)
+        CompletionCacheStats.objects.filter(id=STATS_ID).update(**increments)
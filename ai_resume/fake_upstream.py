@@ -0,0 +1,266 @@
+"""
+A stand-in for the Groq and Hugging Face APIs, for load tests and offline dev.
+
+Speaks enough of both wire formats for ``ai_resume.providers``: OpenAI-style
+``POST .../chat/completions`` (JSON or token-by-token SSE when
+``"stream": true``) and the HF inference ``POST .../models/<name>``. How
+slow and how flaky it is comes from ``Behaviour``. Point the app at it with
+``GROQ_BASE_URL=http://127.0.0.1:<port>`` (any ``GROQ_API_KEY``) or
+``HF_API_URL=http://127.0.0.1:<port>/models/fake``.
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+FILLER = (
+    "Delivered measurable results across cross-functional teams while improving "
+    "reliability, performance and developer experience for production systems"
+).split()
+
+
+class Behaviour:
+    """
+    Latency is time to first byte; ``lognormal`` is right-skewed like real
+    LLM APIs, with ``median`` as its median and ``sigma`` controlling the
+    tail. For ``burst_length`` seconds out of every ``burst_every`` every
+    call gets a 429 with ``Retry-After``.
+    """
+
+    def __init__(self, distribution="lognormal", median=0.4, sigma=0.5,
+                 min_latency=0.0, max_latency=30.0, error_rate=0.0,
+                 burst_every=0.0, burst_length=0.0, retry_after=1.0,
+                 tokens=40, token_delay=0.02, seed=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        if not 0 <= error_rate <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        if burst_length and burst_length >= burst_every:
+            raise ValueError("burst_length must be shorter than burst_every")
+        self.distribution = distribution
+        self.median = median
+        self.sigma = sigma
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.started = time.monotonic()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self):
+        with self._lock:
+            if self.distribution == "fixed":
+                value = self.median
+            elif self.distribution == "uniform":
+                value = self._rng.uniform(self.min_latency, self.max_latency)
+            else:
+                value = self._rng.lognormvariate(math.log(self.median), self.sigma)
+        return min(max(value, self.min_latency), self.max_latency)
+
+    def throttled(self):
+        if not self.burst_length:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_length
+
+    def fails(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def answer(self, text):
+        # Echo the input back as the "improved" version, padded to length
+        words = text.split()[:self.tokens]
+        words += FILLER[:max(0, self.tokens - len(words))]
+        return " ".join(words)
+
+
+class Stats:
+
+    FIELDS = (
+        "requests", "ok", "errors", "throttled", "disconnects", "streams", "in_flight", "max_in_flight",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def begin(self):
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts["in_flight"] += 1
+            self.counts["max_in_flight"] = max(self.counts["max_in_flight"], self.counts["in_flight"])
+
+    def end(self):
+        with self._lock:
+            self.counts["in_flight"] -= 1
+
+    def add(self, field):
+        with self._lock:
+            self.counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+# ===============================
+# HTTP
+# ===============================
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeUpstream/1.0"
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            return self.reply(200, self.server.stats.snapshot())
+        if self.path.rstrip("/") == "/health":
+            return self.reply(200, {"ok": True})
+        self.reply(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self.reply(400, {"error": {"message": "invalid JSON"}})
+
+        if self.path.rstrip("/") == "/stats/reset":
+            self.server.stats.reset()
+            return self.reply(200, {"ok": True})
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            return self.serve(body, self.chat)
+        if "/models/" in self.path:
+            return self.serve(body, self.inference)
+        self.reply(404, {"error": {"message": "not found"}})
+
+    def serve(self, body, respond):
+        behaviour, stats = self.server.behaviour, self.server.stats
+        stats.begin()
+        # Outcomes are counted before answering, so /stats read after a
+        # response always includes it
+        try:
+            if behaviour.throttled():
+                # Rate limits are answered straight away, like the real APIs
+                stats.add("throttled")
+                return self.reply(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                    {"Retry-After": f"{behaviour.retry_after:g}"},
+                )
+            time.sleep(behaviour.latency())
+            if behaviour.fails():
+                stats.add("errors")
+                return self.reply(503, {"error": {"message": "Service unavailable"}})
+            stats.add("ok")
+            respond(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (deadline, hedge or cancelled stream)
+            stats.add("disconnects")
+            self.close_connection = True
+        finally:
+            stats.end()
+
+    # ---- Groq / OpenAI ----
+    def chat(self, body):
+        messages = body.get("messages") or [{}]
+        answer = self.server.behaviour.answer(messages[-1].get("content") or "")
+        model = body.get("model", "fake")
+        if body.get("stream"):
+            self.server.stats.add("streams")
+            return self.stream_chat(model, answer)
+        self.reply(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": answer},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(answer.split()), "total_tokens": 0},
+        })
+
+    def stream_chat(self, model, answer):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.behaviour.token_delay)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == len(words) - 1 else word + " "},
+                    "finish_reason": None,
+                }],
+            }
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    # ---- Hugging Face inference ----
+    def inference(self, body):
+        self.reply(200, [{"generated_text": self.server.behaviour.answer(body.get("inputs") or "")}])
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # Load tests open many connections at once
+    request_queue_size = 1024
+
+    def __init__(self, address, behaviour=None, verbose=False):
+        super().__init__(address, FakeUpstreamHandler)
+        self.behaviour = behaviour or Behaviour()
+        self.stats = Stats()
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(behaviour=None, host="127.0.0.1", port=0):
+    """Serve in a daemon thread; call ``shutdown()`` then ``server_close()``."""
+    server = FakeUpstreamServer((host, port), behaviour)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+from django.conf import settings
+
+from .providers import get_provider
+
+_counts = {"fired": 0, "won_by_backup": 0, "failovers": 0}
+_counts_lock = threading.Lock()
+
+
+def _bump(name):
+    with _counts_lock:
+        _counts[name] += 1
+
+
+def hedge_stats():
+    with _counts_lock:
+        return dict(_counts)
+
+
+# ===============================
+# POLICY
+# ===============================
+def backup_for(provider):
+    """Provider that gets the second request, or None when hedging is off."""
+    if not settings.AI_HEDGE_ENABLED:
+        return None
+    return get_provider(settings.AI_HEDGE_PROVIDER or provider.name)
+
+
+def hedge_delay(provider):
+    # The primary's recent p90: nine calls in ten never pay for a hedge.
+    delay = provider.stats.quantile(
+        settings.AI_HEDGE_QUANTILE, min_samples=settings.AI_HEDGE_MIN_SAMPLES
+    )
+    if delay is None:
+        return settings.AI_HEDGE_DEFAULT_DELAY
+    return max(delay, settings.AI_HEDGE_MIN_DELAY)
+
+
+def _answered(task):
+    # A stream that ends without a single token still counts as an answer
+    exc = task.exception()
+    return exc is None or isinstance(exc, StopAsyncIteration)
+
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ===============================
+# COMPLETIONS
+# ===============================
+async def ahedged_complete(provider, system_prompt, text):
+    """
+    ``provider.acomplete()`` with a hedge.
+
+    If the primary hasn't answered within its p90, the same prompt goes to
+    the backup provider and whichever answers first wins; the other call
+    is cancelled. A primary that fails outright fails over to the backup.
+    Returns ``(result, winning_provider)``.
+    """
+    backup = backup_for(provider)
+    if backup is None:
+        return await provider.acomplete(system_prompt, text), provider
+
+    primary = asyncio.ensure_future(provider.acomplete(system_prompt, text))
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay(provider))
+    except asyncio.CancelledError:
+        await _cancel([primary])
+        raise
+
+    if done and not primary.exception():
+        return primary.result(), provider
+
+    _bump("failovers" if done else "fired")
+    second = asyncio.ensure_future(backup.acomplete(system_prompt, text))
+    owners = {primary: provider, second: backup}
+    pending = {second} if done else {primary, second}
+    error = primary.exception() if done else None
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        _bump("won_by_backup")
+                    return task.result(), owners[task]
+                error = error or task.exception()
+        raise error
+    finally:
+        await _cancel(pending)
+
+
+# ===============================
+# STREAMS
+# ===============================
+async def ahedged_stream(provider, system_prompt, text, on_winner=None):
+    """
+    ``provider.astream()`` hedged on time to first token.
+
+    Once either stream has produced a token the other is cancelled and the
+    winner is relayed to the end; tokens already sent are never mixed.
+    ``on_winner(provider)`` is called with the provider being relayed
+    before its first delta.
+    """
+    backup = backup_for(provider)
+    if backup is None:
+        if on_winner is not None:
+            on_winner(provider)
+        async for delta in provider.astream(system_prompt, text):
+            yield delta
+        return
+
+    streams = {}
+    owners = {}
+
+    def start(p):
+        stream = p.astream(system_prompt, text)
+        task = asyncio.ensure_future(stream.__anext__())
+        streams[task] = stream
+        owners[task] = p
+        return task
+
+    first = start(provider)
+    winner = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay(provider))
+        if done and _answered(first):
+            winner = first
+        else:
+            _bump("failovers" if done else "fired")
+            pending = {start(backup)} if done else {first, start(backup)}
+            error = first.exception() if done else None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if _answered(task):
+                        winner = task
+                        break
+                    error = error or task.exception()
+            if winner is None:
+                raise error
+            if winner is not first:
+                _bump("won_by_backup")
+
+        for task, stream in streams.items():
+            if task is not winner:
+                await _cancel([task])
+                await stream.aclose()
+
+        if on_winner is not None:
+            on_winner(owners[winner])
+        if isinstance(winner.exception(), StopAsyncIteration):
+            return
+        yield winner.result()
+        async for delta in streams[winner]:
+            yield delta
+    finally:
+        for task, stream in streams.items():
+            if not task.done():
+                await _cancel([task])
+            await stream.aclose()
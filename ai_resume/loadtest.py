@@ -0,0 +1,313 @@
+"""
+Concurrent load against ``/ai/improve/``.
+
+``run`` keeps ``concurrency`` requests in flight until ``requests`` have
+been sent (or ``duration`` seconds pass) and reports throughput, latency
+percentiles, time to first token for streams, and how often callers were
+rate limited or served a degraded answer. Requests go through Django's
+``AsyncClient`` in this process, or over HTTP to a running server.
+Wrapped by the ``ai_load`` management command.
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import reverse
+
+from .service import PROMPTS
+
+LOAD_PREFIX = "bench-ai-"
+LOAD_PASSWORD = "Bench-pass-1!"
+
+SAMPLE_TEXTS = {
+    "summary": "software engineer with 5 years experience building web apps in python and django",
+    "skills": "python, django, postgresql, docker, aws, react",
+    "experience": "worked on backend apis. improved performance of database queries. mentored juniors",
+    "education": "b.tech computer science, 2018, delhi university",
+}
+
+
+# ===============================
+# USERS
+# ===============================
+def ensure_users(count):
+    names = [f"{LOAD_PREFIX}{n}" for n in range(count)]
+    existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+    password_hash = make_password(LOAD_PASSWORD)
+    User.objects.bulk_create(
+        User(username=name, email=f"{name}@example.com", password=password_hash)
+        for name in names if name not in existing
+    )
+    # Logging in over HTTP needs every account on the known password
+    User.objects.filter(username__in=existing).update(password=password_hash)
+    return list(User.objects.filter(username__in=names).order_by("id"))
+
+
+def remove_users():
+    return User.objects.filter(username__startswith=LOAD_PREFIX).delete()[0]
+
+
+# ===============================
+# OUTCOMES
+# ===============================
+def classify(status, payload):
+    """One label per response: ok, cached, degraded:<reason>, rate_limited, ..."""
+    if status == 429:
+        return "rate_limited"
+    if status != 200 or payload is None:
+        return f"http_{status}"
+    if payload.get("degraded"):
+        return f"degraded:{payload.get('reason', 'error')}"
+    if payload.get("cached"):
+        return "cached"
+    if "error" in payload:
+        return "error"
+    return "ok"
+
+
+def parse_sse(chunks):
+    """Final payload of an SSE body: the done event, or the error event."""
+    body = b"".join(chunks).decode()
+    payload = None
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+        if lines.get("event") in ("done", "error"):
+            payload = json.loads(lines.get("data", "null"))
+    return payload
+
+
+class Sample:
+
+    __slots__ = ("outcome", "elapsed", "first_token", "retry_after")
+
+    def __init__(self, outcome, elapsed, first_token=None, retry_after=None):
+        self.outcome = outcome
+        self.elapsed = elapsed
+        self.first_token = first_token
+        self.retry_after = retry_after
+
+
+# ===============================
+# TRANSPORTS
+# ===============================
+class InProcessTransport:
+    """Django's ASGI request path in this process, no sockets."""
+
+    async def open(self, users):
+        self.clients = []
+        for user in users:
+            client = AsyncClient()
+            await client.aforce_login(user)
+            self.clients.append(client)
+        self.url = reverse("ai_resume_improve")
+
+    async def send(self, user_index, payload):
+        started = time.perf_counter()
+        response = await self.clients[user_index].post(
+            self.url, json.dumps(payload), content_type="application/json"
+        )
+        first_token = None
+        if response.streaming:
+            chunks = []
+            async for chunk in response.streaming_content:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                chunks.append(chunk)
+            data = parse_sse(chunks)
+        else:
+            data = json.loads(response.content) if response.content else None
+        return Sample(
+            classify(response.status_code, data),
+            time.perf_counter() - started,
+            first_token,
+            response.headers.get("Retry-After"),
+        )
+
+    async def close(self):
+        pass
+
+
+class HttpTransport:
+    """A running server (runserver, gunicorn, uvicorn) at ``base_url``."""
+
+    def __init__(self, base_url, timeout=60.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    async def open(self, users):
+        self.clients = []
+        for user in users:
+            client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+            # The login page sets the CSRF cookie the form post needs
+            await client.get(reverse("login"))
+            response = await client.post(
+                reverse("login"),
+                data={"username": user.email, "password": LOAD_PASSWORD},
+                headers=self.csrf(client),
+            )
+            if not response.json().get("success"):
+                raise RuntimeError(f"Could not log in as {user.email}")
+            self.clients.append(client)
+
+    def csrf(self, client):
+        return {"X-CSRFToken": client.cookies.get("csrftoken", ""), "Referer": self.base_url + "/"}
+
+    async def send(self, user_index, payload):
+        client = self.clients[user_index]
+        started = time.perf_counter()
+        first_token = None
+        async with client.stream(
+            "POST", reverse("ai_resume_improve"), json=payload, headers=self.csrf(client)
+        ) as response:
+            chunks = []
+            async for chunk in response.aiter_bytes():
+                if first_token is None and payload.get("stream"):
+                    first_token = time.perf_counter() - started
+                chunks.append(chunk)
+        if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            data = parse_sse(chunks)
+        else:
+            try:
+                data = json.loads(b"".join(chunks))
+            except ValueError:
+                data = None
+        return Sample(
+            classify(response.status_code, data),
+            time.perf_counter() - started,
+            first_token,
+            response.headers.get("Retry-After"),
+        )
+
+    async def close(self):
+        await asyncio.gather(*(client.aclose() for client in self.clients))
+
+
+# ===============================
+# DRIVER
+# ===============================
+def make_payload(rng, fields, unique_ratio, stream):
+    field = rng.choice(fields)
+    text = SAMPLE_TEXTS.get(field, SAMPLE_TEXTS["summary"])
+    if rng.random() < unique_ratio:
+        # A text nobody has sent before misses the completion cache
+        text = f"{text} ({uuid.uuid4().hex[:8]})"
+    payload = {"field": field, "text": text}
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+async def drive(transport, users, concurrency, requests=None, duration=None,
+                fields=None, unique_ratio=1.0, stream=False, random_seed=0):
+    if requests is None and duration is None:
+        raise ValueError("Give a request count or a duration")
+    rng = random.Random(random_seed)
+    fields = list(fields or PROMPTS)
+    samples = []
+    sent = 0
+
+    await transport.open(users)
+    started = time.perf_counter()
+    stop_at = started + duration if duration else None
+
+    async def worker(n):
+        nonlocal sent
+        while (requests is None or sent < requests) and (stop_at is None or time.perf_counter() < stop_at):
+            sent += 1
+            payload = make_payload(rng, fields, unique_ratio, stream)
+            try:
+                sample = await transport.send(n % len(users), payload)
+            except httpx.HTTPError as exc:
+                sample = Sample(f"transport:{type(exc).__name__}", time.perf_counter() - started)
+            samples.append(sample)
+
+    try:
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    finally:
+        await transport.close()
+    return samples, time.perf_counter() - started
+
+
+def _ms(values):
+    if not values:
+        return None
+    values = sorted(v * 1000 for v in values)
+    if len(values) == 1:
+        q = values * 99
+    else:
+        q = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": round(q[49], 2),
+        "p95": round(q[94], 2),
+        "p99": round(q[98], 2),
+        "max": round(values[-1], 2),
+    }
+
+
+def summarize(samples, elapsed, concurrency):
+    outcomes = Counter(sample.outcome for sample in samples)
+    limited = [float(s.retry_after) for s in samples if s.outcome == "rate_limited" and s.retry_after]
+    answered = [s for s in samples if s.outcome != "rate_limited"]
+    return {
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        # Rate-limited replies are instant; keeping them out of the
+        # latency numbers stops them flattering the tail
+        "latency_ms": _ms([s.elapsed for s in answered]),
+        "first_token_ms": _ms([s.first_token for s in answered if s.first_token is not None]),
+        "outcomes": dict(outcomes.most_common()),
+        "rate_limited": {
+            "share": round(outcomes["rate_limited"] / len(samples), 4) if samples else 0,
+            "retry_after_s": {
+                "min": min(limited),
+                "max": max(limited),
+                "mean": round(statistics.fmean(limited), 2),
+            } if limited else None,
+        },
+        "degraded_share": round(
+            sum(n for outcome, n in outcomes.items() if outcome.startswith("degraded")) / len(samples), 4
+        ) if samples else 0,
+    }
+
+
+def upstream_stats(url):
+    """Counters from a running fake upstream, or None if it isn't reachable."""
+    try:
+        return httpx.get(url.rstrip("/") + "/stats", timeout=5).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def run(concurrency, requests=None, duration=None, users=None, base_url=None,
+        upstream=None, **options):
+    accounts = ensure_users(users or concurrency)
+    transport = HttpTransport(base_url) if base_url else InProcessTransport()
+    before = upstream_stats(upstream) if upstream else None
+
+    # async_to_sync rather than asyncio.run: the view's ORM calls then
+    # run on this thread's connection, like a real request's would
+    samples, elapsed = async_to_sync(drive)(
+        transport, accounts, concurrency, requests=requests, duration=duration, **options
+    )
+
+    report = summarize(samples, elapsed, concurrency)
+    report["target"] = base_url or "in-process"
+    if before is not None:
+        after = upstream_stats(upstream) or {}
+        report["upstream"] = {
+            key: after.get(key, 0) - before.get(key, 0)
+            for key in ("requests", "ok", "errors", "throttled", "disconnects", "streams")
+        }
+        report["upstream"]["max_in_flight"] = after.get("max_in_flight")
+    return report
@@ -0,0 +1,108 @@
+"""Rule-based resume text improver: the fallback when the LLM is late or down."""
+import re
+
+BULLET = "• "
+
+# Leading bullet markers people type: -, *, •, ·, ▪, 1. 2) ...
+BULLET_RE = re.compile(r"^\s*(?:[-*•·▪◦]+|\d+[.)])\s*")
+SKILL_SPLIT_RE = re.compile(r"[,;|\n]+")
+
+# Weak openings -> action verbs. Longer phrases first so "helped with"
+# wins over "helped".
+ACTION_VERBS = [
+    ("was responsible for", "Led"),
+    ("participated in", "Contributed to"),
+    ("was involved in", "Contributed to"),
+    ("took care of", "Managed"),
+    ("was in charge of", "Directed"),
+    ("in charge of", "Directed"),
+    ("looked after", "Oversaw"),
+    ("worked with", "Collaborated with"),
+    ("worked on", "Developed"),
+    ("dealt with", "Resolved"),
+    ("helped with", "Supported"),
+    ("helped", "Supported"),
+    ("assisted", "Supported"),
+    ("handled", "Managed"),
+    ("made", "Built"),
+    ("did", "Delivered"),
+    ("used", "Leveraged"),
+    ("fixed", "Resolved"),
+    ("wrote", "Authored"),
+    ("got", "Achieved"),
+    ("ran", "Operated"),
+    ("set up", "Established"),
+    ("changed", "Transformed"),
+    ("showed", "Demonstrated"),
+    ("tried to", "Drove efforts to"),
+]
+ACTION_VERB_RE = re.compile(
+    r"^(?:i\s+)?(" + "|".join(re.escape(weak) for weak, _ in ACTION_VERBS) + r")\b",
+    re.IGNORECASE,
+)
+ACTION_VERB_MAP = dict(ACTION_VERBS)
+
+
+def field_for_prompt(system_prompt):
+    prompt = (system_prompt or "").lower()
+    for field in ("skills", "education", "experience", "summary"):
+        if field in prompt:
+            return field
+    return None
+
+
+def _lines(text):
+    lines = (" ".join(line.split()) for line in (text or "").splitlines())
+    return [line for line in lines if line]
+
+
+def _capitalize(line):
+    return line[:1].upper() + line[1:]
+
+
+def strengthen(line):
+    """Swap a weak opening phrase for an action verb."""
+    match = ACTION_VERB_RE.match(line)
+    if match is None:
+        return _capitalize(line)
+    strong = ACTION_VERB_MAP[match.group(1).lower()]
+    return strong + line[match.end():]
+
+
+def improve_skills(text):
+    seen, skills = set(), []
+    for line in _lines(text):
+        for skill in SKILL_SPLIT_RE.split(BULLET_RE.sub("", line)):
+            skill = skill.strip(" .")
+            if skill and skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return "\n".join(skills)
+
+
+def improve_entries(text, verbs=True):
+    entries = []
+    for line in _lines(text):
+        line = BULLET_RE.sub("", line).rstrip(" ;,")
+        if not line:
+            continue
+        entries.append(BULLET + (strengthen(line) if verbs else _capitalize(line)))
+    return "\n".join(entries)
+
+
+def improve_summary(text):
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(_lines(text)))
+    summary = " ".join(strengthen(s) for s in sentences if s)
+    if summary and summary[-1] not in ".!?":
+        summary += "."
+    return summary
+
+
+def improve(text, field=None):
+    if field == "skills":
+        return improve_skills(text)
+    if field == "education":
+        return improve_entries(text, verbs=False)
+    if field == "summary":
+        return improve_summary(text)
+    return improve_entries(text)
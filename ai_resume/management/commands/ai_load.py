@@ -0,0 +1,115 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_resume import loadtest
+from ai_resume.service import PROMPTS
+
+
+class Command(BaseCommand):
+    help = "Drive /ai/improve/ at a fixed concurrency and report throughput, tails and 429s."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Requests kept in flight (default: 20).",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            help="Requests to send in total (default: 500 unless --duration is given).",
+        )
+        parser.add_argument("--duration", type=float, help="Seconds to keep sending.")
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Accounts to spread requests over (default: one per concurrent slot).",
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server; by default requests stay in this process.",
+        )
+        parser.add_argument(
+            "--field",
+            action="append",
+            choices=list(PROMPTS),
+            help="Resume field to improve; repeat for several (default: all).",
+        )
+        parser.add_argument(
+            "--unique-ratio",
+            type=float,
+            default=1.0,
+            help="Share of requests with never-seen text, i.e. completion cache misses (default: 1).",
+        )
+        parser.add_argument("--stream", action="store_true", help="Ask for SSE token streams.")
+        parser.add_argument(
+            "--upstream",
+            help="Base URL of fake_ai_server, to report how many calls reached it.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Also write the report as JSON here.")
+        parser.add_argument("--keep-users", action="store_true", help="Leave the load accounts in place.")
+        parser.add_argument("--force", action="store_true", help="Run even with DEBUG off.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Refusing to create load-test accounts with DEBUG off; pass --force.")
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        if not 0 <= options["unique_ratio"] <= 1:
+            raise CommandError("--unique-ratio must be between 0 and 1")
+        requests = options["requests"]
+        if requests is None and options["duration"] is None:
+            requests = 500
+
+        try:
+            report = loadtest.run(
+                options["concurrency"],
+                requests=requests,
+                duration=options["duration"],
+                users=options["users"],
+                base_url=options["url"],
+                upstream=options["upstream"],
+                fields=options["field"],
+                unique_ratio=options["unique_ratio"],
+                stream=options["stream"],
+                random_seed=options["seed"],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if not options["keep_users"]:
+                loadtest.remove_users()
+
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['target']}: {report['requests']} requests at concurrency "
+            f"{report['concurrency']} in {report['duration_s']}s = {report['throughput_rps']} req/s"
+        )
+        for label in ("latency_ms", "first_token_ms"):
+            q = report[label]
+            if q:
+                self.stdout.write(
+                    f"  {label:<15} p50 {q['p50']:>9.1f}  p95 {q['p95']:>9.1f}  "
+                    f"p99 {q['p99']:>9.1f}  max {q['max']:>9.1f}"
+                )
+        for outcome, count in report["outcomes"].items():
+            self.stdout.write(f"  {outcome:<24} {count:>7}")
+        limited = report["rate_limited"]
+        if limited["retry_after_s"]:
+            r = limited["retry_after_s"]
+            self.stdout.write(
+                f"  rate limited {limited['share']:.1%}, Retry-After {r['min']:g}-{r['max']:g}s "
+                f"(mean {r['mean']:g}s)"
+            )
+        if "upstream" in report:
+            self.stdout.write(f"  upstream: {report['upstream']}")
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_resume.fake_upstream import LATENCY_DISTRIBUTIONS, Behaviour, FakeUpstreamServer
+
+
+class Command(BaseCommand):
+    help = "Serve a fake Groq/Hugging Face API with configurable latency, errors and 429s."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--latency",
+            choices=LATENCY_DISTRIBUTIONS,
+            default="lognormal",
+            help="Time-to-first-byte distribution (default: lognormal).",
+        )
+        parser.add_argument(
+            "--median",
+            type=float,
+            default=0.4,
+            help="Median latency in seconds; the value for --latency fixed (default: 0.4).",
+        )
+        parser.add_argument(
+            "--sigma",
+            type=float,
+            default=0.5,
+            help="Lognormal shape: higher means a longer tail (default: 0.5).",
+        )
+        parser.add_argument("--min-latency", type=float, default=0.0)
+        parser.add_argument(
+            "--max-latency",
+            type=float,
+            default=30.0,
+            help="Latency cap, also the top of --latency uniform (default: 30).",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Share of calls answered 503 (default: 0).",
+        )
+        parser.add_argument(
+            "--burst-every",
+            type=float,
+            default=0.0,
+            help="Seconds between 429 bursts (default: no bursts).",
+        )
+        parser.add_argument(
+            "--burst-length",
+            type=float,
+            default=0.0,
+            help="Seconds each 429 burst lasts.",
+        )
+        parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After on 429s.")
+        parser.add_argument("--tokens", type=int, default=40, help="Words per answer (default: 40).")
+        parser.add_argument(
+            "--token-delay",
+            type=float,
+            default=0.02,
+            help="Seconds between streamed tokens (default: 0.02).",
+        )
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--verbose-log", action="store_true", help="Log every request.")
+
+    def handle(self, *args, **options):
+        try:
+            behaviour = Behaviour(
+                distribution=options["latency"],
+                median=options["median"],
+                sigma=options["sigma"],
+                min_latency=options["min_latency"],
+                max_latency=options["max_latency"],
+                error_rate=options["error_rate"],
+                burst_every=options["burst_every"],
+                burst_length=options["burst_length"],
+                retry_after=options["retry_after"],
+                tokens=options["tokens"],
+                token_delay=options["token_delay"],
+                seed=options["seed"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        server = FakeUpstreamServer(
+            (options["host"], options["port"]), behaviour, verbose=options["verbose_log"]
+        )
+        self.stdout.write(f"Fake AI upstream on {server.base_url}")
+        self.stdout.write(f"  GROQ_BASE_URL={server.base_url} GROQ_API_KEY=fake")
+        self.stdout.write(f"  HF_API_URL={server.base_url}/models/fake")
+        self.stdout.write(f"  counters: {server.base_url}/stats")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served: {server.stats.snapshot()}")
@@ -1,3 +1,31 @@
 from django.db import models
 
-# Create your models here.
+
+class CompletionCache(models.Model):
+    # sha256 of (field, normalized text, system prompt, model, temperature, max_tokens)
+    key = models.CharField(max_length=64, unique=True)
+
+    field = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    result = models.TextField()
+    size = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.field} ({self.model})"
+
+
+class CompletionCacheStats(models.Model):
+    # Single row shared by every worker; bumped with F() so it stays atomic
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "completion cache stats"
+
+    def __str__(self):
+        return f"{self.hits} hits / {self.misses} misses"
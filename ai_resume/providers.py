@@ -0,0 +1,359 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import local_improver
+from .clients import (
+    UpstreamError,
+    acall_with_retries,
+    call_with_retries,
+    get_async_groq_client,
+    get_async_http_client,
+    get_groq_client,
+    get_http_session,
+    iterate_on_pool_loop,
+    on_pool_loop,
+    request_timeout,
+)
+
+
+def build_messages(system_prompt, text):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text},
+    ]
+
+
+# ===============================
+# METRICS
+# ===============================
+class ProviderStats:
+    """
+    Call/error counters plus latency (seconds) in two shapes: fixed
+    histogram buckets for dashboards, and a rolling window of recent
+    samples for quantiles such as the hedging threshold.
+    """
+
+    BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, float("inf"))
+
+    def __init__(self, window=500):
+        self.calls = 0
+        self.errors = 0
+        self.buckets = [0] * len(self.BUCKETS)
+        self.latency_sum = 0.0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+                return
+            self.latencies.append(seconds)
+            self.latency_sum += seconds
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    def quantile(self, q, min_samples=1):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if len(latencies) < min_samples or not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def export(self):
+        """Raw totals for metrics exporters (buckets are not cumulative)."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "buckets": list(self.buckets),
+                "latency_sum": self.latency_sum,
+            }
+
+    def snapshot(self):
+        with self._lock:
+            calls, errors = self.calls, self.errors
+            histogram = dict(zip(self.BUCKETS, self.buckets))
+
+        def pct(q):
+            value = self.quantile(q)
+            return round(value, 4) if value is not None else None
+
+        return {
+            "calls": calls,
+            "errors": errors,
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            "p99": pct(0.99),
+            "histogram": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in histogram.items()
+            },
+        }
+
+
+# ===============================
+# BASE PROVIDER
+# ===============================
+class Provider:
+    """
+    One AI backend. Subclasses implement ``_complete``/``_acomplete`` and
+    optionally ``_stream``/``_astream``; the public methods add retries,
+    the circuit breaker and metrics so every backend behaves the same.
+    """
+
+    model = ""
+    temperature = None
+    max_tokens = None
+
+    def __init__(self, name, options):
+        self.name = name
+        self.options = options
+        self.stats = ProviderStats()
+
+    def cache_params(self):
+        # Part of the completion cache key
+        return self.model, self.temperature, self.max_tokens
+
+    def complete(self, system_prompt, text):
+        started = time.perf_counter()
+        try:
+            result = call_with_retries(self.name, lambda: self._complete(system_prompt, text))
+        except Exception:
+            self.stats.record(time.perf_counter() - started, ok=False)
+            raise
+        self.stats.record(time.perf_counter() - started, ok=True)
+        return (result or "").strip()
+
+    async def acomplete(self, system_prompt, text):
+        started = time.perf_counter()
+        try:
+            result = await acall_with_retries(self.name, lambda: self._acomplete(system_prompt, text))
+        except asyncio.CancelledError:
+            # Hedged away: it took at least this long, and leaving stalls out
+            # would drag the hedging threshold down.
+            self.stats.record(time.perf_counter() - started, ok=True)
+            raise
+        except Exception:
+            self.stats.record(time.perf_counter() - started, ok=False)
+            raise
+        self.stats.record(time.perf_counter() - started, ok=True)
+        return (result or "").strip()
+
+    def stream(self, system_prompt, text):
+        started = time.perf_counter()
+        ok = False
+        try:
+            # Retries only cover opening the stream, never a half-sent answer
+            deltas = call_with_retries(self.name, lambda: self._stream(system_prompt, text))
+            yield from deltas
+            ok = True
+        except GeneratorExit:
+            # Abandoned by the client: the elapsed time is still a sample
+            ok = True
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - started, ok=ok)
+
+    async def astream(self, system_prompt, text):
+        started = time.perf_counter()
+        ok = False
+        try:
+            deltas = await acall_with_retries(self.name, lambda: self._astream(system_prompt, text))
+            async for delta in deltas:
+                yield delta
+            ok = True
+        except (asyncio.CancelledError, GeneratorExit):
+            # Hedged away or abandoned: the elapsed time is still a sample
+            ok = True
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - started, ok=ok)
+
+    # ---- backends without native streaming send one chunk ----
+    def _stream(self, system_prompt, text):
+        return iter([self._complete(system_prompt, text)])
+
+    async def _astream(self, system_prompt, text):
+        result = await self._acomplete(system_prompt, text)
+
+        async def one_chunk():
+            yield result
+
+        return one_chunk()
+
+    def _complete(self, system_prompt, text):
+        raise NotImplementedError
+
+    async def _acomplete(self, system_prompt, text):
+        raise NotImplementedError
+
+
+# ===============================
+# GROQ
+# ===============================
+class GroqProvider(Provider):
+
+    def __init__(self, name, options):
+        super().__init__(name, options)
+        self.model = options.get("MODEL", "llama-3.1-8b-instant")
+        self.temperature = options.get("TEMPERATURE", 0.6)
+        self.max_tokens = options.get("MAX_TOKENS", 200)
+
+    def _params(self, system_prompt, text, **extra):
+        return {
+            "model": self.model,
+            "messages": build_messages(system_prompt, text),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            **extra,
+        }
+
+    def _complete(self, system_prompt, text):
+        completion = get_groq_client().chat.completions.create(
+            **self._params(system_prompt, text)
+        )
+        return completion.choices[0].message.content
+
+    async def _acomplete(self, system_prompt, text):
+        async def call():
+            completion = await get_async_groq_client().chat.completions.create(
+                **self._params(system_prompt, text)
+            )
+            return completion.choices[0].message.content
+
+        return await on_pool_loop(call())
+
+    def _stream(self, system_prompt, text):
+        stream = get_groq_client().chat.completions.create(
+            **self._params(system_prompt, text, stream=True)
+        )
+
+        def deltas():
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+        return deltas()
+
+    async def _astream(self, system_prompt, text):
+        async def open_stream():
+            return await get_async_groq_client().chat.completions.create(
+                **self._params(system_prompt, text, stream=True)
+            )
+
+        stream = await on_pool_loop(open_stream())
+
+        async def deltas():
+            try:
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
+
+        return iterate_on_pool_loop(deltas())
+
+
+# ===============================
+# HUGGING FACE INFERENCE API
+# ===============================
+class HuggingFaceProvider(Provider):
+
+    def __init__(self, name, options):
+        super().__init__(name, options)
+        self.url = options.get("URL", settings.HF_API_URL)
+        self.token = options.get("TOKEN")
+        self.model = self.url.rstrip("/").rsplit("/models/", 1)[-1]
+
+    def _request(self, system_prompt, text):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        payload = {"inputs": f"{system_prompt}\n{text}"}
+        return headers, payload
+
+    def _parse(self, status_code, headers, data):
+        if status_code != 200:
+            raise UpstreamError(
+                "AI service failed",
+                status_code=status_code,
+                retry_after=headers.get("Retry-After"),
+            )
+        item = data[0]
+        return item.get("summary_text") or item.get("generated_text") or ""
+
+    def _complete(self, system_prompt, text):
+        headers, payload = self._request(system_prompt, text)
+        response = get_http_session().post(
+            self.url, headers=headers, json=payload, timeout=request_timeout()
+        )
+        data = response.json() if response.status_code == 200 else None
+        return self._parse(response.status_code, response.headers, data)
+
+    async def _acomplete(self, system_prompt, text):
+        headers, payload = self._request(system_prompt, text)
+
+        async def call():
+            response = await get_async_http_client().post(self.url, headers=headers, json=payload)
+            data = response.json() if response.status_code == 200 else None
+            return self._parse(response.status_code, response.headers, data)
+
+        return await on_pool_loop(call())
+
+
+# ===============================
+# LOCAL (OFFLINE, DETERMINISTIC)
+# ===============================
+class LocalProvider(Provider):
+    """No network: the rule-based improver. For tests, benchmarks and offline dev."""
+
+    model = "local"
+
+    def _complete(self, system_prompt, text):
+        return local_improver.improve(text, local_improver.field_for_prompt(system_prompt))
+
+    async def _acomplete(self, system_prompt, text):
+        return self._complete(system_prompt, text)
+
+
+# ===============================
+# REGISTRY
+# ===============================
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """Provider instance configured under ``settings.AI_PROVIDERS[name]``."""
+    name = name or settings.AI_PROVIDER
+    with _providers_lock:
+        if name not in _providers:
+            try:
+                options = settings.AI_PROVIDERS[name]
+            except KeyError:
+                raise RuntimeError(f"AI provider '{name}' is not configured")
+            backend = import_string(options["BACKEND"])
+            _providers[name] = backend(name, options)
+        return _providers[name]
+
+
+def loaded_providers():
+    """Providers this process has already built, without building more."""
+    with _providers_lock:
+        return dict(_providers)
+
+
+def provider_stats():
+    return {
+        name: get_provider(name).stats.snapshot()
+        for name in settings.AI_PROVIDERS
+    }
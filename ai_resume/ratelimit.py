@@ -0,0 +1,241 @@
+import asyncio
+import json
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+# ===============================
+# BUDGETS
+# ===============================
+class Budget:
+    """
+    ``limit`` cost units per ``window`` seconds, as a sliding window.
+
+    Each window keeps one counter that is charged with an atomic
+    ``cache.incr``. The previous window's counter is weighted by how much
+    of it still overlaps the sliding window, which approximates a
+    sliding-window log without storing every timestamp. A short window
+    with a small limit acts as the burst allowance.
+    """
+
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def keys(self, ident, now):
+        index = int(now // self.window)
+        prefix = f"rl:{self.scope}:{self.window}:{ident}"
+        return f"{prefix}:{index}", f"{prefix}:{index - 1}", now % self.window
+
+    def decide(self, previous, current, cost, elapsed):
+        # ``current`` already includes this request's cost
+        weight = 1 - elapsed / self.window
+        used = previous * weight + current
+        reset = self.window - elapsed
+
+        if used <= self.limit:
+            return Decision(True, self.limit, int(self.limit - used), reset, 0)
+
+        # Wait until the previous window's share has decayed enough, or
+        # until the next window if this one alone is over budget.
+        before = current - cost
+        if previous and before + cost <= self.limit:
+            needed = self.window * (1 - (self.limit - before - cost) / previous) - elapsed
+            retry_after = min(needed, reset)
+        else:
+            retry_after = reset
+
+        return Decision(False, self.limit, 0, reset, max(1, math.ceil(retry_after)))
+
+
+class Decision:
+    def __init__(self, allowed, limit, remaining, reset, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = max(0, remaining)
+        self.reset = reset
+        self.retry_after = retry_after
+
+    def apply_headers(self, response):
+        response["X-RateLimit-Limit"] = str(self.limit)
+        response["X-RateLimit-Remaining"] = str(self.remaining)
+        response["X-RateLimit-Reset"] = str(math.ceil(self.reset))
+        if not self.allowed:
+            response["Retry-After"] = str(self.retry_after)
+        return response
+
+
+def budgets_for(scope):
+    limits = settings.AI_RATE_LIMITS
+    return [
+        (kind, Budget(f"{scope}:{kind}", limit, window))
+        for kind in ("user", "ip")
+        for limit, window in limits.get(kind, ())
+    ]
+
+
+def tightest(decisions):
+    denied = [d for d in decisions if not d.allowed]
+    if denied:
+        return max(denied, key=lambda d: d.retry_after)
+    return min(decisions, key=lambda d: d.remaining)
+
+
+# ===============================
+# CHARGING
+# ===============================
+def _charge(key, cost, window):
+    # add() is a no-op when the counter exists; incr() is atomic on
+    # every backend that supports it natively.
+    cache.add(key, 0, timeout=window * 2)
+    try:
+        return cache.incr(key, cost)
+    except ValueError:
+        cache.set(key, cost, timeout=window * 2)
+        return cost
+
+
+async def _acharge(key, cost, window):
+    await cache.aadd(key, 0, timeout=window * 2)
+    try:
+        return await cache.aincr(key, cost)
+    except ValueError:
+        await cache.aset(key, cost, timeout=window * 2)
+        return cost
+
+
+def _refund(key, cost):
+    try:
+        cache.decr(key, cost)
+    except ValueError:
+        pass
+
+
+async def _arefund(key, cost):
+    try:
+        await cache.adecr(key, cost)
+    except ValueError:
+        pass
+
+
+def hit(scope, idents, cost):
+    """Charge ``cost`` against every budget of ``scope``; all or nothing."""
+    now = time.time()
+    decisions, charged = [], []
+
+    for kind, budget in budgets_for(scope):
+        current_key, previous_key, elapsed = budget.keys(idents[kind], now)
+        current = _charge(current_key, cost, budget.window)
+        charged.append(current_key)
+        previous = cache.get(previous_key, 0)
+        decisions.append(budget.decide(previous, current, cost, elapsed))
+
+    decision = tightest(decisions)
+    if not decision.allowed:
+        # Rejected calls must not eat into the budget
+        for key in charged:
+            _refund(key, cost)
+    return decision
+
+
+async def ahit(scope, idents, cost):
+    now = time.time()
+    decisions, charged = [], []
+
+    for kind, budget in budgets_for(scope):
+        current_key, previous_key, elapsed = budget.keys(idents[kind], now)
+        current = await _acharge(current_key, cost, budget.window)
+        charged.append(current_key)
+        previous = await cache.aget(previous_key, 0)
+        decisions.append(budget.decide(previous, current, cost, elapsed))
+
+    decision = tightest(decisions)
+    if not decision.allowed:
+        for key in charged:
+            await _arefund(key, cost)
+    return decision
+
+
+# ===============================
+# REQUEST HELPERS
+# ===============================
+def client_ip(request):
+    # Render's proxy appends the peer address, so the right-most
+    # X-Forwarded-For entry is the one a client cannot forge.
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if forwarded and settings.AI_RATE_LIMIT_TRUST_PROXY:
+        return forwarded.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def field_cost(request):
+    try:
+        field = json.loads(request.body).get("field")
+    except Exception:
+        field = None
+    # Anything but a field name is rejected by the view; charge the base rate
+    return settings.AI_FIELD_COSTS.get(field, 1) if isinstance(field, str) else 1
+
+
+def batch_cost(request):
+    try:
+        fields = json.loads(request.body).get("fields") or {}
+    except Exception:
+        fields = {}
+    if not isinstance(fields, dict):
+        # Rejected by the view; a list of objects would not even hash
+        fields = {}
+    return max(1, sum(settings.AI_FIELD_COSTS.get(field, 1) for field in fields))
+
+
+def too_many_requests(decision):
+    response = JsonResponse(
+        {"error": "Too many requests", "retry_after": decision.retry_after},
+        status=429,
+    )
+    return decision.apply_headers(response)
+
+
+# ===============================
+# DECORATOR
+# ===============================
+def rate_limit(scope="ai", cost=field_cost):
+    """
+    Per-user and per-IP budgets for a view, sync or async.
+
+    ``cost`` is called with the request and returns how many units the
+    call uses. Must sit inside login_required.
+    """
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                idents = {"user": user.pk, "ip": client_ip(request)}
+                decision = await ahit(scope, idents, cost(request))
+                if not decision.allowed:
+                    return too_many_requests(decision)
+                response = await view(request, *args, **kwargs)
+                return decision.apply_headers(response)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            idents = {"user": request.user.pk, "ip": client_ip(request)}
+            decision = hit(scope, idents, cost(request))
+            if not decision.allowed:
+                return too_many_requests(decision)
+            response = view(request, *args, **kwargs)
+            return decision.apply_headers(response)
+
+        return wrapper
+
+    return decorator
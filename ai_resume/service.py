@@ -0,0 +1,224 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import local_improver
+from .clients import CircuitOpenError, status_of
+from .completion_cache import (
+    aget_completion,
+    astore_completion,
+    completion_key,
+    get_completion,
+    store_completion,
+)
+from .hedging import ahedged_complete, ahedged_stream
+from .singleflight import acoalesce, acoalesce_stream, coalesce, coalesce_stream
+
+
+PROMPTS = {
+    "skills": "Generate ATS-friendly resume skills, one per line.",
+    "education": "Rewrite education professionally, one entry per line.",
+    "experience": "Rewrite experience using action verbs and achievements.",
+    "summary": "Write a professional resume summary (3–4 lines).",
+}
+DEFAULT_PROMPT = "Rewrite resume content professionally."
+
+# Sent when a field is still empty (skills / education start empty)
+EMPTY_TEXT = "Generate professional resume content."
+
+
+def cache_key(provider, field, text, system_prompt):
+    return completion_key(field, text, system_prompt, *provider.cache_params())
+
+
+def _winner_key(key, provider, answered_by, field, system_prompt, text):
+    # A hedge won by the backup is its answer, not the primary's: file it
+    # under the backup's model and parameters.
+    if answered_by is provider:
+        return key
+    return cache_key(answered_by, field, text, system_prompt)
+
+
+async def acomplete(provider, key, field, system_prompt, text):
+    # Identical prompts already in flight (double clicks, several tabs,
+    # other workers on this host) share one upstream call.
+    async def upstream():
+        result, answered_by = await ahedged_complete(provider, system_prompt, text)
+        await astore_completion(
+            _winner_key(key, provider, answered_by, field, system_prompt, text),
+            field, answered_by.model, result,
+        )
+        return result
+
+    return await acoalesce(key, upstream, lambda: aget_completion(key, count=False))
+
+
+def complete(provider, key, field, system_prompt, text):
+    """Sync twin of :func:`acomplete` for WSGI views."""
+    def upstream():
+        result = provider.complete(system_prompt, text)
+        store_completion(key, field, provider.model, result)
+        return result
+
+    return coalesce(key, upstream, lambda: get_completion(key, count=False))
+
+
+async def astream(provider, key, field, system_prompt, text):
+    """Deltas of a coalesced streaming completion; followers get one chunk."""
+    answered_by = [provider]
+
+    async def store(result):
+        winner = answered_by[-1]
+        await astore_completion(
+            _winner_key(key, provider, winner, field, system_prompt, text),
+            field, winner.model, result,
+        )
+
+    async for delta in acoalesce_stream(
+        key,
+        lambda: ahedged_stream(provider, system_prompt, text, on_winner=answered_by.append),
+        lambda: aget_completion(key, count=False),
+        store,
+    ):
+        yield delta
+
+
+def stream(provider, key, field, system_prompt, text):
+    """Sync twin of :func:`astream` for WSGI views."""
+    yield from coalesce_stream(
+        key,
+        lambda: provider.stream(system_prompt, text),
+        lambda: get_completion(key, count=False),
+        lambda result: store_completion(key, field, provider.model, result),
+    )
+
+
+# ===============================
+# DEADLINES AND DEGRADATION
+# ===============================
+# Sync callers wait on the deadline here while the call carries on and
+# still fills the completion cache for the next request. The slots bound
+# calls that are queued or running late, so a stalled provider can't pile
+# up an unbounded backlog behind the pool.
+_deadline_pool = ThreadPoolExecutor(thread_name_prefix="ai-deadline")
+_deadline_slots = threading.BoundedSemaphore(settings.AI_DEADLINE_MAX_PENDING)
+
+
+class Overloaded(Exception):
+    """Every deadline slot is taken; the caller answers degraded at once."""
+
+
+def deadline():
+    return time.monotonic() + settings.AI_DEADLINE
+
+
+def remaining(deadline):
+    return max(0.0, deadline - time.monotonic())
+
+
+def degraded(field, text, exc):
+    """Rule-based answer payload for a call that was late or failed."""
+    if isinstance(exc, TimeoutError):
+        reason = "timeout"
+    elif isinstance(exc, CircuitOpenError):
+        reason = "unavailable"
+    elif isinstance(exc, Overloaded):
+        reason = "busy"
+    elif status_of(exc) == 429:
+        reason = "rate_limited"
+    else:
+        reason = "error"
+
+    if text == EMPTY_TEXT:
+        text = ""
+    return {
+        "result": local_improver.improve(text, field),
+        "degraded": True,
+        "reason": reason,
+    }
+
+
+async def acomplete_by(deadline, provider, key, field, system_prompt, text):
+    return await asyncio.wait_for(
+        acomplete(provider, key, field, system_prompt, text),
+        timeout=remaining(deadline),
+    )
+
+
+def _pooled(fn, *args):
+    # Pool threads live on between calls, like request threads
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+def complete_by(deadline, provider, key, field, system_prompt, text):
+    slots = _deadline_slots
+    if not slots.acquire(blocking=False):
+        raise Overloaded("Too many AI calls in progress")
+    try:
+        future = _deadline_pool.submit(_pooled, complete, provider, key, field, system_prompt, text)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+
+    try:
+        return future.result(timeout=remaining(deadline))
+    except TimeoutError:
+        # Still queued: drop it. Already running: let it fill the cache.
+        future.cancel()
+        raise
+
+
+async def astream_by(deadline, provider, key, field, system_prompt, text):
+    """:func:`astream` whose first delta must arrive before ``deadline``."""
+    deltas = astream(provider, key, field, system_prompt, text)
+    try:
+        try:
+            first = await asyncio.wait_for(deltas.__anext__(), timeout=remaining(deadline))
+        except StopAsyncIteration:
+            return
+        yield first
+        async for delta in deltas:
+            yield delta
+    finally:
+        await deltas.aclose()
+
+
+def stream_by(deadline, provider, key, field, system_prompt, text):
+    """Sync twin of :func:`astream_by`; the stream is read in a helper thread."""
+    items = queue.Queue()
+
+    def pump():
+        try:
+            for delta in stream(provider, key, field, system_prompt, text):
+                items.put((True, delta))
+        except Exception as e:
+            items.put((False, e))
+        else:
+            items.put((False, None))
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=pump, name="ai-stream", daemon=True).start()
+
+    timeout = remaining(deadline)
+    while True:
+        try:
+            is_delta, value = items.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("AI deadline exceeded")
+        if not is_delta:
+            if value is not None:
+                raise value
+            return
+        timeout = None
+        yield value
@@ -0,0 +1,306 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .clients import retry_budget
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+SAVED_KEY = "ai_singleflight_saved"
+POLL_INTERVAL = 0.05
+
+# key -> concurrent.futures.Future of the in-flight call. A thread-safe
+# future can be awaited from any event loop (asyncio.wrap_future) and
+# waited on from any thread, so WSGI threads, per-request loops and a
+# single ASGI loop all share the same table.
+_inflight = {}
+_inflight_lock = threading.Lock()
+_saved_here = 0
+
+
+# ===============================
+# HOST-WIDE LOCK (ACROSS WORKERS)
+# ===============================
+class HostLock:
+    """Non-blocking flock on a per-key file shared by all local workers."""
+
+    def __init__(self, key):
+        self.path = Path(settings.AI_SINGLEFLIGHT_DIR) / f"{key}.lock"
+        self.fd = None
+
+    def try_acquire(self):
+        if fcntl is None:
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        self.fd = fd
+        return True
+
+    def release(self, unlink=False):
+        if self.fd is None:
+            return
+        if unlink:
+            # Later callers start a fresh lock file; waiters already holding
+            # this one still get woken by the unlock below.
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+# ===============================
+# COALESCING
+# ===============================
+def _join_or_lead(key):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        _inflight[key] = future
+        return future, True
+
+
+def _finish(key):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+
+
+def _resolve(future, result):
+    # A leader can fail after publishing (e.g. its client goes away at the
+    # final yield); the first outcome wins.
+    if not future.done():
+        future.set_result(result)
+
+
+def _reject(future, exc):
+    if not future.done():
+        future.set_exception(_interrupted(exc))
+
+
+async def _afollow(future):
+    await asyncio.to_thread(_record_saved)
+    # Shielded: a follower whose client disconnects must not cancel the
+    # future the leader and the other followers are waiting on.
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+
+def _record_saved():
+    global _saved_here
+    with _inflight_lock:
+        _saved_here += 1
+    cache.add(SAVED_KEY, 0, timeout=None)
+    try:
+        cache.incr(SAVED_KEY)
+    except ValueError:
+        pass
+
+
+def _interrupted(exc):
+    # Followers must not receive GeneratorExit/CancelledError from a
+    # leader whose client went away.
+    if isinstance(exc, Exception):
+        return exc
+    return RuntimeError("The shared AI request was interrupted, please retry")
+
+
+async def acoalesce(key, compute, lookup):
+    """
+    Run ``compute()`` once for all concurrent callers with the same key.
+
+    Callers in this process share the leader's future. Across workers the
+    leader holds a host-wide file lock; other workers wait for it and then
+    read the result back through ``lookup()`` (the completion cache),
+    computing it themselves only if the leader failed.
+    """
+    future, leader = _join_or_lead(key)
+    if not leader:
+        return await _afollow(future)
+
+    try:
+        result = await _alead(key, compute, lookup)
+    except BaseException as e:
+        _reject(future, e)
+        raise
+    else:
+        _resolve(future, result)
+        return result
+    finally:
+        _finish(key)
+
+
+async def _alead(key, compute, lookup):
+    lock = HostLock(key)
+    if await asyncio.to_thread(lock.try_acquire):
+        try:
+            return await compute()
+        finally:
+            await asyncio.to_thread(lock.release, True)
+
+    result = await _await_other_worker(lock, lookup)
+    if result is not None:
+        return result
+    return await compute()
+
+
+async def _await_other_worker(lock, lookup):
+    # Another worker on this host is making the call; give it the whole
+    # retry budget before calling upstream ourselves. Lock attempts touch
+    # the filesystem, so they run off the event loop.
+    deadline = time.monotonic() + retry_budget()
+    while not await asyncio.to_thread(lock.try_acquire):
+        if time.monotonic() > deadline:
+            return None
+        await asyncio.sleep(POLL_INTERVAL)
+    await asyncio.to_thread(lock.release)
+
+    result = await lookup()
+    if result is not None:
+        await asyncio.to_thread(_record_saved)
+    return result
+
+
+async def acoalesce_stream(key, stream, lookup, store):
+    """
+    Streaming twin of :func:`acoalesce`.
+
+    The leader yields deltas from ``stream()`` as they arrive, then awaits
+    ``store(result)`` before publishing the joined result. Followers (and
+    other workers, through ``lookup()``) get the finished result as a
+    single chunk.
+    """
+    future, leader = _join_or_lead(key)
+    if not leader:
+        yield await _afollow(future)
+        return
+
+    lock = HostLock(key)
+    try:
+        if not await asyncio.to_thread(lock.try_acquire):
+            result = await _await_other_worker(lock, lookup)
+            if result is not None:
+                _resolve(future, result)
+                yield result
+                return
+
+        parts = []
+        async for delta in stream():
+            parts.append(delta)
+            yield delta
+
+        result = "".join(parts).strip()
+        await store(result)
+        _resolve(future, result)
+    except BaseException as e:
+        _reject(future, e)
+        raise
+    finally:
+        await asyncio.to_thread(lock.release, True)
+        _finish(key)
+
+
+def coalesce(key, compute, lookup):
+    """Thread-based twin of :func:`acoalesce` for sync views."""
+    future, leader = _join_or_lead(key)
+    if not leader:
+        _record_saved()
+        return future.result()
+
+    try:
+        result = _lead(key, compute, lookup)
+    except BaseException as e:
+        _reject(future, e)
+        raise
+    else:
+        _resolve(future, result)
+        return result
+    finally:
+        _finish(key)
+
+
+def _lead(key, compute, lookup):
+    lock = HostLock(key)
+    if lock.try_acquire():
+        try:
+            return compute()
+        finally:
+            lock.release(unlink=True)
+
+    result = _wait_other_worker(lock, lookup)
+    if result is not None:
+        return result
+    return compute()
+
+
+def _wait_other_worker(lock, lookup):
+    deadline = time.monotonic() + retry_budget()
+    while not lock.try_acquire():
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(POLL_INTERVAL)
+    lock.release()
+
+    result = lookup()
+    if result is not None:
+        _record_saved()
+    return result
+
+
+def coalesce_stream(key, stream, lookup, store):
+    """Thread-based twin of :func:`acoalesce_stream` for WSGI streaming."""
+    future, leader = _join_or_lead(key)
+    if not leader:
+        _record_saved()
+        yield future.result()
+        return
+
+    lock = HostLock(key)
+    try:
+        if not lock.try_acquire():
+            result = _wait_other_worker(lock, lookup)
+            if result is not None:
+                _resolve(future, result)
+                yield result
+                return
+
+        parts = []
+        for delta in stream():
+            parts.append(delta)
+            yield delta
+
+        result = "".join(parts).strip()
+        store(result)
+        _resolve(future, result)
+    except BaseException as e:
+        _reject(future, e)
+        raise
+    finally:
+        lock.release(unlink=True)
+        _finish(key)
+
+
+def coalesce_stats():
+    return {
+        "saved_calls": cache.get(SAVED_KEY, 0),
+        "saved_calls_this_process": _saved_here,
+        "in_flight": len(_inflight),
+    }
@@ -1,3 +1,980 @@
-from django.test import TestCase
+import asyncio
+import json
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from . import clients, completion_cache, fake_upstream, hedging, loadtest, providers, service
+from .clients import (
+    CircuitBreaker,
+    CircuitOpenError,
+    UpstreamError,
+    call_with_retries,
+    get_async_groq_client,
+)
+from .completion_cache import cache_stats, evict, get_completion, store_completion
+from .models import CompletionCache, CompletionCacheStats
+from .local_improver import improve
+from .hedging import ahedged_complete, ahedged_stream, hedge_delay
+from .providers import GroqProvider, Provider, get_provider
+from .ratelimit import Budget, batch_cost, field_cost, hit, rate_limit
+from .service import acomplete, astream, cache_key
+from .singleflight import HostLock, acoalesce, acoalesce_stream, coalesce, coalesce_stream
+
+
+def sse_events(response):
+    body = b"".join(response.streaming_content).decode()
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+@override_settings(
+    AI_PROVIDER="local",
+    AI_SINGLEFLIGHT_DIR=tempfile.mkdtemp(),
+)
+class LocalProviderImproveTests(TransactionTestCase):
+    # Streams under WSGI are read in a helper thread with its own connection
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.client.force_login(self.user)
+
+    def post(self, url, payload, **extra):
+        return self.client.post(
+            url, json.dumps(payload), content_type="application/json", **extra
+        )
+
+    def test_json_mode(self):
+        response = self.post(reverse("ai_resume_improve"), {
+            "field": "summary",
+            "text": "  built   things. \n\n shipped  them ",
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"result": "Built things. Shipped them."})
+        self.assertEqual(CompletionCache.objects.count(), 1)
+
+        again = self.post(reverse("ai_resume_improve"), {
+            "field": "summary",
+            "text": "built things.\nshipped them",
+        })
+        self.assertEqual(again.json(), {"result": "Built things. Shipped them.", "cached": True})
+
+    def test_stream_mode(self):
+        response = self.post(reverse("ai_resume_improve"), {
+            "field": "skills",
+            "text": "python  ,  django",
+            "stream": True,
+        })
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = sse_events(response)
+        self.assertEqual(events[0], ("token", {"text": "python\ndjango"}))
+        self.assertEqual(events[-1], ("done", {"result": "python\ndjango"}))
+        self.assertEqual(CompletionCache.objects.count(), 1)
+
+    def test_batch_mode(self):
+        response = self.post(reverse("ai_resume_improve_batch"), {"fields": {
+            "summary": "a  b",
+            "skills": "c",
+            "hobbies": "d",
+        }})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(results["summary"], {"result": "A b.", "cached": False})
+        self.assertEqual(results["skills"], {"result": "c", "cached": False})
+        self.assertIn("error", results["hobbies"])
+
+    def test_batch_rejects_non_text_values(self):
+        response = self.post(reverse("ai_resume_improve_batch"), {"fields": {"summary": 5}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("summary", response.json()["error"])
+
+    def test_batch_rejects_a_list_of_fields(self):
+        response = self.post(reverse("ai_resume_improve_batch"), {"fields": [{"a": 1}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_hides_internal_errors(self):
+        with mock.patch(
+            "ai_resume.providers.LocalProvider._acomplete",
+            side_effect=KeyError("secret detail"),
+        ), self.assertLogs("ai_resume.views", "WARNING"):
+            response = self.post(reverse("ai_resume_improve_batch"), {"fields": {"summary": "x"}})
+
+        self.assertEqual(
+            response.json()["results"]["summary"],
+            {"result": "X.", "degraded": True, "reason": "error"},
+        )
+
+    def test_non_text_field_is_rejected(self):
+        response = self.post(reverse("ai_resume_improve"), {"field": ["summary"], "text": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.post(reverse("ai_resume_improve"), {"text": "x"})
+        self.assertEqual(response.status_code, 302)
+
+
+class CompletionCacheTests(TestCase):
+
+    def setUp(self):
+        patchers = (
+            mock.patch.dict(completion_cache._pending, {"hits": 0, "misses": 0}),
+            mock.patch.object(completion_cache, "_writes", 0),
+        )
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_hits_and_misses_are_counted_in_the_database(self):
+        self.assertIsNone(get_completion("k1"))
+        store_completion("k1", "summary", "local", "Result")
+        self.assertEqual(get_completion("k1"), "Result")
+        self.assertEqual(get_completion("k1"), "Result")
+
+        stats = cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertEqual(stats["hit_ratio"], round(2 / 3, 4))
+
+    def test_uncounted_lookups_leave_the_ratio_alone(self):
+        get_completion("k1", count=False)
+        self.assertEqual(cache_stats()["misses"], 0)
+
+    def test_empty_results_are_not_cached(self):
+        store_completion("k1", "summary", "local", "")
+        self.assertFalse(CompletionCache.objects.exists())
+
+    def test_counters_reach_the_database_in_batches(self):
+        CompletionCacheStats.objects.create(id=completion_cache.STATS_ID)
+        with override_settings(AI_CACHE_STATS_FLUSH_EVERY=3, AI_CACHE_STATS_FLUSH_SECONDS=60):
+            with self.assertNumQueries(2):
+                get_completion("k1")
+                get_completion("k1")
+            # The third lookup flushes all three in one UPDATE
+            with self.assertNumQueries(2):
+                get_completion("k1")
+        self.assertEqual(CompletionCacheStats.objects.get().misses, 3)
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=1, AI_CACHE_EVICT_EVERY=3)
+    def test_eviction_runs_every_few_writes(self):
+        with mock.patch("ai_resume.completion_cache.evict") as evict_:
+            for key in ("a", "b", "c", "d"):
+                store_completion(key, "summary", "local", key.upper())
+        self.assertEqual(evict_.call_count, 1)
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=2, AI_CACHE_EVICT_EVERY=1)
+    def test_evicts_least_recently_used(self):
+        for key in ("a", "b", "c"):
+            store_completion(key, "summary", "local", key.upper())
+
+        self.assertEqual(
+            sorted(CompletionCache.objects.values_list("key", flat=True)),
+            ["b", "c"],
+        )
+        self.assertEqual(evict(), 0)
+
+
+# ===============================
+# FAKE UPSTREAM
+# ===============================
+class FakeGroq(BaseHTTPRequestHandler):
+    """OpenAI-style chat completions; records the client port of each call."""
+
+    protocol_version = "HTTP/1.1"
+    ports = []
+    statuses = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.ports.append(self.client_address[1])
+        status = self.statuses.pop(0) if self.statuses else 200
+
+        if status != 200:
+            self.reply(status, "application/json", b'{"error": {"message": "busy"}}')
+        elif body.get("stream"):
+            chunks = [
+                {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+                 "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                for word in ("fast ", "answer")
+            ]
+            data = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+            self.reply(200, "text/event-stream", data.encode())
+        else:
+            data = {"id": "c", "object": "chat.completion", "created": 0, "model": "m",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": " fast answer "}}]}
+            self.reply(200, "application/json", json.dumps(data).encode())
+
+    def reply(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeUpstreamMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGroq)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FakeGroq.ports.clear()
+        FakeGroq.statuses.clear()
+        clients._breakers.clear()
+        # Fresh clients bound to this server's base URL
+        for patcher in (
+            mock.patch.dict("os.environ", {"GROQ_API_KEY": "test"}),
+            mock.patch.dict(clients._local, {"pid": None}, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+# ===============================
+# CLIENTS: BREAKER, RETRIES, POOLING
+# ===============================
+class CircuitBreakerTests(SimpleTestCase):
+
+    def test_opens_after_threshold_then_lets_one_probe_through(self):
+        breaker = CircuitBreaker("test", threshold=2, reset_after=30)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.opened_at -= 30
+        self.assertEqual(breaker.state, "half-open")
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+
+@override_settings(AI_MAX_RETRIES=2, AI_BACKOFF_BASE=0, AI_BREAKER_THRESHOLD=5)
+class RetryTests(SimpleTestCase):
+
+    def setUp(self):
+        clients._breakers.clear()
+
+    def flaky(self, *statuses):
+        outcomes = list(statuses)
+
+        def call():
+            status = outcomes.pop(0)
+            if status != 200:
+                raise UpstreamError("busy", status_code=status)
+            return "ok"
+
+        return call
+
+    def test_retries_transient_errors(self):
+        self.assertEqual(call_with_retries("t", self.flaky(503, 429, 200)), "ok")
+
+    def test_gives_up_after_max_retries(self):
+        with self.assertRaises(UpstreamError):
+            call_with_retries("t", self.flaky(503, 503, 503, 200))
+
+    def test_client_errors_are_not_retried_and_do_not_trip_the_breaker(self):
+        call = self.flaky(400, 200)
+        with self.assertRaises(UpstreamError):
+            call_with_retries("t", call)
+        self.assertEqual(clients.get_breaker("t").failures, 0)
+
+    def test_retry_after_header_is_honoured(self):
+        exc = UpstreamError("busy", status_code=429, retry_after="1.5")
+        self.assertEqual(clients.backoff_delay(0, exc), 1.5)
+
+
+@override_settings(AI_MAX_RETRIES=1, AI_BACKOFF_BASE=0)
+class PooledAsyncClientTests(FakeUpstreamMixin, SimpleTestCase):
+
+    def test_wsgi_requests_share_one_client_and_connection(self):
+        with override_settings(GROQ_BASE_URL=self.base_url):
+            provider = GroqProvider("groq", {})
+
+            @async_to_sync
+            async def one_request():
+                # Each async_to_sync call runs on a brand-new event loop
+                return await provider.acomplete("system", "text"), get_async_groq_client()
+
+            first, client_a = one_request()
+            second, client_b = one_request()
+
+        self.assertEqual((first, second), ("fast answer", "fast answer"))
+        self.assertIs(client_a, client_b)
+        self.assertEqual(len(set(FakeGroq.ports)), 1)
+
+    def test_async_stream_and_retry(self):
+        FakeGroq.statuses.append(503)
+        with override_settings(GROQ_BASE_URL=self.base_url):
+            provider = GroqProvider("groq", {})
+
+            @async_to_sync
+            async def stream():
+                return [delta async for delta in provider.astream("system", "text")]
+
+            self.assertEqual(stream(), ["fast ", "answer"])
+        self.assertEqual(len(FakeGroq.ports), 2)
+
+
+# ===============================
+# RATE LIMITS
+# ===============================
+class BudgetTests(SimpleTestCase):
+
+    def setUp(self):
+        self.budget = Budget("ai:user", limit=10, window=10)
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        # Halfway through: 10 * 0.5 + 5 = 10, exactly at the limit
+        decision = self.budget.decide(previous=10, current=5, cost=1, elapsed=5)
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.remaining, 0)
+
+    def test_retry_after_waits_for_the_previous_window_to_decay(self):
+        # 10 * 0.5 + 6 = 11; at elapsed=6 it is 10 * 0.4 + 6 = 10
+        decision = self.budget.decide(previous=10, current=6, cost=1, elapsed=5)
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.retry_after, 1)
+
+    def test_retry_after_is_the_reset_when_this_window_alone_is_over(self):
+        decision = self.budget.decide(previous=0, current=11, cost=2, elapsed=3)
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.retry_after, 7)
+
+    def test_headers(self):
+        response = self.budget.decide(0, 11, 2, 3).apply_headers(JsonResponse({}))
+        self.assertEqual(response["X-RateLimit-Limit"], "10")
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+        self.assertEqual(response["Retry-After"], "7")
+
+
+@override_settings(AI_RATE_LIMITS={"user": [(3, 60)], "ip": [(4, 60)]})
+class HitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Stay inside one window so the previous window's weight is zero
+        patcher = mock.patch("ai_resume.ratelimit.time.time", return_value=1000.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_denied_calls_are_refunded(self):
+        idents = {"user": 1, "ip": "10.0.0.1"}
+        self.assertTrue(hit("ai", idents, 2).allowed)
+        self.assertFalse(hit("ai", idents, 2).allowed)
+        # The rejected 2 units were not kept, so 1 more still fits
+        self.assertTrue(hit("ai", idents, 1).allowed)
+        self.assertFalse(hit("ai", idents, 1).allowed)
+
+    def test_all_or_nothing_across_budgets(self):
+        self.assertTrue(hit("ai", {"user": 1, "ip": "10.0.0.1"}, 3).allowed)
+        # The shared IP budget denies user 2, whose own budget stays untouched
+        self.assertFalse(hit("ai", {"user": 2, "ip": "10.0.0.1"}, 3).allowed)
+        self.assertTrue(hit("ai", {"user": 2, "ip": "10.0.0.2"}, 3).allowed)
+
+
+@override_settings(AI_RATE_LIMITS={"user": [(2, 60)]}, AI_FIELD_COSTS={})
+class RateLimitDecoratorTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("ai_resume.ratelimit.time.time", return_value=1000.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.user = mock.Mock(pk=7, is_authenticated=True)
+
+    def request(self):
+        request = self.factory.post("/", "{}", content_type="application/json")
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        return request
+
+    def test_sync_view(self):
+        view = rate_limit()(lambda request: JsonResponse({"ok": True}))
+        statuses = [view(self.request()).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_async_view(self):
+        @rate_limit()
+        async def view(request):
+            return JsonResponse({"ok": True})
+
+        responses = [async_to_sync(view)(self.request()) for _ in range(3)]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual(responses[0]["X-RateLimit-Remaining"], "1")
+        self.assertIn("Retry-After", responses[2])
+
+    @override_settings(AI_FIELD_COSTS={"summary": 2})
+    def test_field_cost_charges_non_text_fields_the_base_rate(self):
+        def cost(payload):
+            return field_cost(self.factory.post("/", json.dumps(payload), content_type="application/json"))
+
+        self.assertEqual(cost({"field": "summary"}), 2)
+        self.assertEqual(cost({"field": ["summary"]}), 1)
+        self.assertEqual(cost({"field": {"a": 1}}), 1)
+
+    @override_settings(AI_FIELD_COSTS={"summary": 2})
+    def test_batch_cost_charges_malformed_batches_the_base_rate(self):
+        def cost(payload):
+            return batch_cost(self.factory.post("/", json.dumps(payload), content_type="application/json"))
+
+        self.assertEqual(cost({"fields": {"summary": "x", "skills": "y"}}), 3)
+        self.assertEqual(cost({"fields": [{"a": 1}]}), 1)
+        self.assertEqual(cost({"fields": "summary"}), 1)
+
+
+# ===============================
+# SINGLE-FLIGHT
+# ===============================
+@override_settings(AI_SINGLEFLIGHT_DIR=tempfile.mkdtemp())
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    async def compute(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def slow_stream(self):
+        self.calls += 1
+        for word in ("one ", "two"):
+            await asyncio.sleep(0.05)
+            yield word
+
+    async def nothing(self, *args):
+        return None
+
+    def test_concurrent_callers_share_one_call(self):
+        async def run():
+            return await asyncio.gather(*(
+                acoalesce("k", self.compute, self.nothing) for _ in range(5)
+            ))
+
+        self.assertEqual(async_to_sync(run)(), ["shared"] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_cancelled_follower_leaves_the_others_waiting(self):
+        async def run():
+            leader = asyncio.ensure_future(acoalesce("k", self.compute, self.nothing))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(acoalesce("k", self.compute, self.nothing)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            followers[0].cancel()
+            outcomes = await asyncio.gather(leader, *followers, return_exceptions=True)
+            return outcomes[0], outcomes[1], outcomes[2:]
+
+        leader, cancelled, others = async_to_sync(run)()
+        self.assertEqual(leader, "shared")
+        self.assertIsInstance(cancelled, asyncio.CancelledError)
+        self.assertEqual(others, ["shared", "shared"])
+        self.assertEqual(self.calls, 1)
+
+    def test_leader_errors_reach_followers(self):
+        async def broken():
+            await asyncio.sleep(0.05)
+            raise UpstreamError("down", status_code=503)
+
+        async def run():
+            return await asyncio.gather(
+                acoalesce("k", broken, self.nothing),
+                acoalesce("k", broken, self.nothing),
+                return_exceptions=True,
+            )
+
+        outcomes = async_to_sync(run)()
+        self.assertTrue(all(isinstance(o, UpstreamError) for o in outcomes))
+
+    def test_streams_are_coalesced_and_replayed(self):
+        stored = []
+
+        async def store(result):
+            stored.append(result)
+
+        async def collect():
+            return [d async for d in acoalesce_stream("k", self.slow_stream, self.nothing, store)]
+
+        async def run():
+            leader = asyncio.ensure_future(collect())
+            await asyncio.sleep(0.01)
+            return await asyncio.gather(leader, collect())
+
+        leader, follower = async_to_sync(run)()
+        self.assertEqual(leader, ["one ", "two"])
+        self.assertEqual(follower, ["one two"])
+        self.assertEqual((self.calls, stored), (1, ["one two"]))
+
+    def test_sync_stream_followers_in_other_threads(self):
+        def stream():
+            self.calls += 1
+            for word in ("one ", "two"):
+                time.sleep(0.05)
+                yield word
+
+        results = {}
+
+        def run(name):
+            results[name] = list(coalesce_stream("k", stream, lambda: None, lambda r: None))
+
+        leader = threading.Thread(target=run, args=("leader",))
+        leader.start()
+        time.sleep(0.01)
+        run("follower")
+        leader.join()
+
+        self.assertEqual(results, {"leader": ["one ", "two"], "follower": ["one two"]})
+        self.assertEqual(self.calls, 1)
+
+    def test_other_worker_result_is_read_back(self):
+        # Another worker holds the host lock while it calls upstream
+        other = HostLock("k")
+        self.assertTrue(other.try_acquire())
+        threading.Timer(0.1, other.release, kwargs={"unlink": True}).start()
+
+        result = coalesce("k", lambda: self.fail("called upstream twice"), lambda: "from worker")
+        self.assertEqual(result, "from worker")
+
+    @override_settings(
+        AI_MAX_RETRIES=0, AI_CONNECT_TIMEOUT=0.05, AI_READ_TIMEOUT=0.05, AI_BACKOFF_MAX=0
+    )
+    def test_waiters_give_up_after_the_retry_budget(self):
+        other = HostLock("k")
+        self.assertTrue(other.try_acquire())
+        self.addCleanup(other.release, unlink=True)
+
+        started = time.monotonic()
+        self.assertEqual(coalesce("k", lambda: "computed", lambda: None), "computed")
+        self.assertLess(time.monotonic() - started, 1)
+
+
+# ===============================
+# HEDGING
+# ===============================
+class ScriptedProvider(Provider):
+    """Answers after ``DELAY`` seconds, or fails when ``FAIL`` is set."""
+
+    def __init__(self, name, options):
+        super().__init__(name, options)
+        self.model = name
+        self.delay = options.get("DELAY", 0)
+        self.fail = options.get("FAIL", False)
+        self.cancelled = 0
+
+    async def _wait(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise UpstreamError("bad request", status_code=400)
+
+    async def _acomplete(self, system_prompt, text):
+        await self._wait()
+        return f"{self.name} answer"
+
+    def _complete(self, system_prompt, text):
+        time.sleep(self.delay)
+        if self.fail:
+            raise UpstreamError("bad request", status_code=400)
+        return f"{self.name} answer"
+
+    async def _astream(self, system_prompt, text):
+        await self._wait()
+
+        async def deltas():
+            yield self.name
+            yield " answer"
+
+        return deltas()
+
+
+def scripted(**providers_options):
+    return {
+        name: {"BACKEND": "ai_resume.tests.ScriptedProvider", **options}
+        for name, options in providers_options.items()
+    }
+
+
+@override_settings(
+    AI_HEDGE_ENABLED=True,
+    AI_HEDGE_PROVIDER="backup",
+    AI_HEDGE_DEFAULT_DELAY=0.05,
+    AI_HEDGE_MIN_DELAY=0.01,
+    AI_HEDGE_MIN_SAMPLES=5,
+    AI_HEDGE_QUANTILE=0.9,
+)
+class HedgingTests(SimpleTestCase):
+
+    def setUp(self):
+        clients._breakers.clear()
+        for patcher in (
+            mock.patch.dict(providers._providers, clear=True),
+            mock.patch.dict(hedging._counts, {"fired": 0, "won_by_backup": 0, "failovers": 0}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_complete(self):
+        return async_to_sync(ahedged_complete)(get_provider("primary"), "system", "text")
+
+    def test_fast_primary_is_not_hedged(self):
+        with override_settings(AI_PROVIDERS=scripted(primary={}, backup={})):
+            result, winner = self.run_complete()
+        self.assertEqual((result, winner.name), ("primary answer", "primary"))
+        self.assertEqual(hedging.hedge_stats()["fired"], 0)
+
+    def test_stalled_primary_loses_to_backup_and_is_cancelled(self):
+        with override_settings(AI_PROVIDERS=scripted(primary={"DELAY": 5}, backup={})):
+            started = time.monotonic()
+            result, winner = self.run_complete()
+            elapsed = time.monotonic() - started
+
+            self.assertEqual((result, winner.name), ("backup answer", "backup"))
+            self.assertLess(elapsed, 1)
+            self.assertEqual(get_provider("primary").cancelled, 1)
+        self.assertEqual(hedging.hedge_stats(), {"fired": 1, "won_by_backup": 1, "failovers": 0})
+
+    def test_failed_primary_fails_over(self):
+        with override_settings(AI_PROVIDERS=scripted(primary={"FAIL": True}, backup={})):
+            result, winner = self.run_complete()
+        self.assertEqual(winner.name, "backup")
+        self.assertEqual(hedging.hedge_stats()["failovers"], 1)
+
+    def test_both_failing_raises(self):
+        with override_settings(AI_PROVIDERS=scripted(primary={"FAIL": True}, backup={"FAIL": True})):
+            with self.assertRaises(UpstreamError):
+                self.run_complete()
+
+    def test_threshold_follows_the_latency_histogram(self):
+        with override_settings(AI_PROVIDERS=scripted(primary={}, backup={})):
+            provider = get_provider("primary")
+            self.assertEqual(hedge_delay(provider), 0.05)
+            for seconds in (0.1, 0.1, 0.1, 0.1, 0.3):
+                provider.stats.record(seconds, ok=True)
+            self.assertEqual(hedge_delay(provider), 0.3)
+
+    def test_stream_hedges_on_first_token(self):
+        with override_settings(AI_PROVIDERS=scripted(primary={"DELAY": 5}, backup={})):
+            @async_to_sync
+            async def collect():
+                return [d async for d in ahedged_stream(get_provider("primary"), "system", "text")]
+
+            self.assertEqual(collect(), ["backup", " answer"])
+            self.assertEqual(get_provider("primary").cancelled, 1)
+
+
+@override_settings(
+    AI_HEDGE_ENABLED=True,
+    AI_HEDGE_PROVIDER="backup",
+    AI_HEDGE_DEFAULT_DELAY=0.05,
+    AI_PROVIDERS=scripted(primary={"DELAY": 5}, backup={}),
+    AI_SINGLEFLIGHT_DIR=tempfile.mkdtemp(),
+)
+class HedgedCachingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clients._breakers.clear()
+        patcher = mock.patch.dict(providers._providers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.primary, self.backup = get_provider("primary"), get_provider("backup")
+        self.key = cache_key(self.primary, "summary", "text", "system")
+
+    def assert_filed_under_backup(self):
+        self.assertIsNone(get_completion(self.key, count=False))
+        backup_key = cache_key(self.backup, "summary", "text", "system")
+        self.assertEqual(get_completion(backup_key, count=False), "backup answer")
+
+    def test_backup_win_is_not_cached_as_the_primary_answer(self):
+        result = async_to_sync(acomplete)(self.primary, self.key, "summary", "system", "text")
+        self.assertEqual(result, "backup answer")
+        self.assert_filed_under_backup()
+
+    def test_streamed_backup_win_is_not_cached_as_the_primary_answer(self):
+        @async_to_sync
+        async def collect():
+            return [d async for d in astream(self.primary, self.key, "summary", "system", "text")]
+
+        self.assertEqual(collect(), ["backup", " answer"])
+        self.assert_filed_under_backup()
+
+
+# ===============================
+# DEADLINES AND DEGRADATION
+# ===============================
+class LocalImproverTests(SimpleTestCase):
+
+    def test_skills_one_per_line_without_duplicates(self):
+        self.assertEqual(
+            improve("Python, django ;  python\n- SQL | Docker.", "skills"),
+            "Python\ndjango\nSQL\nDocker",
+        )
+
+    def test_experience_bullets_and_action_verbs(self):
+        self.assertEqual(
+            improve("- worked on the billing API\n* I helped with onboarding\n3) fixed flaky tests;", "experience"),
+            "• Developed the billing API\n• Supported onboarding\n• Resolved flaky tests",
+        )
+
+    def test_education_keeps_wording(self):
+        self.assertEqual(improve("  b.sc. physics,   2019 ", "education"), "• B.sc. physics, 2019")
+
+    def test_summary_is_one_paragraph(self):
+        self.assertEqual(
+            improve("engineer with 5 years\n\nwas responsible for payments", "summary"),
+            "Engineer with 5 years was responsible for payments.",
+        )
+
+
+@override_settings(
+    AI_PROVIDER="slow",
+    AI_PROVIDERS=scripted(slow={"DELAY": 0.5}),
+    AI_DEADLINE=0.1,
+    AI_HEDGE_ENABLED=False,
+    AI_SINGLEFLIGHT_DIR=tempfile.mkdtemp(),
+)
+class DeadlineTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        clients._breakers.clear()
+        patcher = mock.patch.dict(providers._providers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(User.objects.create_user("ada", "ada@example.com", "pw"))
+
+    def post(self, url, payload):
+        return self.client.post(url, json.dumps(payload), content_type="application/json")
+
+    def test_json_answer_degrades_at_the_deadline(self):
+        started = time.monotonic()
+        response = self.post(reverse("ai_resume_improve"), {"field": "skills", "text": "a, b"})
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(response.json(), {"result": "a\nb", "degraded": True, "reason": "timeout"})
+        self.assertFalse(CompletionCache.objects.exists())
+
+    def test_stream_degrades_when_no_token_arrives(self):
+        response = self.post(reverse("ai_resume_improve"), {
+            "field": "experience", "text": "did the thing", "stream": True,
+        })
+        events = sse_events(response)
+        self.assertEqual(events[0], ("token", {"text": "• Delivered the thing"}))
+        self.assertEqual(events[-1][1]["degraded"], True)
+
+        # The late answer still lands in the cache for the next request
+        for thread in threading.enumerate():
+            if thread.name == "ai-stream":
+                thread.join()
+        self.assertEqual(CompletionCache.objects.get().result, "slow answer")
+
+    def test_batch_fields_degrade_independently(self):
+        response = self.post(reverse("ai_resume_improve_batch"), {"fields": {"skills": "x;y"}})
+        self.assertEqual(
+            response.json()["results"]["skills"],
+            {"result": "x\ny", "degraded": True, "reason": "timeout"},
+        )
+
+    @override_settings(AI_PROVIDERS=scripted(slow={"FAIL": True}))
+    def test_upstream_errors_degrade_too(self):
+        response = self.post(reverse("ai_resume_improve"), {"field": "summary", "text": "hi"})
+        self.assertEqual(response.json()["reason"], "error")
+
+
+class DeadlinePoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        for patcher in (
+            mock.patch.object(service, "_deadline_pool"),
+            mock.patch.object(service, "_deadline_slots", threading.BoundedSemaphore(2)),
+            mock.patch.object(service, "complete", side_effect=lambda *args: self.release.wait(5) and "late"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use_pool(self, workers):
+        pool = service._deadline_pool = ThreadPoolExecutor(max_workers=workers)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def complete_by(self, seconds=0.05):
+        return service.complete_by(time.monotonic() + seconds, None, "k", "summary", "system", "text")
+
+    def test_queued_calls_are_dropped_at_the_deadline(self):
+        pool = self.use_pool(1)
+        with self.assertRaises(TimeoutError):
+            self.complete_by()
+        # The first call still runs; the second never left the queue
+        with self.assertRaises(TimeoutError):
+            self.complete_by()
+        self.release.set()
+        pool.shutdown(wait=True)
+        self.assertEqual(service.complete.call_count, 1)
+
+    def test_fails_fast_once_every_slot_is_taken(self):
+        pool = self.use_pool(2)
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                self.complete_by(seconds=0.01)
+        started = time.monotonic()
+        with self.assertRaises(service.Overloaded) as caught:
+            self.complete_by(seconds=5)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(service.degraded("skills", "a, b", caught.exception)["reason"], "busy")
+
+        # Finished calls hand their slots back
+        self.release.set()
+        pool.shutdown(wait=True)
+        self.use_pool(1)
+        self.assertEqual(self.complete_by(), "late")
+
+
+# ===============================
+# FAKE UPSTREAM AND LOAD DRIVER
+# ===============================
+class FakeUpstreamServerTests(SimpleTestCase):
+
+    def serve(self, **behaviour):
+        behaviour.setdefault("distribution", "fixed")
+        behaviour.setdefault("median", 0)
+        server = fake_upstream.start_in_thread(fake_upstream.Behaviour(token_delay=0, **behaviour))
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        for patcher in (
+            mock.patch.dict("os.environ", {"GROQ_API_KEY": "fake"}),
+            mock.patch.dict(clients._local, {"pid": None}, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        clients._breakers.clear()
+        return server
+
+    def test_groq_provider_completes_and_streams(self):
+        server = self.serve(tokens=5)
+        with override_settings(GROQ_BASE_URL=server.base_url):
+            provider = GroqProvider("groq", {})
+            self.assertEqual(provider.complete("system", "built apis"), "built apis Delivered measurable results")
+            deltas = list(provider.stream("system", "built apis"))
+
+        self.assertEqual(deltas, ["built ", "apis ", "Delivered ", "measurable ", "results"])
+        self.assertEqual(server.stats.snapshot()["streams"], 1)
+
+    def test_huggingface_format(self):
+        server = self.serve(tokens=2)
+        provider = providers.HuggingFaceProvider("hf", {"URL": server.base_url + "/models/fake"})
+        self.assertEqual(provider.complete("Summarize:", "x"), "Summarize: x")
+
+    def test_429_bursts_carry_retry_after(self):
+        server = self.serve(burst_every=60, burst_length=59, retry_after=2.5)
+        response = httpx.post(server.base_url + "/openai/v1/chat/completions", json={"messages": []})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "2.5")
+        self.assertEqual(server.stats.snapshot()["throttled"], 1)
+
+    def test_error_rate(self):
+        server = self.serve(error_rate=1)
+        response = httpx.post(server.base_url + "/models/fake", json={"inputs": "x"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(httpx.get(server.base_url + "/stats").json()["errors"], 1)
+
+    def test_latency_distributions_respect_bounds(self):
+        uniform = fake_upstream.Behaviour("uniform", min_latency=0.1, max_latency=0.2, seed=1)
+        lognormal = fake_upstream.Behaviour("lognormal", median=1, sigma=2, max_latency=3, seed=1)
+        self.assertTrue(all(0.1 <= uniform.latency() <= 0.2 for _ in range(100)))
+        samples = [lognormal.latency() for _ in range(1000)]
+        self.assertEqual(max(samples), 3)
+        self.assertAlmostEqual(statistics.median(samples), 1, delta=0.3)
+        with self.assertRaises(ValueError):
+            fake_upstream.Behaviour("pareto")
+
+
+@override_settings(
+    AI_PROVIDER="local",
+    AI_SINGLEFLIGHT_DIR=tempfile.mkdtemp(),
+    AI_FIELD_COSTS={},
+)
+class LoadDriverTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reports_throughput_latency_and_cache_hits(self):
+        report = loadtest.run(3, requests=12, fields=["skills"], unique_ratio=0)
+
+        self.assertEqual(report["requests"], 12)
+        self.assertEqual(sum(report["outcomes"].values()), 12)
+        self.assertIn("cached", report["outcomes"])
+        self.assertGreater(report["throughput_rps"], 0)
+        self.assertLessEqual(report["latency_ms"]["p50"], report["latency_ms"]["max"])
+        self.assertIsNone(report["first_token_ms"])
+        self.assertEqual(User.objects.filter(username__startswith=loadtest.LOAD_PREFIX).count(), 3)
+
+    @override_settings(AI_RATE_LIMITS={"user": [(2, 60)]})
+    def test_rate_limited_share_and_retry_after(self):
+        with self.assertLogs("django.request", "WARNING"):
+            report = loadtest.run(2, requests=8, users=2)
+
+        self.assertEqual(report["outcomes"]["rate_limited"], 4)
+        self.assertEqual(report["rate_limited"]["share"], 0.5)
+        self.assertGreater(report["rate_limited"]["retry_after_s"]["min"], 0)
+
+    def test_streams_report_time_to_first_token(self):
+        report = loadtest.run(2, requests=4, stream=True)
+        self.assertEqual(report["outcomes"], {"ok": 4})
+        self.assertEqual(len(report["first_token_ms"]), 4)
+        self.assertEqual(loadtest.remove_users(), 2)
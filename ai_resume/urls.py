@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import ai_resume_improve
+from .views import ai_cache_stats, ai_resume_improve, ai_resume_improve_batch
 
 urlpatterns = [
     path("improve/", ai_resume_improve, name="ai_resume_improve"),
+    path("improve/batch/", ai_resume_improve_batch, name="ai_resume_improve_batch"),
+    path("cache/stats/", ai_cache_stats, name="ai_cache_stats"),
     
 ]
@@ -1,64 +1,244 @@
+import asyncio
 import json
-import os
-from django.http import JsonResponse
+import logging
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
-from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
-from groq import Groq
+from django.contrib.admin.views.decorators import staff_member_required
 
+from .completion_cache import aget_completion, cache_stats, normalize_text
+from .hedging import hedge_stats
+from .providers import get_provider, provider_stats
+from .ratelimit import batch_cost, rate_limit
+from .service import (
+    DEFAULT_PROMPT,
+    EMPTY_TEXT,
+    PROMPTS,
+    acomplete_by,
+    astream_by,
+    cache_key,
+    deadline,
+    degraded,
+    stream_by,
+)
+from .singleflight import coalesce_stats
 
-def get_groq_client():
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise RuntimeError("GROQ_API_KEY is not configured")
-    return Groq(api_key=api_key)
+logger = logging.getLogger(__name__)
 
 
-@require_POST
-@login_required
-def ai_resume_improve(request):
-    # ---- rate limit ----
-    rate_key = f"ai_limit_{request.user.id}"
-    if cache.get(rate_key, 0) >= 50:
-        return JsonResponse({"error": "Too many requests"}, status=429)
-    cache.set(rate_key, cache.get(rate_key, 0) + 1, timeout=60)
+# ===============================
+# ASYNC AUTH
+# ===============================
+def alogin_required(view):
+    # django.contrib.auth.decorators.login_required only learned to wrap
+    # coroutines in Django 5.1; resolve the user without blocking the loop.
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+# ===============================
+# STREAMING (SERVER-SENT EVENTS)
+# ===============================
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def stream_events(due, provider, key, field, system_prompt, text):
+    # WSGI: the handler iterates this in the request thread
+    parts = []
+    try:
+        for delta in stream_by(due, provider, key, field, system_prompt, text):
+            parts.append(delta)
+            yield sse_event("token", {"text": delta})
+    except Exception as e:
+        yield from failed_events(parts, field, text, e)
+        return
+
+    yield sse_event("done", {"result": "".join(parts).strip()})
+
+
+async def astream_events(due, provider, key, field, system_prompt, text):
+    # ASGI: Django would buffer a sync iterator completely before sending
+    # it, so read the provider stream natively on the event loop.
+    parts = []
+    try:
+        async for delta in astream_by(due, provider, key, field, system_prompt, text):
+            parts.append(delta)
+            yield sse_event("token", {"text": delta})
+    except Exception as e:
+        for event in failed_events(parts, field, text, e):
+            yield event
+        return
+
+    yield sse_event("done", {"result": "".join(parts).strip()})
+
+
+def failed_events(parts, field, text, exc):
+    if parts:
+        # Tokens already on screen can't be taken back
+        logger.warning("AI stream for %s broke off: %r", field, exc)
+        yield sse_event("error", {"error": "AI failed"})
+        return
+
+    logger.warning("AI stream for %s degraded: %r", field, exc)
+    payload = degraded(field, text, exc)
+    yield sse_event("token", {"text": payload["result"]})
+    yield sse_event("done", payload)
+
+
+def cached_events(result):
+    yield sse_event("token", {"text": result})
+    yield sse_event("done", {"result": result, "cached": True})
+
+
+async def acached_events(result):
+    for event in cached_events(result):
+        yield event
+
+
+def sse_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 
+def wants_stream(request, data):
+    return bool(data.get("stream")) or "text/event-stream" in request.headers.get("Accept", "")
+
+
+# ===============================
+# IMPROVE (ASYNC VIEW)
+# ===============================
+@require_POST
+@alogin_required
+@rate_limit(scope="ai")
+async def ai_resume_improve(request):
     # ---- parse JSON ----
     try:
         data = json.loads(request.body)
     except Exception:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    text = (data.get("text") or "").strip()
     field = data.get("field", "general")
+    if not isinstance(field, str):
+        return JsonResponse({"error": "field must be text"}, status=400)
+    text = normalize_text(data.get("text") or "")
 
     if not text:
-        text = "Generate professional resume content."
+        text = EMPTY_TEXT
+
+    system_prompt = PROMPTS.get(field, DEFAULT_PROMPT)
+    provider = get_provider()
+    due = deadline()
+
+    # ---- completion cache ----
+    key = cache_key(provider, field, text, system_prompt)
+    cached = await aget_completion(key)
+
+    if wants_stream(request, data):
+        is_asgi = isinstance(request, ASGIRequest)
+        if cached is not None:
+            return sse_response(acached_events(cached) if is_asgi else cached_events(cached))
+        if is_asgi:
+            return sse_response(astream_events(due, provider, key, field, system_prompt, text))
+        return sse_response(stream_events(due, provider, key, field, system_prompt, text))
 
-    PROMPTS = {
-        "skills": "Generate ATS-friendly resume skills, one per line.",
-        "education": "Rewrite education professionally, one entry per line.",
-        "experience": "Rewrite experience using action verbs and achievements.",
-        "summary": "Write a professional resume summary (3–4 lines).",
-    }
+    if cached is not None:
+        return JsonResponse({"result": cached, "cached": True})
 
-    system_prompt = PROMPTS.get(field, "Rewrite resume content professionally.")
+    # Late or failed upstream calls fall back to the rule-based improver
+    try:
+        result = await acomplete_by(due, provider, key, field, system_prompt, text)
+        return JsonResponse({"result": result})
+
+    except Exception as e:
+        logger.warning("AI improve for %s degraded: %r", field, e)
+        return JsonResponse(degraded(field, text, e))
 
+
+# ===============================
+# BATCH IMPROVE (WHOLE RESUME)
+# ===============================
+@require_POST
+@alogin_required
+@rate_limit(scope="ai", cost=batch_cost)
+async def ai_resume_improve_batch(request):
     try:
-        client = get_groq_client()
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text},
-            ],
-            temperature=0.6,
-            max_tokens=200,
+        data = json.loads(request.body)
+        fields = data["fields"]
+        if not isinstance(fields, dict):
+            raise ValueError
+    except Exception:
+        return JsonResponse({"error": "Expected {\"fields\": {field: text}}"}, status=400)
+
+    if not fields or len(fields) > len(PROMPTS):
+        return JsonResponse({"error": f"Send 1 to {len(PROMPTS)} fields"}, status=400)
+
+    not_text = sorted(
+        field for field, text in fields.items()
+        if text is not None and not isinstance(text, str)
+    )
+    if not_text:
+        return JsonResponse(
+            {"error": f"Field values must be text: {', '.join(not_text)}"},
+            status=400,
         )
 
-        return JsonResponse({
-            "result": completion.choices[0].message.content.strip()
-        })
+    # All fields go upstream at once under one deadline, so the batch takes
+    # as long as the slowest field; one failure doesn't sink the others.
+    due = deadline()
+    outcomes = await asyncio.gather(
+        *(aimprove_field(due, field, text) for field, text in fields.items()),
+        return_exceptions=True,
+    )
+
+    results = {}
+    for field, outcome in zip(fields, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("AI batch field %s failed", field, exc_info=outcome)
+            results[field] = {"error": "AI failed"}
+        else:
+            results[field] = outcome
+
+    return JsonResponse({"results": results})
+
 
+async def aimprove_field(due, field, text):
+    if field not in PROMPTS:
+        return {"error": f"Unknown field '{field}'"}
+
+    text = normalize_text(text or "") or EMPTY_TEXT
+    system_prompt = PROMPTS[field]
+    provider = get_provider()
+
+    key = cache_key(provider, field, text, system_prompt)
+    cached = await aget_completion(key)
+    if cached is not None:
+        return {"result": cached, "cached": True}
+
+    try:
+        result = await acomplete_by(due, provider, key, field, system_prompt, text)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        logger.warning("AI batch field %s degraded: %r", field, e)
+        return degraded(field, text, e)
+    return {"result": result, "cached": False}
+
+
+@staff_member_required
+def ai_cache_stats(request):
+    stats = cache_stats()
+    stats["coalescing"] = coalesce_stats()
+    stats["providers"] = provider_stats()
+    stats["hedging"] = hedge_stats()
+    return JsonResponse(stats)
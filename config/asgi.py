@@ -3,6 +3,15 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The AI endpoints (``ai_resume.views``) are native async views, so one ASGI
+worker can keep hundreds of upstream LLM calls in flight. Run with:
+
+    CONN_MAX_AGE=0 gunicorn config.asgi:application \
+        -k uvicorn.workers.UvicornWorker --workers 2
+
+Persistent DB connections must be disabled (CONN_MAX_AGE=0) under ASGI:
+sync ORM calls run in per-request threads and would leak connections.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,17 +40,23 @@ INSTALLED_APPS = [
     "dashboard",
     "resumes",
     "ai_resume",
+    "monitoring",
 ]
 
 # --------------------------------------------------
 # Middleware
 # --------------------------------------------------
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    "monitoring.middleware.MetricsMiddleware",
+    "monitoring.middleware.QueryInspectorMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Needs request.user; profiles everything from here to the view
+    "monitoring.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,9 +89,20 @@ WSGI_APPLICATION = "config.wsgi.application"
 DATABASES = {
     "default": dj_database_url.config(
         default=os.getenv("DATABASE_URL"),
-        conn_max_age=600,
+        # Set CONN_MAX_AGE=0 when serving through config/asgi.py
+        conn_max_age=int(os.environ.get("CONN_MAX_AGE", 600)),
     )
 }
+# --------------------------------------------------
+# Authentication
+# --------------------------------------------------
+# Email + password through one lookup on the lower(email) index;
+# username logins (the admin) fall through to ModelBackend.
+AUTHENTICATION_BACKENDS = [
+    "accounts.backends.EmailBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 # --------------------------------------------------
 # Password validation
 # --------------------------------------------------
@@ -112,6 +130,18 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Server-rendered resume PDFs, keyed on (resume id, updated_at, template, color)
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", BASE_DIR / "pdf_cache")
+
+# Rendered resume HTML kept per worker process (LRU)
+RESUME_RENDER_CACHE_SIZE = int(os.environ.get("RESUME_RENDER_CACHE_SIZE", 256))
+
+# Base URL the pdf_worker resolves relative asset links against
+PDF_BASE_URL = os.environ.get("PDF_BASE_URL")
+
+# Resume cards per "My Resumes" page
+RESUME_LIST_PAGE_SIZE = int(os.environ.get("RESUME_LIST_PAGE_SIZE", 24))
+
 # --------------------------------------------------
 # Auth redirects
 # --------------------------------------------------
@@ -143,3 +173,163 @@ CKEDITOR_CONFIGS = {
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 STRIPE_PUBLIC_KEY = os.environ.get("STRIPE_PUBLIC_KEY")
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY")
+
+# --------------------------------------------------
+# AI completion cache (ai_resume.completion_cache)
+# --------------------------------------------------
+AI_CACHE_TTL = int(os.environ.get("AI_CACHE_TTL", 7 * 24 * 3600))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", 10000))
+AI_CACHE_MAX_BYTES = int(os.environ.get("AI_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+# Eviction sweeps run every N writes per worker, not on each one
+AI_CACHE_EVICT_EVERY = int(os.environ.get("AI_CACHE_EVICT_EVERY", 50))
+# Hit/miss counters reach the database every N lookups or N seconds
+AI_CACHE_STATS_FLUSH_EVERY = int(os.environ.get("AI_CACHE_STATS_FLUSH_EVERY", 100))
+AI_CACHE_STATS_FLUSH_SECONDS = float(os.environ.get("AI_CACHE_STATS_FLUSH_SECONDS", 10))
+
+# --------------------------------------------------
+# AI provider clients (ai_resume.clients)
+# --------------------------------------------------
+# Point these at a local fake server to test without API credits
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL")
+HF_API_URL = os.environ.get(
+    "HF_API_URL",
+    "https://api-inference.huggingface.co/models/facebook/bart-large-cnn",
+)
+
+AI_CONNECT_TIMEOUT = float(os.environ.get("AI_CONNECT_TIMEOUT", 3.0))
+AI_READ_TIMEOUT = float(os.environ.get("AI_READ_TIMEOUT", 20.0))
+AI_POOL_SIZE = int(os.environ.get("AI_POOL_SIZE", 20))
+
+AI_MAX_RETRIES = int(os.environ.get("AI_MAX_RETRIES", 2))
+AI_BACKOFF_BASE = float(os.environ.get("AI_BACKOFF_BASE", 0.25))
+AI_BACKOFF_MAX = float(os.environ.get("AI_BACKOFF_MAX", 4.0))
+
+AI_BREAKER_THRESHOLD = int(os.environ.get("AI_BREAKER_THRESHOLD", 5))
+AI_BREAKER_RESET = float(os.environ.get("AI_BREAKER_RESET", 30.0))
+
+# Lock files that let workers on one host share identical in-flight calls
+AI_SINGLEFLIGHT_DIR = os.environ.get(
+    "AI_SINGLEFLIGHT_DIR",
+    os.path.join(tempfile.gettempdir(), "ai_resume_singleflight"),
+)
+
+# --------------------------------------------------
+# AI providers (ai_resume.providers)
+# --------------------------------------------------
+# "local" needs no network or API key (tests, benchmarks, offline dev)
+AI_PROVIDER = os.environ.get("AI_PROVIDER", "groq")
+AI_PROVIDERS = {
+    "groq": {
+        "BACKEND": "ai_resume.providers.GroqProvider",
+        "MODEL": os.environ.get("GROQ_MODEL", "llama-3.1-8b-instant"),
+        "TEMPERATURE": 0.6,
+        "MAX_TOKENS": 200,
+    },
+    "huggingface": {
+        "BACKEND": "ai_resume.providers.HuggingFaceProvider",
+        "URL": HF_API_URL,
+        "TOKEN": os.environ.get("HF_API_TOKEN"),
+    },
+    "local": {
+        "BACKEND": "ai_resume.providers.LocalProvider",
+    },
+}
+
+# Seconds a suggestion may take (first token when streaming) before the
+# rule-based improver answers instead
+AI_DEADLINE = float(os.environ.get("AI_DEADLINE", 8.0))
+# Sync (WSGI) calls allowed to be queued or running past their deadline at
+# once; beyond that the rule-based improver answers straight away
+AI_DEADLINE_MAX_PENDING = int(os.environ.get("AI_DEADLINE_MAX_PENDING", 64))
+
+# Hedging: if the provider hasn't answered within its recent p90, send the
+# same prompt to AI_HEDGE_PROVIDER ("" = the same provider) and keep the
+# first answer. Until AI_HEDGE_MIN_SAMPLES calls are recorded the default
+# delay applies.
+AI_HEDGE_ENABLED = os.environ.get("AI_HEDGE_ENABLED", "True") == "True"
+AI_HEDGE_PROVIDER = os.environ.get("AI_HEDGE_PROVIDER", "")
+AI_HEDGE_QUANTILE = float(os.environ.get("AI_HEDGE_QUANTILE", 0.9))
+AI_HEDGE_MIN_SAMPLES = int(os.environ.get("AI_HEDGE_MIN_SAMPLES", 20))
+AI_HEDGE_DEFAULT_DELAY = float(os.environ.get("AI_HEDGE_DEFAULT_DELAY", 2.0))
+AI_HEDGE_MIN_DELAY = float(os.environ.get("AI_HEDGE_MIN_DELAY", 0.2))
+
+# --------------------------------------------------
+# Metrics (monitoring)
+# --------------------------------------------------
+# Each worker writes its totals here; /metrics adds up every file
+METRICS_DIR = os.environ.get(
+    "METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), "ai_resume_metrics"),
+)
+# Longest a worker's file may lag its in-memory counters
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1.0))
+# Scrapers must send "Authorization: Bearer <token>"; left empty, /metrics
+# is only served with DEBUG on
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# --------------------------------------------------
+# Query inspector (monitoring.querylog)
+# --------------------------------------------------
+# Opt-in: records every statement of a sample of requests and logs
+# repeated (N+1) and slow ones to the "monitoring.querylog" logger
+QUERY_INSPECTOR_ENABLED = os.environ.get("QUERY_INSPECTOR_ENABLED", "False") == "True"
+QUERY_INSPECTOR_SAMPLE_RATE = float(os.environ.get("QUERY_INSPECTOR_SAMPLE_RATE", 1.0))
+QUERY_INSPECTOR_SLOW_MS = float(os.environ.get("QUERY_INSPECTOR_SLOW_MS", 100))
+QUERY_INSPECTOR_REPEAT_THRESHOLD = int(os.environ.get("QUERY_INSPECTOR_REPEAT_THRESHOLD", 3))
+QUERY_INSPECTOR_STACK_DEPTH = int(os.environ.get("QUERY_INSPECTOR_STACK_DEPTH", 5))
+
+# --------------------------------------------------
+# Request profiler (monitoring.profiling)
+# --------------------------------------------------
+# Staff profile any page by adding ?__profile (or ?__profile=sampler);
+# PROFILER_SAMPLE_RATE profiles a share of all requests as well. Results
+# are under Monitoring > Request profiles in the admin.
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "True") == "True"
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", 0.0))
+# "cprofile" (every call, slower) or "sampler" (stack snapshots, wall clock)
+PROFILER_MODE = os.environ.get("PROFILER_MODE", "cprofile")
+PROFILER_SAMPLE_INTERVAL = float(os.environ.get("PROFILER_SAMPLE_INTERVAL", 0.005))
+# Older profiles are deleted as new ones arrive
+PROFILER_KEEP = int(os.environ.get("PROFILER_KEEP", 500))
+
+# --------------------------------------------------
+# Cache (config.sqlite_cache)
+# --------------------------------------------------
+# One SQLite file shared by every worker on the host, so rate limits and
+# cached values agree across gunicorn workers. `manage.py bench_cache`
+# compares it with LocMem and the database cache.
+CACHE_PATH = os.environ.get(
+    "CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "ai_resume_cache.sqlite3"),
+)
+CACHES = {
+    "default": {
+        "BACKEND": "config.sqlite_cache.SQLiteCache",
+        "LOCATION": CACHE_PATH,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 50000)),
+        },
+    }
+}
+# `manage.py test` points the default cache at a per-run file instead
+TEST_RUNNER = "config.test_runner.TestRunner"
+
+# --------------------------------------------------
+# AI rate limits (ai_resume.ratelimit)
+# --------------------------------------------------
+# (cost units, seconds) sliding windows; the short one is the burst allowance
+AI_RATE_LIMITS = {
+    "user": [(10, 10), (50, 60)],
+    "ip": [(150, 60)],
+}
+
+# Cost of one call per field: long experience rewrites use the most tokens
+AI_FIELD_COSTS = {
+    "experience": 3,
+    "summary": 2,
+    "education": 2,
+    "skills": 1,
+}
+
+# Trust the right-most X-Forwarded-For entry (set by Render's proxy)
+AI_RATE_LIMIT_TRUST_PROXY = os.environ.get("AI_RATE_LIMIT_TRUST_PROXY", "True") == "True"
@@ -0,0 +1,229 @@
+"""
+A Django cache backend shared by every worker on one host, without Redis.
+
+Entries live in one SQLite file in WAL mode: readers never wait for the
+writer, and a write is a single short transaction, so a get or an incr
+costs tens of microseconds. Integers are stored as SQLite integers so
+``incr`` is one ``UPDATE ... RETURNING`` statement, atomic across
+processes. Expired rows are ignored on read and removed when the table
+is culled, which happens every ``CULL_EVERY`` writes once it holds more
+than ``MAX_ENTRIES`` rows.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "config.sqlite_cache.SQLiteCache",
+            "LOCATION": "/var/tmp/ai_resume_cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 50000},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    " key TEXT PRIMARY KEY,"
+    " value BLOB NOT NULL,"
+    " expires REAL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+)
+
+# Rows that are still live at ?
+LIVE = "(expires IS NULL OR expires > ?)"
+
+
+def _encode(value):
+    # Plain ints stay SQL integers so incr can do the arithmetic in SQL
+    if type(value) is int and -(2 ** 63) <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        if sqlite3.sqlite_version_info < (3, 35):
+            raise ImproperlyConfigured("SQLiteCache needs SQLite 3.35+ (UPDATE ... RETURNING)")
+        self.path = location
+        options = params.get("OPTIONS", {})
+        self.busy_timeout = float(options.get("BUSY_TIMEOUT", 5.0))
+        self.mmap_size = int(options.get("MMAP_SIZE", 64 * 1024 * 1024))
+        self.cull_every = int(options.get("CULL_EVERY", 100))
+        self._local = threading.local()
+
+    # ===============================
+    # CONNECTIONS
+    # ===============================
+    def _connection(self):
+        # One connection per thread, and never one inherited across a fork
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            # A cache can lose its last writes in a power cut; it can't be slow
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            for statement in SCHEMA:
+                db.execute(statement)
+            local.db, local.pid, local.writes = db, os.getpid(), 0
+        return local.db
+
+    def _wrote(self, db, count=1):
+        local = self._local
+        local.writes += count
+        if local.writes >= self.cull_every:
+            local.writes = 0
+            self._cull(db)
+
+    # ===============================
+    # READS
+    # ===============================
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            f"SELECT value FROM cache WHERE key = ? AND {LIVE}", (key, time.time())
+        ).fetchone()
+        return default if row is None else _decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        marks = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({marks}) AND {LIVE}",
+            (*keys, time.time()),
+        )
+        return {keys[key]: _decode(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            f"SELECT 1 FROM cache WHERE key = ? AND {LIVE}", (key, time.time())
+        ).fetchone() is not None
+
+    # ===============================
+    # WRITES
+    # ===============================
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._connection()
+        db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, _encode(value), self.get_backend_timeout(timeout)),
+        )
+        self._wrote(db)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._connection()
+        now = time.time()
+        # Inserts, or takes over a row that has expired but not been culled
+        cursor = db.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, _encode(value), self.get_backend_timeout(timeout), now),
+        )
+        self._wrote(db)
+        return cursor.rowcount == 1
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self.make_and_validate_key(key, version=version), _encode(value), expires)
+            for key, value in data.items()
+        ]
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)", rows)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        self._wrote(db, len(rows))
+        return []
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # One statement, so concurrent workers can't lose an increment
+        row = self._connection().execute(
+            f"UPDATE cache SET value = value + ? "
+            f"WHERE key = ? AND typeof(value) = 'integer' AND {LIVE} RETURNING value",
+            (delta, key, time.time()),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found or not an integer")
+        return row[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            f"UPDATE cache SET expires = ? WHERE key = ? AND {LIVE}",
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            marks = ",".join("?" * len(keys))
+            self._connection().execute(f"DELETE FROM cache WHERE key IN ({marks})", keys)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Called after every request; the connection is worth keeping
+        pass
+
+    # ===============================
+    # CULLING
+    # ===============================
+    def _cull(self, db):
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+            if count > self._max_entries:
+                if self._cull_frequency == 0:
+                    db.execute("DELETE FROM cache")
+                else:
+                    # Soonest to expire go first; keys without a timeout last
+                    db.execute(
+                        "DELETE FROM cache WHERE key IN ("
+                        " SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?"
+                        ")",
+                        (max(count - self._max_entries, count // self._cull_frequency),),
+                    )
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def entry_count(self):
+        """Live entries, for stats and the cache benchmark."""
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM cache WHERE {LIVE}", (time.time(),)
+        ).fetchone()[0]
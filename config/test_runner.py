@@ -0,0 +1,28 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner with a throwaway default cache.
+
+    The SQLite cache file at CACHE_PATH is shared with the running site,
+    and tests call ``cache.clear()``; each test run gets its own file.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix="ai-resume-test-cache-")
+        default = {**settings.CACHES["default"], "LOCATION": str(Path(self.cache_dir) / "cache.sqlite3")}
+        self.cache_override = override_settings(CACHES={**settings.CACHES, "default": default})
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
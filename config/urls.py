@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from accounts.views import home
+from monitoring.views import metrics_view
 
 urlpatterns = [
     path("", home, name="home"),              # Home
@@ -12,6 +13,9 @@ urlpatterns = [
     path("resume/", include("resumes.urls")),
     path("ai/", include("ai_resume.urls")),
 
+    # Prometheus scrape target
+    path("metrics", metrics_view, name="metrics"),
+
     # CKEditor
     path("ckeditor/", include("ckeditor_uploader.urls")),
 ]
@@ -0,0 +1,49 @@
+from django.contrib import admin
+from django.utils.html import format_html
+
+from . import profiling
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "view", "status", "duration_ms", "queries", "resume_id", "template", "mode", "trigger")
+    list_filter = ("view", "mode", "trigger", "template")
+    search_fields = ("path",)
+    date_hierarchy = "created_at"
+    fields = (
+        ("view", "method", "path", "status"),
+        ("resume_id", "template", "user"),
+        ("mode", "trigger", "duration_ms", "queries", "created_at"),
+        "flame_graph",
+        "call_tree_view",
+        "stats_text_view",
+    )
+    readonly_fields = fields[0] + fields[1] + fields[2] + fields[3:]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith("changelist"):
+            # The list never shows the (large) trees
+            queryset = queryset.defer("call_tree", "stats_text")
+        return queryset
+
+    @admin.display(description="Flame graph")
+    def flame_graph(self, obj):
+        return profiling.flame_svg(obj.call_tree)
+
+    @admin.display(description="Call tree")
+    def call_tree_view(self, obj):
+        return profiling.call_tree_html(obj.call_tree)
+
+    @admin.display(description="cProfile stats")
+    def stats_text_view(self, obj):
+        if not obj.stats_text:
+            return "-"
+        return format_html('<pre style="white-space: pre; overflow-x: auto">{}</pre>', obj.stats_text)
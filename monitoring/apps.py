@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    name = "monitoring"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import querylog
+        from .middleware import install_query_timer
+
+        connection_created.connect(install_query_timer)
+        connection_created.connect(querylog.install)
@@ -0,0 +1,454 @@
+"""
+Synthetic data and repeatable benchmarks for the resume views.
+
+``seed`` fills the database with bench users and resumes whose sections
+look like real CKEditor output; ``run`` drives the views in-process with
+Django's test client and reports latency percentiles, queries per request
+(repeated and slow ones flagged by ``monitoring.querylog``) and peak RSS
+per scenario. Both are wrapped by the ``seed_bench`` and
+``run_bench`` management commands.
+"""
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import time
+import uuid
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from resumes.models import PdfJob, Resume, UserProfile
+
+from . import querylog
+
+USER_PREFIX = "bench-user-"
+POWER_PREFIX = "bench-power-"
+REGISTER_PREFIX = "bench-reg-"
+BENCH_PASSWORD = "Bench-pass-1!"
+
+
+# ===============================
+# CKEDITOR-LIKE CONTENT
+# ===============================
+FIRST_NAMES = ["Ada", "Grace", "Alan", "Linus", "Margaret", "Dennis", "Barbara", "Ken", "Radia", "Guido"]
+LAST_NAMES = ["Lovelace", "Hopper", "Turing", "Torvalds", "Hamilton", "Ritchie", "Liskov", "Thompson"]
+TITLES = [
+    "Software Engineer", "Senior Backend Developer", "Data Analyst", "Product Manager",
+    "DevOps Engineer", "Frontend Developer", "QA Lead", "Machine Learning Engineer",
+]
+COMPANIES = ["Acme Corp", "Initech", "Globex", "Umbrella Labs", "Hooli", "Stark Industries", "Wayne Tech"]
+SCHOOLS = ["MIT", "Stanford University", "IIT Delhi", "University of Toronto", "ETH Zurich"]
+DEGREES = ["B.Sc Computer Science", "B.Tech Information Technology", "M.Sc Data Science", "MBA"]
+SKILLS = [
+    "Python", "Django", "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS", "React",
+    "TypeScript", "GraphQL", "Celery", "Terraform", "Go", "Pandas", "Airflow", "CI/CD",
+]
+VERBS = ["Built", "Led", "Designed", "Migrated", "Automated", "Reduced", "Scaled", "Shipped"]
+OBJECTS = [
+    "a billing service handling 2M requests a day",
+    "the nightly ETL pipeline from cron to Airflow",
+    "p95 checkout latency by 40% through query tuning",
+    "a design system used by six product teams",
+    "on-call runbooks and alerting for 30 services",
+    "the monolith's auth layer onto OAuth2",
+]
+
+# What CKEditor 4 wraps every run of text in
+SPAN = '<span style="font-size:14px"><span style="font-family:Arial,Helvetica,sans-serif">{}</span></span>'
+
+
+def _para(text):
+    return "<p>" + SPAN.format(text) + "</p>\r\n"
+
+
+def summary_html(rng):
+    sentences = [
+        f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience.",
+        f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}.",
+        f"Comfortable across {', '.join(rng.sample(SKILLS, 4))}.",
+    ]
+    return "".join(_para(s) for s in sentences) + "<p>&nbsp;</p>\r\n"
+
+
+def skills_html(rng):
+    items = "".join(f"\t<li>{SPAN.format(s)}</li>\r\n" for s in rng.sample(SKILLS, rng.randint(6, 12)))
+    return f"<ul>\r\n{items}</ul>\r\n"
+
+
+def experience_html(rng):
+    jobs = []
+    year = 2024
+    for _ in range(rng.randint(2, 5)):
+        start = year - rng.randint(1, 4)
+        bullets = "".join(
+            f"\t<li>{SPAN.format(f'{rng.choice(VERBS)} {rng.choice(OBJECTS)}')}</li>\r\n"
+            for _ in range(rng.randint(3, 6))
+        )
+        jobs.append(
+            f"<p><strong>{rng.choice(TITLES)}</strong> at {rng.choice(COMPANIES)} ({start} - {year})</p>\r\n"
+            f"<ul>\r\n{bullets}</ul>\r\n<p>&nbsp;</p>\r\n"
+        )
+        year = start
+    return "".join(jobs)
+
+
+def education_html(rng):
+    return "".join(
+        _para(f"{rng.choice(DEGREES)}, {rng.choice(SCHOOLS)}, {2005 + n * 4}-{2009 + n * 4}")
+        for n in range(rng.randint(1, 3))
+    )
+
+
+def section_variants(rng, count):
+    """
+    ``count`` distinct resumes' worth of sections, compiled once.
+
+    Rows reuse these, so seeding a million resumes doesn't run the
+    sanitizer a million times.
+    """
+    derived = [f"{name}_html" for name in Resume.RICH_TEXT_FIELDS] + ["structured"]
+    variants = []
+    for _ in range(count):
+        resume = Resume(
+            summary=summary_html(rng),
+            skills=skills_html(rng),
+            experience=experience_html(rng),
+            education=education_html(rng),
+        )
+        resume.compile_rich_text()
+        variants.append({
+            name: getattr(resume, name) for name in Resume.RICH_TEXT_FIELDS + tuple(derived)
+        })
+    return variants
+
+
+# ===============================
+# SEEDING
+# ===============================
+def _bulk_users(usernames, password_hash, batch_size):
+    users = User.objects.bulk_create(
+        (User(username=name, email=f"{name}@example.com", password=password_hash) for name in usernames),
+        batch_size=batch_size,
+    )
+    # bulk_create skips the post_save signal that makes profiles
+    UserProfile.objects.bulk_create(
+        (UserProfile(user=user) for user in users), batch_size=batch_size
+    )
+    return users
+
+
+def _bulk_resumes(users_and_counts, variants, rng, batch_size):
+    created = 0
+    batch = []
+    for user, count in users_and_counts:
+        for _ in range(count):
+            batch.append(Resume(
+                user=user,
+                full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                email=user.email,
+                phone=f"+1 555 {rng.randint(1000000, 9999999)}",
+                template=rng.choice([c[0] for c in Resume.TEMPLATE_CHOICES]),
+                **rng.choice(variants),
+            ))
+            if len(batch) >= batch_size:
+                Resume.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+    if batch:
+        Resume.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def seed(users, resumes_per_user=1, power_users=0, power_resumes=0,
+         batch_size=2000, variants=200, random_seed=0, log=print):
+    rng = random.Random(random_seed)
+    pool = section_variants(rng, variants)
+    password_hash = make_password(BENCH_PASSWORD)
+    start = User.objects.filter(username__startswith=USER_PREFIX).count()
+
+    total_resumes = 0
+    for offset in range(0, users, batch_size):
+        names = [f"{USER_PREFIX}{start + n}" for n in range(offset, min(users, offset + batch_size))]
+        created = _bulk_users(names, password_hash, batch_size)
+        total_resumes += _bulk_resumes(
+            ((user, resumes_per_user) for user in created), pool, rng, batch_size
+        )
+        log(f"  {offset + len(names)}/{users} users, {total_resumes} resumes")
+
+    if power_users:
+        power_start = User.objects.filter(username__startswith=POWER_PREFIX).count()
+        names = [f"{POWER_PREFIX}{power_start + n}" for n in range(power_users)]
+        created = _bulk_users(names, password_hash, batch_size)
+        total_resumes += _bulk_resumes(
+            ((user, power_resumes) for user in created), pool, rng, batch_size
+        )
+        log(f"  {power_users} power users with {power_resumes} resumes each")
+
+    return {"users": users + power_users, "resumes": total_resumes}
+
+
+def _delete_users_like(pattern):
+    # Raw deletes: a Collector walk over a million resumes takes longer
+    # than seeding them did.
+    qn = connection.ops.quote_name
+    users = f"SELECT id FROM {qn(User._meta.db_table)} WHERE {qn('username')} LIKE %s"
+    with connection.cursor() as cursor:
+        for model in (PdfJob, Resume, UserProfile):
+            cursor.execute(
+                f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn('user_id')} IN ({users})",
+                [pattern],
+            )
+        cursor.execute(f"DELETE FROM {qn(User._meta.db_table)} WHERE {qn('username')} LIKE %s", [pattern])
+        return cursor.rowcount
+
+
+def clear():
+    """Remove every bench user and everything they own."""
+    return sum(
+        _delete_users_like(prefix + "%")
+        for prefix in (USER_PREFIX, POWER_PREFIX, REGISTER_PREFIX)
+    )
+
+
+# ===============================
+# SCENARIOS
+# ===============================
+class BenchData:
+    """Ids the scenarios pick from, sampled once per run."""
+
+    def __init__(self, rng, sample_size=2000):
+        resumes = Resume.objects.filter(user__username__startswith=USER_PREFIX).order_by()
+        self.resumes = list(resumes.values_list("id", "user_id")[:sample_size])
+        power = Resume.objects.filter(user__username__startswith=POWER_PREFIX).order_by()
+        self.power_user_id = power.values_list("user_id", flat=True).first()
+        self.power_resume_ids = list(power.values_list("id", flat=True)[:sample_size])
+        if not self.resumes:
+            raise ValueError("No bench data: run `manage.py seed_bench` first")
+        self.users = {
+            user.id: user for user in User.objects.filter(
+                id__in={user_id for _, user_id in self.resumes} | {self.power_user_id}
+            )
+        }
+        self.rng = rng
+
+    def resume(self):
+        return self.rng.choice(self.resumes)
+
+
+def _owner_client(data, user_id):
+    client = Client()
+    client.force_login(data.users[user_id])
+    return client
+
+
+def resume_public(data):
+    client = Client()
+
+    def step():
+        resume_id, _ = data.resume()
+        return client.get(reverse("resumes:resume_public", args=[resume_id]))
+    return step, {200}
+
+
+def resume_preview(data):
+    resume_id, user_id = data.resume()
+    client = _owner_client(data, user_id)
+    templates = [c[0] for c in Resume.TEMPLATE_CHOICES]
+
+    def step():
+        url = reverse("resumes:resume_preview", args=[resume_id])
+        return client.get(url, {"template": data.rng.choice(templates)})
+    return step, {200}
+
+
+def my_resumes(data):
+    user_id = data.power_user_id or data.resume()[1]
+    client = _owner_client(data, user_id)
+    cursors = data.power_resume_ids or [None]
+
+    def step():
+        # Half first pages, half somewhere deep in the list
+        params = {}
+        if data.rng.random() < 0.5:
+            params["after"] = data.rng.choice(cursors)
+        return client.get(reverse("resumes:my_resumes"), {k: v for k, v in params.items() if v})
+    return step, {200}
+
+
+def edit_resume(data):
+    resume_id, user_id = data.resume()
+    client = _owner_client(data, user_id)
+    resume = Resume.objects.get(id=resume_id)
+    url = reverse("resumes:edit_resume", args=[resume_id])
+
+    def step():
+        # Touch one section per save, the way the editor is used
+        return client.post(url, {
+            "full_name": resume.full_name,
+            "email": resume.email,
+            "phone": resume.phone,
+            "summary": resume.summary + f"<p>Edit {data.rng.random()}</p>",
+            "skills": resume.skills,
+            "experience": resume.experience,
+            "education": resume.education,
+        })
+    return step, {302}
+
+
+def login_view(data):
+    def step():
+        _, user_id = data.resume()
+        return Client().post(reverse("login"), {
+            "username": data.users[user_id].email,
+            "password": BENCH_PASSWORD,
+        })
+    return step, {200}
+
+
+def register_view(data):
+    def step():
+        name = f"{REGISTER_PREFIX}{uuid.uuid4().hex[:12]}"
+        return Client().post(reverse("register"), {
+            "username": name.replace("-", "_"),
+            "email": f"{name}@example.com",
+            "password1": BENCH_PASSWORD,
+            "password2": BENCH_PASSWORD,
+        })
+    return step, {200}
+
+
+SCENARIOS = {
+    "resume_public": resume_public,
+    "resume_preview": resume_preview,
+    "my_resumes": my_resumes,
+    "edit_resume": edit_resume,
+    "login_view": login_view,
+    "register_view": register_view,
+}
+
+
+# ===============================
+# RUNNER
+# ===============================
+def peak_rss_kb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if platform.system() == "Darwin" else peak
+
+
+def _percentile(samples, q):
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def run_scenario(name, data, iterations, warmup):
+    step, ok_statuses = SCENARIOS[name](data)
+
+    for _ in range(warmup):
+        step()
+
+    timings, per_request, repeated, failures, slow = [], [], [], 0, 0
+    for _ in range(iterations):
+        # No stacks while timing: walking them would dominate fast views
+        with querylog.capture(stack_depth=0) as log:
+            started = time.perf_counter()
+            response = step()
+            elapsed = time.perf_counter() - started
+        if response.status_code not in ok_statuses:
+            failures += 1
+        timings.append(elapsed * 1000)
+        per_request.append(len(log.statements))
+        repeated.append(sum(statement["count"] for statement in log.repeated()))
+        slow += len(log.slow())
+
+    top_repeated = []
+    if any(repeated):
+        # One more, untimed, to say where the repeats come from
+        with querylog.capture() as log:
+            step()
+        top_repeated = log.repeated()[:3]
+
+    return {
+        "iterations": iterations,
+        "failures": failures,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries_mean": round(statistics.fmean(per_request), 2),
+        "queries_max": max(per_request),
+        "repeated_queries_mean": round(statistics.fmean(repeated), 2),
+        "slow_queries": slow,
+        "top_repeated": top_repeated,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(scenarios=None, iterations=200, warmup=20, random_seed=0, log=print):
+    rng = random.Random(random_seed)
+    data = BenchData(rng)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "db_vendor": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "users": User.objects.count(),
+            "resumes": Resume.objects.count(),
+            "iterations": iterations,
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in scenarios or SCENARIOS:
+            log(f"  {name} ...")
+            results["scenarios"][name] = run_scenario(name, data, iterations, warmup)
+    finally:
+        _delete_users_like(REGISTER_PREFIX + "%")
+    return results
+
+
+def write_results(results, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n")
+    return path
+
+
+def compare(baseline, results):
+    """``(scenario, metric, before, after, change %)`` for shared metrics."""
+    rows = []
+    for name, after in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "queries_mean", "repeated_queries_mean"):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else (0.0 if new == old else float("inf"))
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,141 @@
+"""
+Per-operation latency of the cache backends, and whether ``incr`` holds
+up across processes.
+
+``run`` times get (hit and miss), set, add and incr one call at a time
+against each backend in ``BACKENDS``, then forks ``processes`` workers
+that all ``incr`` one shared counter, as gunicorn workers charging a rate
+limit would. A backend shared by every worker ends at
+``processes * incrs``; LocMem ends where the parent left it, and the DB
+cache's read-then-write ``incr`` loses updates. Wrapped by the
+``bench_cache`` management command.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils.module_loading import import_string
+
+from .bench import _percentile
+
+DB_TABLE = "bench_cache"
+BACKENDS = ("locmem", "db", "sqlite")
+# Roughly a rate-limit counter's neighbour: a rendered snippet
+PAYLOAD = {"result": "Led the migration of the nightly ETL pipeline to Airflow. " * 4, "cached": True}
+
+
+@contextmanager
+def backend(name):
+    """A fresh, empty instance of one backend, removed afterwards."""
+    workdir = tempfile.mkdtemp(prefix="bench-cache-")
+    params = {"TIMEOUT": 300, "OPTIONS": {"MAX_ENTRIES": 1_000_000}}
+    try:
+        if name == "locmem":
+            cache = import_string("django.core.cache.backends.locmem.LocMemCache")(f"bench-{workdir}", params)
+        elif name == "db":
+            creator = CreateCacheTable()
+            creator.verbosity = 0
+            creator.create_table(DEFAULT_DB_ALIAS, DB_TABLE, False)
+            cache = import_string("django.core.cache.backends.db.DatabaseCache")(DB_TABLE, params)
+        elif name == "sqlite":
+            cache = import_string("config.sqlite_cache.SQLiteCache")(os.path.join(workdir, "cache.sqlite3"), params)
+        else:
+            raise ValueError(f"Unknown backend {name!r}; choose from {', '.join(BACKENDS)}")
+        yield cache
+    finally:
+        if name == "db":
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(DB_TABLE)}")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _timed(calls):
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+def _summary(samples):
+    return {
+        "ops_per_s": round(len(samples) / (sum(samples) / 1_000_000)),
+        "p50_us": round(_percentile(samples, 50), 1),
+        "p99_us": round(_percentile(samples, 99), 1),
+    }
+
+
+def time_operations(cache, ops):
+    for i in range(ops):
+        cache.set(f"hit:{i}", PAYLOAD)
+    cache.set("counter", 0)
+    operations = {
+        "get_hit": (lambda i=i: cache.get(f"hit:{i}") for i in range(ops)),
+        "get_miss": (lambda i=i: cache.get(f"miss:{i}") for i in range(ops)),
+        "set": (lambda i=i: cache.set(f"set:{i}", PAYLOAD) for i in range(ops)),
+        "add": (lambda i=i: cache.add(f"add:{i}", PAYLOAD) for i in range(ops)),
+        "incr": (lambda: cache.incr("counter") for _ in range(ops)),
+    }
+    return {name: _summary(_timed(calls)) for name, calls in operations.items()}
+
+
+# ===============================
+# CROSS-PROCESS INCR
+# ===============================
+def _incr_worker(cache, incrs, start, failures):
+    start.wait()
+    for _ in range(incrs):
+        try:
+            cache.incr("shared")
+        except Exception:
+            with failures.get_lock():
+                failures.value += 1
+    # The DB cache's connection is this process's own; don't run atexit
+    # handlers inherited from the parent
+    connections.close_all()
+    os._exit(0)
+
+
+def shared_incr(cache, processes, incrs):
+    """Fork ``processes`` workers that each ``incr`` one key ``incrs`` times."""
+    context = multiprocessing.get_context("fork")
+    cache.set("shared", 0, timeout=None)
+    # Children must open their own database connections
+    connections.close_all()
+    start = context.Event()
+    failures = context.Value("i", 0)
+    workers = [
+        context.Process(target=_incr_worker, args=(cache, incrs, start, failures))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    started = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "expected": processes * incrs,
+        "final": cache.get("shared"),
+        "failures": failures.value,
+        "ops_per_s": round(processes * incrs / elapsed),
+    }
+
+
+def run(backends=BACKENDS, ops=5000, processes=4, incrs=1000, log=print):
+    results = {}
+    for name in backends:
+        log(f"Benchmarking {name} ...")
+        with backend(name) as cache:
+            results[name] = {
+                "operations": time_operations(cache, ops),
+                "shared_incr": shared_incr(cache, processes, incrs) if processes else None,
+            }
+    return results
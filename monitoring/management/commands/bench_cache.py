@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import cache_bench
+
+
+class Command(BaseCommand):
+    help = "Compare per-operation latency and cross-process incr of the cache backends."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=list(cache_bench.BACKENDS),
+            help="Backend to run; repeat for several (default: all).",
+        )
+        parser.add_argument(
+            "--ops",
+            type=int,
+            default=5000,
+            help="Timed calls per operation (default: 5000).",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=4,
+            help="Forked workers sharing one counter; 0 skips that check (default: 4).",
+        )
+        parser.add_argument(
+            "--incrs",
+            type=int,
+            default=1000,
+            help="incr calls per worker (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["ops"] < 1:
+            raise CommandError("--ops must be at least 1")
+        results = cache_bench.run(
+            backends=options["backend"] or cache_bench.BACKENDS,
+            ops=options["ops"],
+            processes=options["processes"],
+            incrs=options["incrs"],
+            log=self.stdout.write,
+        )
+
+        self.stdout.write(f"{'backend':<8} {'op':<9} {'p50 us':>9} {'p99 us':>9} {'ops/s':>10}")
+        for name, result in results.items():
+            for op, stats in result["operations"].items():
+                self.stdout.write(
+                    f"{name:<8} {op:<9} {stats['p50_us']:>9.1f} {stats['p99_us']:>9.1f} {stats['ops_per_s']:>10}"
+                )
+
+        if not options["processes"]:
+            return
+        self.stdout.write("")
+        self.stdout.write(f"{'backend':<8} {'expected':>9} {'final':>9} {'failed':>7} {'ops/s':>10}")
+        for name, result in results.items():
+            shared = result["shared_incr"]
+            line = (
+                f"{name:<8} {shared['expected']:>9} {shared['final']!s:>9} "
+                f"{shared['failures']:>7} {shared['ops_per_s']:>10}"
+            )
+            if shared["final"] == shared["expected"]:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.WARNING(line + "  (lost increments)"))
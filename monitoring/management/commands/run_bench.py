@@ -0,0 +1,110 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import bench
+
+
+class Command(BaseCommand):
+    help = "Benchmark the resume and account views against seed_bench data."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=list(bench.SCENARIOS),
+            help="Scenario to run; repeat for several (default: all).",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=200,
+            help="Timed requests per scenario (default: 200).",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Untimed requests per scenario first (default: 20).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument(
+            "--output",
+            help="Write JSON results here (default: bench_results/<timestamp>.json).",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Earlier results JSON to compare against.",
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="Exit non-zero if any compared metric got worse by more than this percent.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read {options['compare']}: {exc}")
+
+        try:
+            results = bench.run(
+                scenarios=options["scenario"],
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                random_seed=options["seed"],
+                log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        meta = results["meta"]
+        self.stdout.write(
+            f"{meta['db_vendor']} @ {meta['commit'] or '?'}: "
+            f"{meta['users']} users, {meta['resumes']} resumes"
+        )
+        self.stdout.write(
+            f"{'scenario':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'queries':>8} {'repeat':>7} {'slow':>5} {'fail':>5} {'rss MB':>8}"
+        )
+        for name, stats in results["scenarios"].items():
+            self.stdout.write(
+                f"{name:<16} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+                f"{stats['queries_mean']:>8.1f} {stats['repeated_queries_mean']:>7.1f} "
+                f"{stats['slow_queries']:>5} {stats['failures']:>5} {stats['peak_rss_kb'] / 1024:>8.1f}"
+            )
+        for name, stats in results["scenarios"].items():
+            for statement in stats["top_repeated"]:
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: {statement['count']}x {statement['sql'][:120]}"
+                ))
+                for frame in statement["stack"]:
+                    self.stdout.write(f"    {frame}")
+
+        output = options["output"] or (
+            settings.BASE_DIR / "bench_results" / time.strftime("%Y%m%d-%H%M%S.json")
+        )
+        self.stdout.write(f"Wrote {bench.write_results(results, output)}")
+
+        if baseline is not None:
+            self.report(bench.compare(baseline, results), options["max_regression"])
+
+    def report(self, rows, max_regression):
+        self.stdout.write(f"{'scenario':<16} {'metric':<13} {'before':>9} {'after':>9} {'change':>8}")
+        regressed = []
+        for name, metric, before, after, change in rows:
+            line = f"{name:<16} {metric:<13} {before:>9.2f} {after:>9.2f} {change:>+7.1f}%"
+            if max_regression is not None and change > max_regression:
+                regressed.append(f"{name} {metric}")
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if regressed:
+            raise CommandError(f"Regressed beyond {max_regression}%: {', '.join(regressed)}")
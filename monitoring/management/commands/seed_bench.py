@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from monitoring import bench
+
+
+class Command(BaseCommand):
+    help = "Fill the database with bench users and CKEditor-sized resumes for run_bench."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resumes",
+            type=int,
+            default=1000,
+            help="Resumes to create, one per bench user (default: 1000; try up to 1000000).",
+        )
+        parser.add_argument(
+            "--resumes-per-user",
+            type=int,
+            default=1,
+            help="Resumes each bench user owns (default: 1).",
+        )
+        parser.add_argument(
+            "--power-users",
+            type=int,
+            default=1,
+            help="Users with a long My Resumes list (default: 1).",
+        )
+        parser.add_argument(
+            "--power-resumes",
+            type=int,
+            default=500,
+            help="Resumes each power user owns (default: 500).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows per bulk_create (default: 2000).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete existing bench data first.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run even with DEBUG off.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Refusing to write bench data with DEBUG off; pass --force.")
+        if options["resumes_per_user"] < 1:
+            raise CommandError("--resumes-per-user must be at least 1")
+
+        if options["reset"]:
+            self.stdout.write(f"Removed {bench.clear()} bench users")
+
+        users = -(-options["resumes"] // options["resumes_per_user"])
+        with transaction.atomic():
+            counts = bench.seed(
+                users,
+                resumes_per_user=options["resumes_per_user"],
+                power_users=options["power_users"],
+                power_resumes=options["power_resumes"],
+                batch_size=options["batch_size"],
+                random_seed=options["seed"],
+                log=self.stdout.write,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users and {counts['resumes']} resumes"
+        ))
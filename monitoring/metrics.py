@@ -0,0 +1,345 @@
+"""
+Prometheus-style metrics shared by every worker on the host.
+
+Recording is lock-free: each thread owns a shard (a plain dict) that only
+it writes to, and shards are merged when somebody asks for the totals.
+Each process periodically writes its merged totals to
+``METRICS_DIR/<pid>.json``; a scrape of any worker adds up every file, so
+the numbers cover all gunicorn workers, not just the one that answered.
+Files left by dead workers are folded into ``archive.json`` so counters
+never go backwards.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+INF = float("inf")
+
+
+# ===============================
+# PER-THREAD SHARDS
+# ===============================
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+_state = {"pid": os.getpid(), "flushed": 0.0}
+
+
+def _shard():
+    if _state["pid"] != os.getpid():
+        # Forked: the parent's numbers belong to the parent's file
+        with _shards_lock:
+            _shards.clear()
+            _state["pid"] = os.getpid()
+            _state["flushed"] = 0.0
+        _local.__dict__.clear()
+
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def reset():
+    """Forget this process's numbers (tests)."""
+    with _shards_lock:
+        for shard in _shards:
+            shard.clear()
+
+
+# ===============================
+# METRIC FAMILIES
+# ===============================
+FAMILIES = {}
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        FAMILIES[name] = self
+
+    def inc(self, *labels, amount=1):
+        shard = _shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+
+class Histogram:
+    """Series value: per-bucket counts (not cumulative), then sum, then count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets) if buckets[-1] == INF else tuple(buckets) + (INF,)
+        FAMILIES[name] = self
+
+    def observe(self, value, *labels):
+        shard = _shard()
+        key = (self.name, labels)
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "Requests by resolved URL name, method and status.",
+    ("view", "method", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Time from middleware entry to response, by resolved URL name.",
+    ("view",),
+    LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "django_http_response_size_bytes",
+    "Body size of non-streaming responses, by resolved URL name.",
+    ("view",),
+    SIZE_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "django_db_queries_per_request",
+    "Database queries run while serving one request.",
+    ("view",),
+    QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    "django_db_query_seconds_per_request",
+    "Total database time spent serving one request.",
+    ("view",),
+    LATENCY_BUCKETS,
+)
+# Only requests sampled by QueryInspectorMiddleware (monitoring.querylog)
+QUERY_INSPECTED = Counter(
+    "django_db_inspected_requests_total",
+    "Requests whose statements the query inspector recorded.",
+    ("view",),
+)
+QUERY_REPEATED = Counter(
+    "django_db_repeated_query_requests_total",
+    "Inspected requests that ran one statement QUERY_INSPECTOR_REPEAT_THRESHOLD+ times (N+1).",
+    ("view",),
+)
+QUERY_SLOW = Counter(
+    "django_db_slow_queries_total",
+    "Statements slower than QUERY_INSPECTOR_SLOW_MS in inspected requests.",
+    ("view",),
+)
+# Exported from ai_resume.providers.ProviderStats at collection time
+AI_REQUESTS = Counter(
+    "ai_upstream_requests_total",
+    "AI provider calls by outcome (retries included in one call).",
+    ("provider", "outcome"),
+)
+AI_LATENCY = Histogram(
+    "ai_upstream_latency_seconds",
+    "Latency of successful AI provider calls.",
+    ("provider",),
+    (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0),
+)
+
+
+# ===============================
+# COLLECTION
+# ===============================
+def _merge_into(totals, series):
+    for (name, labels), value in series:
+        family = FAMILIES.get(name)
+        if family is None:
+            continue
+        key = (name, tuple(labels))
+        totals[key] = family.merge(totals.get(key), value)
+
+
+def _ai_series():
+    from ai_resume.providers import loaded_providers
+
+    for name, provider in loaded_providers().items():
+        stats = provider.stats.export()
+        ok = stats["calls"] - stats["errors"]
+        yield (AI_REQUESTS.name, (name, "ok")), ok
+        yield (AI_REQUESTS.name, (name, "error")), stats["errors"]
+        # ProviderStats uses the same bounds, +Inf included
+        yield (AI_LATENCY.name, (name,)), stats["buckets"] + [stats["latency_sum"], ok]
+
+
+def collect_local():
+    """This process's totals: every thread's shard plus AI provider stats."""
+    _shard()
+    totals = {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        # list() copies under the GIL, so the owner may keep writing
+        _merge_into(totals, list(shard.items()))
+    _merge_into(totals, _ai_series())
+    return totals
+
+
+# ===============================
+# PER-PROCESS SNAPSHOT FILES
+# ===============================
+def _metrics_dir():
+    path = Path(settings.METRICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _dump(totals):
+    return [[name, list(labels), value] for (name, labels), value in totals.items()]
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return [((name, tuple(labels)), value) for name, labels, value in json.load(f)]
+    except (OSError, ValueError):
+        # Half-written by a crashing worker, or just removed
+        return []
+
+
+def _write(path, totals):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(_dump(totals), f)
+    os.replace(tmp, path)
+
+
+def flush():
+    _write(_metrics_dir() / f"{os.getpid()}.json", collect_local())
+    _state["flushed"] = time.monotonic()
+
+
+def flush_if_due():
+    if time.monotonic() - _state["flushed"] >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fold_dead_workers(directory):
+    if fcntl is None:
+        # Without a lock two scrapes could fold the same file twice; dead
+        # workers' files are simply left in place and still summed
+        return
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = directory / "archive.json"
+        archive = {}
+        dead = []
+        for path in directory.glob("*.json"):
+            if path.stem.isdigit() and not _alive(int(path.stem)):
+                dead.append(path)
+        if not dead:
+            return
+        _merge_into(archive, _load(archive_path))
+        for path in dead:
+            _merge_into(archive, _load(path))
+        _write(archive_path, archive)
+        for path in dead:
+            path.unlink(missing_ok=True)
+
+
+def collect():
+    """Totals across every worker on this host."""
+    flush()
+    directory = _metrics_dir()
+    _fold_dead_workers(directory)
+
+    totals = {}
+    for path in directory.glob("*.json"):
+        _merge_into(totals, _load(path))
+    return totals
+
+
+# ===============================
+# TEXT EXPOSITION FORMAT
+# ===============================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == INF:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def render(totals):
+    lines = []
+    for name, family in FAMILIES.items():
+        series = sorted(
+            ((labels, value) for (n, labels), value in totals.items() if n == name),
+            key=lambda item: item[0],
+        )
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {family.documentation}")
+        lines.append(f"# TYPE {name} {family.kind}")
+        for labels, value in series:
+            if family.kind == "counter":
+                lines.append(f"{name}{_labels(family.labels, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(family.buckets, value):
+                cumulative += count
+                le = (("le", _number(bound)),)
+                lines.append(f"{name}_bucket{_labels(family.labels, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(family.labels, labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(family.labels, labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,295 @@
+import contextvars
+import logging
+import random
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError
+from django.urls import reverse
+
+from . import metrics, profiling, querylog
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+# [queries, seconds] for the request being served. A contextvar rather
+# than a thread-local so queries an async view runs through
+# sync_to_async (in another thread) still land on its request.
+_db_usage = contextvars.ContextVar("monitoring_db_usage", default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    usage = _db_usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        usage[0] += 1
+        usage[1] += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # connection_created: every new connection reports to the current request
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.view_name:
+        # 404s and anything else that never resolved share one label
+        return "<unresolved>"
+    return match.view_name
+
+
+def view_code(request):
+    match = getattr(request, "resolver_match", None)
+    return getattr(getattr(match, "func", None), "__code__", None)
+
+
+class MetricsMiddleware:
+    """Request count, latency, response size and DB usage per URL name."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            usage = self.stop(token)
+        self.record(request, response, started, usage)
+        return response
+
+    async def __acall__(self, request):
+        started, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            usage = self.stop(token)
+        self.record(request, response, started, usage)
+        return response
+
+    def start(self):
+        return time.perf_counter(), _db_usage.set([0, 0.0])
+
+    def stop(self, token):
+        usage = _db_usage.get()
+        _db_usage.reset(token)
+        return usage
+
+    def record(self, request, response, started, usage):
+        elapsed = time.perf_counter() - started
+        view = view_name(request)
+
+        metrics.REQUESTS.inc(view, request.method, str(response.status_code))
+        metrics.REQUEST_LATENCY.observe(elapsed, view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view)
+        metrics.DB_QUERIES.observe(usage[0], view)
+        metrics.DB_TIME.observe(usage[1], view)
+        metrics.flush_if_due()
+
+
+class QueryInspectorMiddleware:
+    """
+    Opt-in N+1 and slow-query report for a sample of requests, see
+    monitoring.querylog. Adds an X-Query-Inspector header in DEBUG.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTOR_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        with querylog.capture() as log:
+            response = self.get_response(request)
+        self.report(request, response, log)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        with querylog.capture() as log:
+            response = await self.get_response(request)
+        self.report(request, response, log)
+        return response
+
+    def sampled(self):
+        rate = settings.QUERY_INSPECTOR_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def report(self, request, response, log):
+        view = view_name(request)
+        report = log.report()
+        querylog.log_report(view, request, response.status_code, report)
+
+        metrics.QUERY_INSPECTED.inc(view)
+        if report["repeated"]:
+            metrics.QUERY_REPEATED.inc(view)
+        if report["slow"]:
+            metrics.QUERY_SLOW.inc(view, amount=len(report["slow"]))
+        if settings.DEBUG:
+            response["X-Query-Inspector"] = querylog.header_value(report)
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a request when a staff user adds ``?__profile`` to the URL
+    (``?__profile=sampler`` to pick the profiler), or at random for
+    ``PROFILER_SAMPLE_RATE`` of all requests, and stores a RequestProfile.
+    Must come after AuthenticationMiddleware.
+    """
+
+    PARAM = "__profile"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.PARAM in request.GET and request.user.is_staff:
+            trigger = RequestProfile.TRIGGER_STAFF
+        elif self.sample():
+            trigger = RequestProfile.TRIGGER_SAMPLED
+        else:
+            return self.get_response(request)
+
+        mode = self.mode(request)
+        stats_text = ""
+        with querylog.capture(stack_depth=0) as log:
+            if mode == RequestProfile.MODE_CPROFILE:
+                try:
+                    response, elapsed_ms, tree, stats_text = profiling.cprofile_call(
+                        self.get_response, request, root=lambda: view_code(request)
+                    )
+                except ValueError:
+                    # Another profiler is active in this process
+                    mode = RequestProfile.MODE_SAMPLER
+            if mode == RequestProfile.MODE_SAMPLER:
+                response, elapsed_ms, tree = self.sampled(request)
+
+        self.store(request, response, request.user, trigger, mode, elapsed_ms, log, tree, stats_text)
+        return response
+
+    async def __acall__(self, request):
+        if self.PARAM in request.GET and (await request.auser()).is_staff:
+            trigger = RequestProfile.TRIGGER_STAFF
+        elif self.sample():
+            trigger = RequestProfile.TRIGGER_SAMPLED
+        else:
+            return await self.get_response(request)
+
+        # cProfile would also record every other request on this event
+        # loop, so async requests are always sampled
+        with querylog.capture(stack_depth=0) as log:
+            response, elapsed_ms, tree = await self.asampled(request)
+
+        user = await request.auser()
+        await sync_to_async(self.store)(
+            request, response, user, trigger, RequestProfile.MODE_SAMPLER, elapsed_ms, log, tree, ""
+        )
+        return response
+
+    def sample(self):
+        rate = settings.PROFILER_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def mode(self, request):
+        requested = request.GET.get(self.PARAM)
+        if requested in dict(RequestProfile.MODE_CHOICES):
+            return requested
+        return settings.PROFILER_MODE
+
+    def sampled(self, request):
+        sampler = profiling.StackSampler(sys._getframe(), settings.PROFILER_SAMPLE_INTERVAL)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return response, elapsed_ms, sampler.tree(view_name(request), elapsed_ms)
+
+    async def asampled(self, request):
+        sampler = profiling.StackSampler(sys._getframe(), settings.PROFILER_SAMPLE_INTERVAL)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            sampler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return response, elapsed_ms, sampler.tree(view_name(request), elapsed_ms)
+
+    def store(self, request, response, user, trigger, mode, elapsed_ms, log, tree, stats_text):
+        view = view_name(request)
+        resume_id = template = None
+        match = request.resolver_match
+        if match is not None and view.startswith("resumes:") and "id" in match.kwargs:
+            resume_id = match.kwargs["id"]
+            template = request.GET.get("template")
+
+        if tree:
+            tree["name"] = view
+        try:
+            if resume_id is not None and not template:
+                from resumes.models import Resume
+
+                template = Resume.objects.filter(id=resume_id).values_list("template", flat=True).first()
+            profile = RequestProfile.objects.create(
+                user=user if user.is_authenticated else None,
+                view=view,
+                method=request.method,
+                path=request.path[:500],
+                status=response.status_code,
+                resume_id=resume_id,
+                template=template or "",
+                mode=mode,
+                trigger=trigger,
+                duration_ms=round(elapsed_ms, 3),
+                queries=len(log.statements),
+                call_tree=tree,
+                stats_text=stats_text,
+            )
+            RequestProfile.prune(settings.PROFILER_KEEP)
+        except DatabaseError:
+            # A profile is never worth failing the request over
+            logger.exception("Could not store the profile of %s", request.path)
+            return
+
+        if trigger == RequestProfile.TRIGGER_STAFF:
+            response["X-Profile-Id"] = str(profile.id)
+            response["X-Profile-Url"] = reverse("admin:monitoring_requestprofile_change", args=[profile.id])
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('view', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('resume_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('template', models.CharField(blank=True, max_length=50)),
+                ('mode', models.CharField(choices=[('cprofile', 'cProfile (deterministic)'), ('sampler', 'Stack sampler (wall clock)')], max_length=20)),
+                ('trigger', models.CharField(choices=[('staff', 'Requested by staff'), ('sampled', 'Sampled')], max_length=20)),
+                ('duration_ms', models.FloatField()),
+                ('queries', models.PositiveIntegerField(default=0)),
+                ('call_tree', models.JSONField(default=dict)),
+                ('stats_text', models.TextField(blank=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['view', '-created_at'], name='profile_view_created_idx')],
+            },
+        ),
+    ]
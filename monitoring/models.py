@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """One profiled request, see monitoring.profiling."""
+
+    MODE_CPROFILE = "cprofile"
+    MODE_SAMPLER = "sampler"
+
+    MODE_CHOICES = [
+        (MODE_CPROFILE, "cProfile (deterministic)"),
+        (MODE_SAMPLER, "Stack sampler (wall clock)"),
+    ]
+
+    TRIGGER_STAFF = "staff"
+    TRIGGER_SAMPLED = "sampled"
+
+    TRIGGER_CHOICES = [
+        (TRIGGER_STAFF, "Requested by staff"),
+        (TRIGGER_SAMPLED, "Sampled"),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    view = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status = models.PositiveSmallIntegerField()
+    resume_id = models.PositiveIntegerField(null=True, blank=True)
+    template = models.CharField(max_length=50, blank=True)
+
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES)
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES)
+    duration_ms = models.FloatField()
+    queries = models.PositiveIntegerField(default=0)
+
+    # {"name", "value" (ms), "children": [...]}, rooted at the view call
+    call_tree = models.JSONField(default=dict)
+    # cProfile only: the top functions as pstats prints them
+    stats_text = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["view", "-created_at"], name="profile_view_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.view} {self.duration_ms:.0f}ms ({self.created_at:%Y-%m-%d %H:%M})"
+
+    @classmethod
+    def prune(cls, keep):
+        """Delete all but the newest ``keep`` profiles."""
+        oldest_kept = cls.objects.order_by("-id").values_list("id", flat=True)[keep - 1:keep].first()
+        if oldest_kept is not None:
+            cls.objects.filter(id__lt=oldest_kept).delete()
@@ -0,0 +1,263 @@
+"""
+Profile one call and keep the result as a call tree.
+
+Two profilers, one tree format (``{"name", "value", "children"}`` with
+``value`` in milliseconds, rooted at the profiled call):
+
+* ``cprofile``: every Python call, exact counts. Slows CPU-heavy code
+  down a lot, so timings are relative; the tree is rebuilt from pstats'
+  caller/callee edges, which is exact for the top levels and
+  proportional below them.
+* ``sampler``: a thread that snapshots the profiled thread's stack every
+  ``PROFILER_SAMPLE_INTERVAL`` seconds. Barely slows anything down and
+  counts waiting (DB, WeasyPrint, network) as well as running.
+
+``flame_svg`` and ``call_tree_html`` render a tree for the admin.
+"""
+import cProfile
+import hashlib
+import heapq
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.utils.html import escape, format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+# Nodes below this share of the root are dropped: they'd be invisible in
+# a flame graph and make the stored tree huge.
+MIN_SHARE = 0.005
+MAX_DEPTH = 80
+MAX_NODES = 1000
+MAX_RECURSION = 8
+
+
+def _short_path(path):
+    base = str(settings.BASE_DIR) + os.sep
+    if path.startswith(base):
+        return path[len(base):]
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return path
+
+
+def _prune(node, total):
+    node["children"] = [
+        _prune(child, total) for child in node["children"]
+        if child["value"] >= total * MIN_SHARE
+    ]
+    node["children"].sort(key=lambda child: -child["value"])
+    node["value"] = round(node["value"], 3)
+    return node
+
+
+# ===============================
+# CPROFILE
+# ===============================
+def _func_name(func):
+    path, line, name = func
+    if path == "~":
+        # Builtins: name is already "<built-in method ...>"
+        return name
+    return f"{name} ({_short_path(path)}:{line})"
+
+
+def _expand(start, total_ms, children, totals):
+    """
+    Unfold the call graph from ``start`` into a tree, biggest nodes first,
+    until ``MAX_NODES``. Recursion (template nodes rendering nodes) is
+    followed a few levels; pstats can't tell the levels apart anyway.
+    """
+    root = {"name": _func_name(start), "value": total_ms, "children": []}
+    tiebreak = itertools.count()
+    queue = [(-total_ms, next(tiebreak), start, root, (start,))]
+    nodes = 1
+    while queue and nodes < MAX_NODES:
+        _, _, func, node, path = heapq.heappop(queue)
+        if len(path) >= MAX_DEPTH or not totals[func]:
+            continue
+        # The callee's own edges cover all its calls; scale them to this path
+        scale = node["value"] / (totals[func] * 1000)
+        for callee, seconds in children.get(func, ()):
+            value = seconds * 1000 * scale
+            if value < total_ms * MIN_SHARE or path.count(callee) >= MAX_RECURSION:
+                continue
+            child = {"name": _func_name(callee), "value": value, "children": []}
+            node["children"].append(child)
+            nodes += 1
+            heapq.heappush(queue, (-value, next(tiebreak), callee, child, path + (callee,)))
+    return _prune(root, total_ms)
+
+
+def _code_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def cprofile_call(fn, *args, root=None):
+    """
+    ``(result, elapsed_ms, tree, stats_text)`` for ``fn(*args)`` under cProfile.
+
+    ``root``, called afterwards, may return the code object the tree
+    should start from (the view, rather than the middleware around it).
+    """
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    result = profiler.runcall(fn, *args)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats = pstats.Stats(profiler)
+
+    # pstats lists callers per function; the tree needs callees per function
+    children = {}
+    for callee, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((callee, edge[3]))
+    totals = {func: row[3] for func, row in stats.stats.items()}
+
+    root_code = root() if root else None
+    start = _code_key(root_code) if root_code is not None else None
+    if start not in totals:
+        roots = [func for func, row in stats.stats.items() if not row[4]]
+        start = max(roots, key=lambda func: totals[func]) if roots else None
+    total_ms = (totals.get(start) or 0) * 1000
+
+    tree = _expand(start, total_ms, children, totals) if start else {}
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    return result, elapsed_ms, tree, out.getvalue()
+
+
+# ===============================
+# STACK SAMPLER
+# ===============================
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """
+    Counts the stacks of the calling thread below ``root_frame``.
+
+    Samples where that frame isn't on the stack (an async request
+    waiting while the event loop runs something else) are not counted.
+    """
+
+    def __init__(self, root_frame, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = threading.get_ident()
+        self.root_frame = root_frame
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root_frame:
+                stack.append(frame)
+                frame = frame.f_back
+            if frame is None:
+                continue
+            key = tuple(_frame_name(f) for f in reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def tree(self, root_name, total_ms):
+        root = {"name": root_name, "value": total_ms, "children": []}
+        if not self.samples:
+            return _prune(root, total_ms)
+        per_sample = total_ms / self.samples
+        for stack, count in self.counts.items():
+            node = root
+            for name in stack[:MAX_DEPTH]:
+                child = next((c for c in node["children"] if c["name"] == name), None)
+                if child is None:
+                    child = {"name": name, "value": 0, "children": []}
+                    node["children"].append(child)
+                child["value"] += count * per_sample
+                node = child
+        return _prune(root, total_ms)
+
+
+# ===============================
+# RENDERING
+# ===============================
+def _color(name):
+    # Stable warm colours, so one function looks the same across profiles
+    digest = hashlib.md5(name.encode(), usedforsecurity=False).digest()
+    return f"rgb({205 + digest[0] % 50},{80 + digest[1] % 120},{30 + digest[2] % 40})"
+
+
+def flame_svg(tree, width=1200, row_height=17):
+    """A flame graph (root at the bottom) as inline SVG; hover for details."""
+    if not tree or not tree.get("value"):
+        return mark_safe("<p>No samples.</p>")
+
+    rects = []
+    scale = width / tree["value"]
+
+    def depth(node):
+        return 1 + max((depth(child) for child in node["children"]), default=0)
+
+    height = depth(tree) * row_height
+
+    def place(node, x, level):
+        w = node["value"] * scale
+        if w < 0.5:
+            return
+        y = height - (level + 1) * row_height
+        share = node["value"] / tree["value"] * 100
+        label = node["name"] if w > 7 * len(node["name"]) else node["name"][:max(0, int(w / 7) - 2)] + ".."
+        rects.append(
+            f'<g><title>{escape(node["name"])}: {node["value"]:.1f} ms ({share:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" '
+            f'fill="{_color(node["name"])}" rx="2"/>'
+            + (f'<text x="{x + 3:.1f}" y="{y + row_height - 5}">{escape(label)}</text>' if w > 30 else "")
+            + "</g>"
+        )
+        for child in node["children"]:
+            place(child, x, level + 1)
+            x += child["value"] * scale
+
+    place(tree, 0, 0)
+    return mark_safe(
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'style="font: 11px monospace; max-width: 100%">' + "".join(rects) + "</svg>"
+    )
+
+
+def call_tree_html(tree, open_levels=3):
+    """Nested, collapsible list: name, milliseconds and share of the root."""
+    if not tree:
+        return mark_safe("<p>No samples.</p>")
+    total = tree["value"] or 1
+
+    def item(node, level):
+        share = node["value"] / total * 100
+        label = format_html(
+            "<code>{}</code> &mdash; {} ms ({}%)",
+            node["name"], f"{node['value']:.1f}", f"{share:.1f}",
+        )
+        if not node["children"]:
+            return format_html("<li>{}</li>", label)
+        return format_html(
+            "<li><details{}><summary>{}</summary><ul>{}</ul></details></li>",
+            mark_safe(" open") if level < open_levels else "",
+            label,
+            format_html_join("", "{}", ((item(child, level + 1),) for child in node["children"])),
+        )
+
+    return format_html('<ul style="list-style: none">{}</ul>', item(tree, 0))
@@ -0,0 +1,168 @@
+"""
+Per-request SQL recording: N+1 patterns and slow statements.
+
+Opt-in (``QUERY_INSPECTOR_ENABLED``) and sampled
+(``QUERY_INSPECTOR_SAMPLE_RATE``). While a request is being inspected
+every statement on every connection is recorded with its time and the
+last few frames of project code that ran it. Afterwards a statement whose
+SQL ran ``QUERY_INSPECTOR_REPEAT_THRESHOLD`` times or more is flagged as
+repeated (the same lookup once per row), and any single statement slower
+than ``QUERY_INSPECTOR_SLOW_MS`` as slow.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# The QueryLogs recording right now (captures nest: the inspector and the
+# profiler can both be on). A contextvar so ORM calls that async views
+# push to a worker thread are still recorded.
+_current = contextvars.ContextVar("monitoring_query_logs", default=())
+
+# Our own execute wrappers, which sit on every recorded stack
+_WRAPPER_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "middleware.py"),
+}
+SQL_PREVIEW = 300
+
+
+class Statement:
+
+    __slots__ = ("sql", "params", "many", "seconds", "stack")
+
+    def __init__(self, sql, params, many, seconds, stack):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.seconds = seconds
+        self.stack = stack
+
+
+def _stack(depth):
+    """The innermost ``depth`` frames of project code, as ``path:line in func``."""
+    base = str(settings.BASE_DIR) + os.sep
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        path = frame.filename
+        if not path.startswith(base) or path in _WRAPPER_FILES or "site-packages" in path:
+            continue
+        frames.append(f"{path[len(base):]}:{frame.lineno} in {frame.name}")
+        if len(frames) == depth:
+            break
+    return frames
+
+
+class QueryLog:
+
+    def __init__(self, stack_depth=None):
+        self.statements = []
+        self.stack_depth = settings.QUERY_INSPECTOR_STACK_DEPTH if stack_depth is None else stack_depth
+
+    def record(self, sql, params, many, seconds):
+        stack = _stack(self.stack_depth) if self.stack_depth else []
+        self.statements.append(Statement(sql, params, many, seconds, stack))
+
+    @property
+    def total_seconds(self):
+        return sum(statement.seconds for statement in self.statements)
+
+    def repeated(self, threshold=None):
+        """Statements run ``threshold``+ times with the same SQL, most frequent first."""
+        threshold = threshold or settings.QUERY_INSPECTOR_REPEAT_THRESHOLD
+        groups = {}
+        for statement in self.statements:
+            groups.setdefault(statement.sql, []).append(statement)
+        found = []
+        for sql, runs in groups.items():
+            if len(runs) < threshold:
+                continue
+            found.append({
+                "sql": sql[:SQL_PREVIEW],
+                "count": len(runs),
+                # Runs with an earlier run's params: results that could be reused
+                "identical": len(runs) - len({repr(run.params) for run in runs}),
+                "time_ms": round(sum(run.seconds for run in runs) * 1000, 3),
+                "stack": runs[0].stack,
+            })
+        return sorted(found, key=lambda item: -item["count"])
+
+    def slow(self, threshold_ms=None):
+        threshold_ms = settings.QUERY_INSPECTOR_SLOW_MS if threshold_ms is None else threshold_ms
+        return [
+            {
+                "sql": statement.sql[:SQL_PREVIEW],
+                "time_ms": round(statement.seconds * 1000, 3),
+                "stack": statement.stack,
+            }
+            for statement in self.statements
+            if statement.seconds * 1000 >= threshold_ms
+        ]
+
+    def report(self):
+        return {
+            "queries": len(self.statements),
+            "time_ms": round(self.total_seconds * 1000, 3),
+            "repeated": self.repeated(),
+            "slow": self.slow(),
+        }
+
+
+# ===============================
+# EXECUTE WRAPPER
+# ===============================
+def _inspect_execute(execute, sql, params, many, context):
+    logs = _current.get()
+    if not logs:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        for log in logs:
+            log.record(sql, params, many, seconds)
+
+
+def install(sender=None, connection=None, **kwargs):
+    # connection_created: every new connection reports to the current log
+    if _inspect_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_inspect_execute)
+
+
+@contextlib.contextmanager
+def capture(stack_depth=None):
+    """Record every statement run inside the block into the yielded QueryLog."""
+    for connection in connections.all(initialized_only=True):
+        install(connection=connection)
+    log = QueryLog(stack_depth)
+    token = _current.set(_current.get() + (log,))
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+def log_report(view, request, status, report):
+    flagged = report["repeated"] or report["slow"]
+    logger.log(
+        logging.WARNING if flagged else logging.DEBUG,
+        "Queries for %s: %s",
+        view,
+        json.dumps({"view": view, "method": request.method, "path": request.path, "status": status, **report}),
+    )
+
+
+def header_value(report):
+    return (
+        f"queries={report['queries']}; time_ms={report['time_ms']}; "
+        f"repeated={len(report['repeated'])}; slow={len(report['slow'])}"
+    )
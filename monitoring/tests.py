@@ -0,0 +1,478 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from config.sqlite_cache import SQLiteCache
+from resumes.models import Resume
+
+from . import bench, cache_bench, metrics, profiling, querylog
+from .middleware import QueryInspectorMiddleware
+from .models import RequestProfile
+
+
+class MetricsTestMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        settings_override = override_settings(METRICS_DIR=self.metrics_dir, METRICS_TOKEN="t0ken")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        metrics.reset()
+        # Don't leave these numbers for the next flush into the real dir
+        self.addCleanup(metrics.reset)
+
+    def scrape(self, **headers):
+        headers.setdefault("authorization", "Bearer t0ken")
+        return self.client.get("/metrics", headers=headers)
+
+    def sample(self, text, series):
+        for line in text.splitlines():
+            if line.startswith(series + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return None
+
+
+class MetricsEndpointTests(MetricsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(user=user, full_name="Ada", email="ada@example.com")
+
+    def test_requests_are_labelled_by_url_name(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get("/no-such-page/")
+
+        text = self.scrape().content.decode()
+        view = 'view="resumes:resume_public"'
+        self.assertEqual(
+            self.sample(text, f'django_http_requests_total{{{view},method="GET",status="200"}}'), 2
+        )
+        self.assertEqual(
+            self.sample(text, 'django_http_requests_total{view="<unresolved>",method="GET",status="404"}'),
+            1,
+        )
+        self.assertEqual(
+            self.sample(text, f'django_http_request_duration_seconds_count{{{view}}}'), 2
+        )
+        self.assertEqual(
+            self.sample(text, f'django_http_request_duration_seconds_bucket{{{view},le="+Inf"}}'), 2
+        )
+        self.assertGreater(self.sample(text, f"django_http_response_size_bytes_sum{{{view}}}"), 0)
+
+    def test_histogram_buckets_are_cumulative(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        self.client.get(url)
+        text = self.scrape().content.decode()
+
+        counts = [
+            float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines()
+            if line.startswith('django_db_queries_per_request_bucket{view="resumes:resume_public"')
+        ]
+        self.assertEqual(len(counts), len(metrics.QUERY_BUCKETS) + 1)
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 1)
+
+    def test_db_queries_are_counted_per_request(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        self.client.get(url)
+        text = self.scrape().content.decode()
+        # version lookup + the full row on a cold render cache
+        queries = self.sample(text, 'django_db_queries_per_request_sum{view="resumes:resume_public"}')
+        self.assertGreaterEqual(queries, 1)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(authorization="Bearer nope").status_code, 401)
+        self.assertEqual(self.scrape(authorization="Bearer s3cret").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_no_token_means_no_access_outside_debug(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.scrape().status_code, 200)
+
+    def test_dead_workers_are_left_in_place_without_flock(self):
+        metrics._write(Path(self.metrics_dir) / "999999999.json", {})
+        with mock.patch.object(metrics, "fcntl", None):
+            metrics.collect()
+        self.assertTrue((Path(self.metrics_dir) / "999999999.json").exists())
+
+    @override_settings(AI_PROVIDER="local")
+    def test_ai_provider_metrics_are_exported(self):
+        from ai_resume.providers import get_provider
+
+        provider = get_provider("local")
+        before = provider.stats.export()
+        provider.complete("Improve the skills section.", "python, django")
+
+        text = self.scrape().content.decode()
+        ok = self.sample(text, 'ai_upstream_requests_total{provider="local",outcome="ok"}')
+        self.assertEqual(ok, before["calls"] - before["errors"] + 1)
+        self.assertIsNotNone(
+            self.sample(text, 'ai_upstream_latency_seconds_bucket{provider="local",le="+Inf"}')
+        )
+
+
+class MultiWorkerTests(MetricsTestMixin, TestCase):
+
+    def write_worker(self, pid, count):
+        series = [["django_http_requests_total", ["home", "GET", "200"], count]]
+        Path(self.metrics_dir, f"{pid}.json").write_text(json.dumps(series))
+
+    def test_scrape_adds_up_every_live_worker(self):
+        # Our parent is alive, so its file counts as a live worker
+        self.write_worker(os.getppid(), 5)
+        metrics.REQUESTS.inc("home", "GET", "200")
+
+        totals = metrics.collect()
+        self.assertEqual(totals[("django_http_requests_total", ("home", "GET", "200"))], 6)
+
+    def test_dead_workers_are_archived_not_dropped(self):
+        dead_pid = 2 ** 22 + 1  # above pid_max, never alive
+        self.write_worker(dead_pid, 7)
+
+        first = metrics.collect()
+        self.assertFalse(Path(self.metrics_dir, f"{dead_pid}.json").exists())
+        self.assertTrue(Path(self.metrics_dir, "archive.json").exists())
+        second = metrics.collect()
+
+        key = ("django_http_requests_total", ("home", "GET", "200"))
+        self.assertEqual(first[key], 7)
+        self.assertEqual(second[key], 7)
+
+    def test_threads_record_without_losing_counts(self):
+        def work():
+            for _ in range(1000):
+                metrics.REQUESTS.inc("home", "GET", "200")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        totals = metrics.collect_local()
+        self.assertEqual(totals[("django_http_requests_total", ("home", "GET", "200"))], 4000)
+
+
+class BenchSuiteTests(MetricsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        bench.seed(6, power_users=1, power_resumes=30, batch_size=4, variants=3, log=lambda _: None)
+
+    def test_seed_writes_compiled_ckeditor_resumes(self):
+        resumes = Resume.objects.filter(user__username__startswith=bench.USER_PREFIX)
+        self.assertEqual(resumes.count(), 6)
+        self.assertEqual(
+            Resume.objects.filter(user__username__startswith=bench.POWER_PREFIX).count(), 30
+        )
+        resume = resumes.first()
+        self.assertIn("font-family", resume.experience)
+        self.assertNotIn("style=", resume.experience_html)
+        self.assertTrue(resume.structured["experience"])
+        self.assertFalse(resume.user.userprofile.is_premium)
+
+    def test_run_reports_every_scenario_and_cleans_up(self):
+        results = bench.run(iterations=3, warmup=1, log=lambda _: None)
+
+        self.assertEqual(set(results["scenarios"]), set(bench.SCENARIOS))
+        for name, stats in results["scenarios"].items():
+            self.assertEqual(stats["failures"], 0, name)
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+            self.assertGreater(stats["queries_mean"], 0, name)
+            self.assertEqual(stats["repeated_queries_mean"], 0, name)
+            self.assertGreater(stats["peak_rss_kb"], 0)
+        self.assertFalse(User.objects.filter(username__startswith=bench.REGISTER_PREFIX).exists())
+
+        path = bench.write_results(results, Path(self.metrics_dir, "run.json"))
+        rows = bench.compare(json.loads(path.read_text()), results)
+        self.assertTrue(rows)
+        self.assertTrue(all(change == 0 for *_, change in rows))
+
+    def test_clear_removes_bench_data_only(self):
+        other = User.objects.create_user("ada", "ada@example.com", "pw")
+        Resume.objects.create(user=other, full_name="Ada")
+
+        bench.clear()
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["ada"])
+        self.assertEqual(Resume.objects.count(), 1)
+
+
+class QueryInspectorTests(MetricsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        for n in range(4):
+            Resume.objects.create(user=self.user, full_name=f"Resume {n}")
+
+    def n_plus_one(self, request=None):
+        # The classic: one query for the list, one per row for its user
+        names = [resume.user.username for resume in Resume.objects.all()]
+        return HttpResponse(", ".join(names))
+
+    def test_capture_flags_repeated_statements_with_their_stack(self):
+        with querylog.capture() as log:
+            self.n_plus_one()
+
+        self.assertEqual(len(log.statements), 5)
+        [repeated] = log.repeated()
+        self.assertEqual(repeated["count"], 4)
+        self.assertEqual(repeated["identical"], 3)
+        self.assertIn('"auth_user"', repeated["sql"])
+        self.assertTrue(repeated["stack"][0].startswith("monitoring/tests.py:"))
+        self.assertEqual(log.slow(), [])
+        self.assertEqual(len(log.slow(threshold_ms=0)), 5)
+
+    def test_nothing_is_recorded_outside_capture(self):
+        with querylog.capture() as log:
+            pass
+        self.n_plus_one()
+        self.assertEqual(log.statements, [])
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_INSPECTOR_SLOW_MS=0, DEBUG=True)
+    def test_middleware_logs_header_and_counts(self):
+        middleware = QueryInspectorMiddleware(self.n_plus_one)
+        request = RequestFactory().get("/resumes/")
+        with self.assertLogs("monitoring.querylog", "WARNING") as logs:
+            response = middleware(request)
+
+        report = json.loads(logs.records[0].getMessage().split(": ", 1)[1])
+        self.assertEqual(report["path"], "/resumes/")
+        self.assertEqual(report["queries"], 5)
+        self.assertEqual(report["repeated"][0]["count"], 4)
+        self.assertEqual(len(report["slow"]), 5)
+        self.assertTrue(response["X-Query-Inspector"].startswith("queries=5; "))
+        self.assertIn("repeated=1; slow=5", response["X-Query-Inspector"])
+
+        totals = metrics.collect_local()
+        self.assertEqual(totals[("django_db_repeated_query_requests_total", ("<unresolved>",))], 1)
+        self.assertEqual(totals[("django_db_slow_queries_total", ("<unresolved>",))], 5)
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, DEBUG=False)
+    def test_real_requests_without_header_outside_debug(self):
+        url = reverse("resumes:resume_public", args=[Resume.objects.first().id])
+        response = self.client.get(url)
+        self.assertNotIn("X-Query-Inspector", response)
+        inspected = metrics.collect_local()[("django_db_inspected_requests_total", ("resumes:resume_public",))]
+        self.assertEqual(inspected, 1)
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_INSPECTOR_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_inspected(self):
+        with self.assertNoLogs("monitoring.querylog", "DEBUG"):
+            QueryInspectorMiddleware(self.n_plus_one)(RequestFactory().get("/"))
+
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryInspectorMiddleware(self.n_plus_one)
+
+
+class ProfilerTests(MetricsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user("admin", "admin@example.com", "pw", is_staff=True, is_superuser=True)
+        self.resume = Resume.objects.create(user=self.staff, full_name="Ada", template="executive")
+        self.url = reverse("resumes:resume_public", args=[self.resume.id])
+
+    def test_staff_can_profile_a_request_on_demand(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url + "?__profile")
+
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response["X-Profile-Id"], str(profile.id))
+        self.assertEqual(
+            response["X-Profile-Url"], reverse("admin:monitoring_requestprofile_change", args=[profile.id])
+        )
+        self.assertEqual(profile.view, "resumes:resume_public")
+        self.assertEqual((profile.resume_id, profile.template), (self.resume.id, "executive"))
+        self.assertEqual((profile.mode, profile.trigger), ("cprofile", "staff"))
+        self.assertEqual(profile.user, self.staff)
+        self.assertGreater(profile.queries, 0)
+        self.assertIn("cumulative", profile.stats_text)
+
+        tree = profile.call_tree
+        self.assertEqual(tree["name"], "resumes:resume_public")
+        self.assertTrue(tree["children"])
+        self.assertLessEqual(sum(child["value"] for child in tree["children"]), tree["value"] * 1.01)
+
+        # Browsable in the admin
+        page = self.client.get(response["X-Profile-Url"])
+        self.assertContains(page, "<svg")
+        self.assertContains(page, "<details open>")
+
+    def test_sampler_mode_and_template_override(self):
+        self.client.force_login(self.staff)
+        url = reverse("resumes:resume_preview", args=[self.resume.id])
+        self.client.get(url + "?__profile=sampler&template=modern")
+
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.mode, profile.template), ("sampler", "modern"))
+        self.assertEqual(profile.stats_text, "")
+        self.assertEqual(profile.call_tree["value"], round(profile.duration_ms, 3))
+
+    def test_other_users_cannot_trigger_it(self):
+        user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.client.force_login(user)
+        response = self.client.get(self.url + "?__profile")
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_MODE="sampler")
+    def test_sampled_requests_are_stored_without_headers(self):
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Profile-Id", response)
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.trigger, profile.mode, profile.user), ("sampled", "sampler", None))
+
+    @override_settings(AI_PROVIDER="local", AI_SINGLEFLIGHT_DIR=tempfile.mkdtemp())
+    async def test_async_views_are_sampled(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.post(
+            reverse("ai_resume_improve") + "?__profile=cprofile",
+            json.dumps({"field": "skills", "text": "python"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        profile = await RequestProfile.objects.aget()
+        self.assertEqual((profile.view, profile.mode), ("ai_resume_improve", "sampler"))
+
+    def test_prune_keeps_the_newest(self):
+        for n in range(5):
+            RequestProfile.objects.create(
+                view=f"v{n}", method="GET", path="/", status=200,
+                mode="sampler", trigger="sampled", duration_ms=1,
+            )
+        RequestProfile.prune(2)
+        self.assertEqual(list(RequestProfile.objects.values_list("view", flat=True)), ["v4", "v3"])
+
+    def test_stack_sampler_sees_where_time_goes(self):
+        def slow_part():
+            time.sleep(0.05)
+
+        def work():
+            sampler = profiling.StackSampler(sys._getframe(), 0.002)
+            sampler.start()
+            slow_part()
+            sampler.stop()
+            return sampler
+
+        tree = work().tree("work", 50)
+        [child] = tree["children"]
+        self.assertTrue(child["name"].startswith("slow_part (monitoring/tests.py:"))
+        self.assertGreater(child["value"], 40)
+
+    def test_rendering_escapes_names(self):
+        tree = {"name": "<script>", "value": 10, "children": [
+            {"name": "a&b", "value": 6, "children": []},
+        ]}
+        svg = profiling.flame_svg(tree)
+        html = profiling.call_tree_html(tree)
+        for output in (svg, html):
+            self.assertNotIn("<script>", output)
+            self.assertIn("&lt;script&gt;", output)
+            self.assertIn("a&amp;b", output)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        self.path = os.path.join(workdir, "cache.sqlite3")
+
+    def make(self, **options):
+        return SQLiteCache(self.path, {"TIMEOUT": 60, "OPTIONS": options})
+
+    def test_is_the_default_cache(self):
+        self.assertIsInstance(caches["default"], SQLiteCache)
+
+    def test_tests_never_touch_the_live_cache_file(self):
+        self.assertNotEqual(caches["default"].path, settings.CACHE_PATH)
+
+    def test_values_round_trip_and_workers_share_them(self):
+        first, second = self.make(), self.make()
+        first.set("resume", {"title": "CV", "skills": ["Go"]})
+        first.set_many({"a": 1, "b": "two"})
+        self.assertEqual(second.get("resume"), {"title": "CV", "skills": ["Go"]})
+        self.assertEqual(second.get_many(["a", "b", "c"]), {"a": 1, "b": "two"})
+        self.assertTrue(second.delete("a"))
+        self.assertIsNone(first.get("a"))
+        self.assertEqual(first.get("a", "gone"), "gone")
+
+    def test_incr_needs_a_live_integer(self):
+        c = self.make()
+        with self.assertRaises(ValueError):
+            c.incr("missing")
+        c.set("text", "x")
+        with self.assertRaises(ValueError):
+            c.incr("text")
+        c.set("n", 5)
+        self.assertEqual(c.incr("n", 3), 8)
+        self.assertEqual(c.decr("n"), 7)
+        self.assertEqual(c.get("n"), 7)
+
+    def test_entries_expire(self):
+        c = self.make()
+        c.set("short", 1, timeout=0.05)
+        c.set("forever", 1, timeout=None)
+        self.assertTrue(c.has_key("short"))
+        time.sleep(0.1)
+        self.assertFalse(c.has_key("short"))
+        with self.assertRaises(ValueError):
+            c.incr("short")
+        self.assertFalse(c.touch("short"))
+        self.assertTrue(c.has_key("forever"))
+
+    def test_add_only_takes_missing_or_expired_keys(self):
+        c = self.make()
+        self.assertTrue(c.add("k", "first", timeout=0.05))
+        self.assertFalse(c.add("k", "second"))
+        self.assertEqual(c.get("k"), "first")
+        time.sleep(0.1)
+        self.assertTrue(c.add("k", "third"))
+        self.assertEqual(c.get("k"), "third")
+
+    def test_culling_keeps_the_table_bounded(self):
+        c = self.make(MAX_ENTRIES=20, CULL_FREQUENCY=4, CULL_EVERY=1)
+        c.set("pinned", 1, timeout=None)
+        for n in range(100):
+            c.set(f"k{n}", n, timeout=60 + n)
+        self.assertLessEqual(c.entry_count(), 20)
+        # Soonest-expiring entries go first, keys without a timeout last
+        self.assertTrue(c.has_key("pinned"))
+        self.assertTrue(c.has_key("k99"))
+        self.assertFalse(c.has_key("k0"))
+
+    def test_incr_is_atomic_across_processes(self):
+        result = cache_bench.shared_incr(self.make(), processes=4, incrs=200)
+        self.assertEqual(result["failures"], 0)
+        self.assertEqual(result["final"], 800)
+
+    def test_locmem_is_not_shared_across_processes(self):
+        with cache_bench.backend("locmem") as c:
+            result = cache_bench.shared_incr(c, processes=2, incrs=50)
+        self.assertEqual(result["final"], 0)
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from . import metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@require_GET
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not constant_time_compare(supplied, token):
+            return HttpResponse("Unauthorized\n", status=401, content_type=CONTENT_TYPE)
+    elif not settings.DEBUG:
+        # No token configured: open in development only
+        return HttpResponse("Forbidden: set METRICS_TOKEN\n", status=403, content_type=CONTENT_TYPE)
+
+    return HttpResponse(metrics.render(metrics.collect()), content_type=CONTENT_TYPE)
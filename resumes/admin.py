@@ -1,7 +1,13 @@
 from django.contrib import admin
-from .models import Resume
+from .models import PdfJob, Resume
 
 
 @admin.register(Resume)
 class ResumeAdmin(admin.ModelAdmin):
     list_display = ("full_name", "email", "created_at")
+
+
+@admin.register(PdfJob)
+class PdfJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "resume", "template", "status", "created_at", "finished_at")
+    list_filter = ("status", "template")
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ResumesConfig(AppConfig):
     name = 'resumes'
+
+    def ready(self):
+        # Compile the six layouts once per worker at startup
+        from .registry import warm
+        warm()
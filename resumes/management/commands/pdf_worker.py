@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from resumes.pdf_jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+def worker_loop(poll_interval, once):
+    stop = {"requested": False}
+
+    def request_stop(signum, frame):
+        stop["requested"] = True
+
+    # Finish the job in hand, then exit
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    while not stop["requested"]:
+        close_old_connections()
+        job = claim_next_job()
+
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        run_job(job)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run a pool of WeasyPrint renderers that process queued PDF jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of renderer processes (default: CPU count).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=300,
+            help="Requeue RUNNING jobs older than this many seconds on startup.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        # Children must not share the parent's DB sockets
+        connections.close_all()
+
+        processes = [
+            multiprocessing.Process(
+                target=worker_loop,
+                args=(options["poll_interval"], options["once"]),
+                name=f"pdf-worker-{i}",
+            )
+            for i in range(max(1, options["processes"]))
+        ]
+        for process in processes:
+            process.start()
+
+        self.stdout.write(f"Started {len(processes)} PDF worker(s)")
+
+        def forward_stop(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, forward_stop)
+        signal.signal(signal.SIGINT, forward_stop)
+
+        for process in processes:
+            process.join()
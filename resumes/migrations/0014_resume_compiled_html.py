@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+from resumes.richtext import compile_html
+
+RICH_TEXT_FIELDS = ("summary", "skills", "experience", "education")
+
+
+def backfill_compiled_html(apps, schema_editor):
+    Resume = apps.get_model("resumes", "Resume")
+    resumes = Resume.objects.only("id", *RICH_TEXT_FIELDS)
+    batch = []
+    for resume in resumes.iterator(chunk_size=500):
+        for name in RICH_TEXT_FIELDS:
+            setattr(resume, f"{name}_html", compile_html(getattr(resume, name)))
+        batch.append(resume)
+        if len(batch) >= 500:
+            Resume.objects.bulk_update(batch, [f"{n}_html" for n in RICH_TEXT_FIELDS])
+            batch = []
+    if batch:
+        Resume.objects.bulk_update(batch, [f"{n}_html" for n in RICH_TEXT_FIELDS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0013_pdfjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='education_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='experience_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='skills_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='summary_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        # bulk_update leaves updated_at alone: the content is unchanged, and
+        # the in-process render cache does not survive the deploy anyway
+        migrations.RunPython(backfill_compiled_html, migrations.RunPython.noop),
+    ]
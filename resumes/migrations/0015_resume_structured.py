@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:06
+
+from django.db import migrations, models
+
+from resumes.structure import SECTION_PARSERS
+
+
+def backfill_structured(apps, schema_editor):
+    # Parses the *_html columns that 0014 backfilled
+    Resume = apps.get_model("resumes", "Resume")
+    columns = [f"{name}_html" for name in SECTION_PARSERS]
+    batch = []
+    for resume in Resume.objects.only("id", *columns).iterator(chunk_size=500):
+        resume.structured = {
+            name: parser(getattr(resume, f"{name}_html"))
+            for name, parser in SECTION_PARSERS.items()
+        }
+        batch.append(resume)
+        if len(batch) >= 500:
+            Resume.objects.bulk_update(batch, ["structured"])
+            batch = []
+    if batch:
+        Resume.objects.bulk_update(batch, ["structured"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0014_resume_compiled_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='structured',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill_structured, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Same backfill as 0015, re-run for the stricter heading and date parsing
+backfill_structured = import_module("resumes.migrations.0015_resume_structured").backfill_structured
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0016_resume_user_id_desc_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_structured, migrations.RunPython.noop),
+    ]
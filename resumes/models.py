@@ -1,9 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
 from ckeditor.fields import RichTextField
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .registry import resolve, template_choices
+from .render_cache import render_cache
+from .richtext import compile_html
+from .structure import SECTION_PARSERS
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -21,14 +26,10 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 class Resume(models.Model):
 
-    TEMPLATE_CHOICES = [
-        ("modern", "Modern Resume"),
-        ("professional", "Professional Resume"),
-        ("simple", "Simple Resume"),
-        ("creative", "Creative Resume"),
-        ("executive", "Executive Resume"),
-        ("minimalist", "Minimalist Resume"),
-    ]
+    TEMPLATE_CHOICES = template_choices()
+
+    # Rich-text sections and the compiled column each one renders from
+    RICH_TEXT_FIELDS = ("summary", "skills", "experience", "education")
 
     # ✅ CHANGED HERE (MOST IMPORTANT LINE)
     user = models.ForeignKey(
@@ -46,6 +47,15 @@ class Resume(models.Model):
     experience = RichTextField(blank=True)
     education = RichTextField(blank=True)
 
+    # Sanitized, minified copies of the sections above, built on save
+    summary_html = models.TextField(blank=True, editable=False)
+    skills_html = models.TextField(blank=True, editable=False)
+    experience_html = models.TextField(blank=True, editable=False)
+    education_html = models.TextField(blank=True, editable=False)
+
+    # Parsed skills/experience/education lists (see structure.py)
+    structured = models.JSONField(default=dict, blank=True, editable=False)
+
     work_link = models.URLField(blank=True, null=True)
 
     template = models.CharField(
@@ -59,8 +69,118 @@ class Resume(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # My Resumes pages walk a user's resumes newest first by id
+            models.Index(fields=["user", "-id"], name="resume_user_id_desc_idx"),
+        ]
+
     def __str__(self):
         return f"{self.full_name} ({self.template})"
 
     def is_premium_template(self):
-        return self.template in ["creative", "executive", "minimalist"]
+        return resolve(self.template).is_premium
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_rich_text()
+        return instance
+
+    def _remember_rich_text(self):
+        loaded = self.__dict__
+        self._rich_text_saved = {
+            name: loaded[name] for name in self.RICH_TEXT_FIELDS if name in loaded
+        }
+
+    def compile_rich_text(self, fields=None):
+        """Rebuild derived columns for changed sections; returns the ones rebuilt."""
+        saved = getattr(self, "_rich_text_saved", {})
+        deferred = self.get_deferred_fields()
+        compiled = []
+        for name in fields or self.RICH_TEXT_FIELDS:
+            if name in deferred:
+                continue
+            value = getattr(self, name)
+            # Only sections that changed since they were loaded
+            if name in saved and saved[name] == value:
+                continue
+            html = compile_html(value)
+            setattr(self, f"{name}_html", html)
+            compiled.append(f"{name}_html")
+
+            parser = SECTION_PARSERS.get(name)
+            if parser is not None:
+                self.structured = {**(self.structured or {}), name: parser(html)}
+                if "structured" not in compiled:
+                    compiled.append("structured")
+        return compiled
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.compile_rich_text()
+        else:
+            update_fields = set(update_fields)
+            changed = update_fields.intersection(self.RICH_TEXT_FIELDS)
+            if changed:
+                update_fields.update(self.compile_rich_text(changed))
+                kwargs["update_fields"] = update_fields
+
+        super().save(*args, **kwargs)
+        self._remember_rich_text()
+
+
+
+@receiver(post_save, sender=Resume)
+@receiver(post_delete, sender=Resume)
+def invalidate_rendered_resume(sender, instance, **kwargs):
+    render_cache.invalidate(instance.id)
+
+class PdfJob(models.Model):
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="pdf_jobs"
+    )
+    resume = models.ForeignKey(
+        Resume,
+        on_delete=models.CASCADE,
+        related_name="pdf_jobs"
+    )
+
+    template = models.CharField(max_length=50)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED
+    )
+
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job first
+            models.Index(fields=["status", "created_at"], name="pdfjob_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"PDF job {self.id} ({self.status})"
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+from .render_cache import render_resume
+
+
+# ===============================
+# WEASYPRINT SAFE LOADER
+# ===============================
+def get_weasyprint():
+    # Imported lazily: WeasyPrint needs pango/cairo at import time and we
+    # don't want every web worker (or manage.py command) to pay for that.
+    from weasyprint import HTML
+    return HTML
+
+
+# ===============================
+# CACHE KEYS
+# ===============================
+def resume_version(resume):
+    """Short hash that changes whenever the resume row is saved."""
+    raw = f"{resume.id}:{resume.updated_at.isoformat()}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def pdf_cache_key(resume, template):
+    """Content address of a rendered PDF: (id, updated_at, template, color)."""
+    variant = hashlib.sha256(f"{template}:{resume.color}".encode()).hexdigest()[:16]
+    return f"{resume_version(resume)}_{variant}"
+
+
+def pdf_cache_path(resume, template):
+    cache_dir = Path(settings.PDF_CACHE_DIR) / str(resume.id)
+    return cache_dir / f"{pdf_cache_key(resume, template)}.pdf"
+
+
+def cached_pdf(resume, template):
+    """Path of the complete cached PDF for this version, or None."""
+    path = pdf_cache_path(resume, template)
+    return path if _is_complete_pdf(path) else None
+
+
+def _is_complete_pdf(path):
+    # Renders are renamed into place, but a crash, a full disk or a file
+    # restored from a backup can still leave a truncated one behind.
+    try:
+        with open(path, "rb") as fh:
+            if fh.read(5) != b"%PDF-":
+                return False
+            fh.seek(0, os.SEEK_END)
+            fh.seek(max(0, fh.tell() - 1024))
+            return b"%%EOF" in fh.read()
+    except FileNotFoundError:
+        return False
+
+
+# ===============================
+# RENDER
+# ===============================
+def render_resume_pdf(resume, template, base_url=None):
+    """
+    Return the path of the vector PDF for ``resume`` in ``template``.
+
+    PDFs are cached on disk under their content address, so repeat
+    downloads of an unchanged resume never re-render.
+    """
+    cached = cached_pdf(resume, template)
+    if cached is not None:
+        return cached
+
+    path = pdf_cache_path(resume, template)
+    HTML = get_weasyprint()
+    html = render_resume(resume, template, is_public=True)
+    pdf_bytes = HTML(string=html, base_url=base_url).write_pdf()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, pdf_bytes)
+    _prune_stale(path.parent, resume_version(resume))
+    return path
+
+
+def _write_atomic(path, data):
+    # Two workers may render the same key at once; write to a temp file in
+    # the same directory and rename so readers never see a partial PDF.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _prune_stale(cache_dir, version):
+    # PDFs rendered from an older version of the resume can never be
+    # served again, so drop them instead of letting the cache grow.
+    for entry in cache_dir.glob("*.pdf"):
+        if not entry.name.startswith(version):
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,95 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PdfJob
+from .pdf import cached_pdf, render_resume_pdf
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================
+# ENQUEUE
+# ===============================
+def enqueue_pdf_job(user, resume, template):
+    # An unchanged resume that was already rendered doesn't need a worker.
+    path = cached_pdf(resume, template)
+    if path is not None:
+        return PdfJob.objects.create(
+            user=user,
+            resume=resume,
+            template=template,
+            status=PdfJob.STATUS_DONE,
+            file_path=str(path),
+            finished_at=timezone.now(),
+        )
+
+    return PdfJob.objects.create(user=user, resume=resume, template=template)
+
+
+# ===============================
+# CLAIM
+# ===============================
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to RUNNING and return it.
+
+    Row locks with SKIP LOCKED let many workers poll the same table without
+    blocking each other. Backends without row locking (SQLite) fall back
+    to the conditional UPDATE, which still guarantees a single winner.
+    """
+    with transaction.atomic():
+        job = (
+            PdfJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=PdfJob.STATUS_QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        claimed = PdfJob.objects.filter(
+            pk=job.pk,
+            status=PdfJob.STATUS_QUEUED,
+        ).update(status=PdfJob.STATUS_RUNNING, started_at=timezone.now())
+
+    if not claimed:
+        return None
+
+    return PdfJob.objects.select_related("resume").get(pk=job.pk)
+
+
+def requeue_stale_jobs(older_than):
+    # Jobs left RUNNING by a worker that died mid-render
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return PdfJob.objects.filter(
+        status=PdfJob.STATUS_RUNNING,
+        started_at__lt=cutoff,
+    ).update(status=PdfJob.STATUS_QUEUED, started_at=None)
+
+
+# ===============================
+# RUN
+# ===============================
+def run_job(job):
+    try:
+        path = render_resume_pdf(
+            job.resume,
+            job.template,
+            base_url=settings.PDF_BASE_URL,
+        )
+    except Exception as e:
+        logger.exception("PDF job %s failed", job.id)
+        job.status = PdfJob.STATUS_FAILED
+        job.error = str(e)
+    else:
+        job.status = PdfJob.STATUS_DONE
+        job.file_path = str(path)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "file_path", "error", "finished_at"])
+    return job
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from django.conf import settings
+from django.template.loader import get_template
+
+FREE = "free"
+PREMIUM = "premium"
+DEFAULT_TEMPLATE = "modern"
+
+
+# ===============================
+# ONE RESUME LAYOUT
+# ===============================
+class ResumeTemplate:
+    """A resume layout: metadata, tier, compiled template and render timings."""
+
+    def __init__(self, key, name, tier):
+        self.key = key
+        self.name = name
+        self.tier = tier
+        self.path = f"{key}.html"
+        self.template = None
+
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.slowest = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def label(self):
+        return f"{self.name} Resume"
+
+    @property
+    def is_premium(self):
+        return self.tier == PREMIUM
+
+    def load(self):
+        # get_template goes through the cached loader, so this parses the
+        # file once per process; DEBUG re-fetches so edits show up.
+        if self.template is None or settings.DEBUG:
+            self.template = get_template(self.path)
+        return self.template
+
+    def render(self, context):
+        template = self.load()
+        started = time.perf_counter()
+        html = template.render(context)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.renders += 1
+            self.render_seconds += elapsed
+            self.slowest = max(self.slowest, elapsed)
+        return html
+
+    def timings(self):
+        with self._lock:
+            renders, total, slowest = self.renders, self.render_seconds, self.slowest
+        return {
+            "tier": self.tier,
+            "renders": renders,
+            "avg_ms": round(total / renders * 1000, 3) if renders else None,
+            "max_ms": round(slowest * 1000, 3),
+        }
+
+
+# ===============================
+# REGISTRY
+# ===============================
+RESUME_TEMPLATES = {
+    t.key: t
+    for t in (
+        ResumeTemplate("modern", "Modern", FREE),
+        ResumeTemplate("professional", "Professional", FREE),
+        ResumeTemplate("simple", "Simple", FREE),
+        ResumeTemplate("creative", "Creative", PREMIUM),
+        ResumeTemplate("executive", "Executive", PREMIUM),
+        ResumeTemplate("minimalist", "Minimalist", PREMIUM),
+    )
+}
+
+
+def get_resume_template(key):
+    """The registered layout, or None for an unknown key."""
+    return RESUME_TEMPLATES.get(key)
+
+
+def resolve(key):
+    """The registered layout, falling back to the default one."""
+    return RESUME_TEMPLATES.get(key) or RESUME_TEMPLATES[DEFAULT_TEMPLATE]
+
+
+def template_choices():
+    return [(t.key, t.label) for t in RESUME_TEMPLATES.values()]
+
+
+def templates_by_tier(tier):
+    return [t for t in RESUME_TEMPLATES.values() if t.tier == tier]
+
+
+def warm():
+    """Compile every layout now, so no request pays the parse cost."""
+    for resume_template in RESUME_TEMPLATES.values():
+        resume_template.load()
+
+
+def render_timings():
+    return {key: t.timings() for key, t in RESUME_TEMPLATES.items()}
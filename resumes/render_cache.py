@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .registry import resolve
+
+
+# ===============================
+# LRU STORE
+# ===============================
+class RenderCache:
+    """
+    Bounded, thread-safe LRU of rendered resume HTML.
+
+    Keys are (resume id, updated_at, template, is_public), so an entry can
+    never be served for a newer version of the resume; the post_save
+    receiver only frees the memory early.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_resume = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            self._keys_by_resume.setdefault(key[0], set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+
+    def invalidate(self, resume_id):
+        with self._lock:
+            for key in self._keys_by_resume.pop(resume_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_resume.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _forget(self, key):
+        keys = self._keys_by_resume.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_resume[key[0]]
+
+
+render_cache = RenderCache(settings.RESUME_RENDER_CACHE_SIZE)
+
+
+# ===============================
+# HELPERS
+# ===============================
+def render_key(resume_id, updated_at, template, is_public):
+    return (resume_id, updated_at, template, is_public)
+
+
+def get_rendered(resume_id, updated_at, template, is_public):
+    return render_cache.get(render_key(resume_id, updated_at, template, is_public))
+
+
+def render_resume(resume, template, is_public):
+    """Render the ``template`` layout for ``resume``, reusing a cached copy."""
+    key = render_key(resume.id, resume.updated_at, template, is_public)
+
+    html = render_cache.get(key)
+    if html is None:
+        html = resolve(template).render({
+            "resume": resume,
+            "is_public": is_public,
+        })
+        render_cache.set(key, html)
+
+    return html
@@ -0,0 +1,138 @@
+"""
+Save-time compiler for the CKEditor sections of a resume.
+
+CKEditor output is verbose (nested spans, inline styles, empty
+paragraphs) and was emitted raw with ``|safe``. ``compile_html`` turns it
+into a small, allowlisted fragment once, when the resume is saved, so the
+templates render the stored result without any per-request work.
+"""
+import html
+import re
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    "p", "br", "ul", "ol", "li", "strong", "em", "u", "s",
+    "a", "h3", "h4", "blockquote",
+}
+# Same meaning, one spelling
+RENAMED_TAGS = {
+    "b": "strong", "i": "em", "strike": "s", "del": "s",
+    "h1": "h3", "h2": "h3", "h5": "h4", "h6": "h4",
+}
+# Dropped together with everything inside them
+DROPPED_TAGS = {
+    "script", "style", "iframe", "object", "embed",
+    "template", "noscript", "head", "title",
+}
+VOID_TAGS = {"br"}
+BLOCK_TAGS = {"p", "ul", "ol", "li", "h3", "h4", "blockquote"}
+
+SAFE_URL_RE = re.compile(r"^(?:https?:|mailto:|tel:|#|/)", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+BLOCK_EDGE_RE = re.compile(r"\s*(</?(?:%s)>|<br>)\s*" % "|".join(sorted(BLOCK_TAGS)))
+TAG_RE = re.compile(r"<[a-zA-Z!/]")
+# A <br> next to a block edge only adds a blank line
+BR_AFTER_BLOCK_RE = re.compile(r"(</?(?:%s)>)(?:<br>)+" % "|".join(sorted(BLOCK_TAGS)))
+BR_BEFORE_BLOCK_RE = re.compile(r"(?:<br>)+(</?(?:%s)>)" % "|".join(sorted(BLOCK_TAGS)))
+EDGE_BR_RE = re.compile(r"^(?:<br>)+|(?:<br>)+$")
+
+
+class _Compiler(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        # (tag, index of its start tag in self.out)
+        self.open = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+
+        tag = RENAMED_TAGS.get(tag, tag)
+        if tag not in ALLOWED_TAGS:
+            # span, font, div...: keep the text, lose the wrapper
+            return
+        if tag in VOID_TAGS:
+            self.out.append(f"<{tag}>")
+            return
+
+        start = f"<{tag}>"
+        if tag == "a":
+            href = (dict(attrs).get("href") or "").strip()
+            if not SAFE_URL_RE.match(href):
+                return
+            start = f'<a href="{html.escape(href)}">'
+        self.open.append((tag, len(self.out)))
+        self.out.append(start)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if RENAMED_TAGS.get(tag, tag) not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping:
+            return
+        if tag == "div":
+            # CKEditor's div mode: each div is a line
+            self.out.append("<br>")
+            return
+
+        tag = RENAMED_TAGS.get(tag, tag)
+        if not any(open_tag == tag for open_tag, _ in self.open):
+            return
+        while self.open:
+            open_tag, _ = self.open[-1]
+            self._close()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(html.escape(WHITESPACE_RE.sub(" ", data), quote=False))
+
+    def _close(self):
+        tag, index = self.open.pop()
+        body = "".join(self.out[index + 1:])
+        if not body.replace("<br>", "").strip():
+            # Empty paragraphs, bare <strong></strong>, <p>&nbsp;</p>...
+            del self.out[index:]
+        else:
+            self.out.append(f"</{tag}>")
+
+    def result(self):
+        self.close()
+        while self.open:
+            self._close()
+        fragment = BLOCK_EDGE_RE.sub(r"\1", "".join(self.out)).strip()
+        fragment = BR_AFTER_BLOCK_RE.sub(r"\1", fragment)
+        fragment = BR_BEFORE_BLOCK_RE.sub(r"\1", fragment)
+        # Nor is one at either end
+        return EDGE_BR_RE.sub("", fragment)
+
+
+def _plain_text(text):
+    # Sections filled from the create page are plain lines, not HTML
+    lines = (WHITESPACE_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "<br>".join(html.escape(line, quote=False) for line in lines if line)
+
+
+def compile_html(raw):
+    """Sanitize, normalize and minify one rich-text section."""
+    raw = (raw or "").replace("\xa0", " ")
+    if not raw.strip():
+        return ""
+    if not TAG_RE.search(raw):
+        return _plain_text(raw)
+
+    compiler = _Compiler()
+    compiler.feed(raw)
+    return compiler.result()
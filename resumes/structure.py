@@ -0,0 +1,203 @@
+"""
+Structured render model for the list-like resume sections.
+
+Built on save from the compiled ``*_html`` columns (see richtext.py) and
+stored on ``Resume.structured``::
+
+    {
+        "skills": ["Python", "Django"],
+        "experience": [{"heading", "title", "org", "dates", "bullets"}],
+        "education": [{"heading", "title", "org", "dates", "bullets"}],
+    }
+
+Templates, the PDF renderer and the create/edit pages read this instead
+of re-splitting text on every render.
+"""
+import re
+from html.parser import HTMLParser
+
+MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+DATE_POINT = rf"(?:{MONTH}\s+)?(?:\d{{1,2}}/)?(?:19|20)\d{{2}}"
+DATE_END = rf"(?:{DATE_POINT}|present|current|now|today)"
+DATE_RANGE = rf"{DATE_POINT}\s*(?:-|–|—|to)\s*{DATE_END}"
+# "(2019)", "(May 2019 - Present)", "2015–2017" or a trailing ", 2019";
+# a lone year inside a sentence ("used by 2000 people") is not a date
+DATES_RE = re.compile(
+    rf"\(\s*(?P<paren>{DATE_RANGE}|{DATE_POINT})\s*\)"
+    rf"|\b(?P<range>{DATE_RANGE})\b"
+    rf"|(?:[,|–—]|\s-)\s*(?P<last>{DATE_POINT})\.?\s*$",
+    re.IGNORECASE,
+)
+# "Engineer at Acme", "Engineer | Acme", "Engineer - Acme". A comma
+# ("B.Sc, MIT, 2019") only splits a line that also carries dates
+HEADING_SPLIT_RE = re.compile(r"\s+(?:at|@)\s+|\s*[|–—]\s*|\s+-\s+", re.IGNORECASE)
+# Title and org are short names, not sentences
+HEADING_MAX_WORDS = 8
+SENTENCE_RE = re.compile(r"[.!?;:]\s")
+SEPARATORS = " ,.|-–—()"
+HEADING_HINT_RE = re.compile(r"\s(?:at|@)\s|\|", re.IGNORECASE)
+BULLET_RE = re.compile(r"^\s*(?:[-*•·▪◦]+|\d+[.)])\s+")
+SKILL_SPLIT_RE = re.compile(r"[,;|•·]+")
+
+BREAK_TAGS = {"p", "br", "ul", "ol", "li", "h3", "h4", "blockquote"}
+EMPHASIS_TAGS = {"strong", "h3", "h4"}
+
+
+class _LineReader(HTMLParser):
+    """Split compiled section HTML into ``(text, is_bullet, is_emphasized)`` lines."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self.text = []
+        self.plain = False
+        self.list_depth = 0
+        self.emphasis = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BREAK_TAGS:
+            self.flush()
+        if tag == "li":
+            self.list_depth += 1
+        if tag in EMPHASIS_TAGS:
+            self.emphasis += 1
+
+    def handle_endtag(self, tag):
+        if tag in BREAK_TAGS:
+            self.flush()
+        if tag == "li":
+            self.list_depth = max(self.list_depth - 1, 0)
+        if tag in EMPHASIS_TAGS:
+            self.emphasis = max(self.emphasis - 1, 0)
+
+    def handle_data(self, data):
+        self.text.append(data)
+        if data.strip() and not self.emphasis:
+            self.plain = True
+
+    def flush(self):
+        line = " ".join("".join(self.text).split())
+        if line:
+            bullet = self.list_depth > 0 or bool(BULLET_RE.match(line))
+            self.lines.append((BULLET_RE.sub("", line), bullet, not self.plain))
+        self.text = []
+        self.plain = False
+
+    def read(self, html):
+        self.feed(html or "")
+        self.close()
+        self.flush()
+        return self.lines
+
+
+def lines_of(html):
+    return _LineReader().read(html)
+
+
+def find_dates(line):
+    """``(dates, line without them)``, or None when the line has no dates.
+
+    Dates must open or close the line; a range in the middle of a sentence
+    is prose.
+    """
+    for match in reversed(list(DATES_RE.finditer(line))):
+        before, after = line[:match.start()], line[match.end():]
+        if before.strip(SEPARATORS) and after.strip(SEPARATORS):
+            continue
+        dates = match.group("paren") or match.group("range") or match.group("last")
+        return dates.strip(), before + after
+    return None
+
+
+def _is_name(part):
+    return len(part.split()) <= HEADING_MAX_WORDS and not SENTENCE_RE.search(part)
+
+
+def split_heading(text, comma=False):
+    """``[title, org]`` (org may be missing), or None if ``text`` reads as prose."""
+    parts = HEADING_SPLIT_RE.split(text, maxsplit=1)
+    if len(parts) == 1 and comma:
+        parts = text.split(",", 1)
+    parts = [part.strip(SEPARATORS) for part in parts]
+    if all(part and _is_name(part) for part in parts):
+        return parts
+    return None
+
+
+def parse_heading(heading):
+    """``"Engineer at Acme (2019 - Present)"`` -> an entry with title, org and dates."""
+    found = find_dates(heading)
+    dates, rest = found if found else ("", heading)
+
+    parts = split_heading(rest.strip(SEPARATORS), comma=found is not None)
+    if parts is None or (found is None and len(parts) == 1):
+        # Nothing to pull apart: keep the line exactly as written
+        parts, dates = [heading], ""
+    return {
+        "heading": heading,
+        "title": parts[0],
+        "org": parts[1] if len(parts) > 1 else "",
+        "dates": dates,
+        "bullets": [],
+    }
+
+
+def parse_entries(html, every_line_is_entry=False):
+    """
+    Group lines into entries: a heading line followed by its bullets.
+
+    A heading is any non-bullet line that carries dates, an "at"/"|"
+    separator or is fully emphasized; with ``every_line_is_entry`` (one
+    education entry per line) every non-bullet line is one. Bullets before
+    the first heading go into an entry without one.
+    """
+    entries = []
+    for text, bullet, emphasized in lines_of(html):
+        is_heading = not bullet and (
+            every_line_is_entry
+            or emphasized
+            or find_dates(text)
+            or HEADING_HINT_RE.search(text)
+        )
+        if is_heading:
+            entries.append(parse_heading(text))
+            continue
+        if not entries:
+            entries.append(parse_heading(""))
+        entries[-1]["bullets"].append(text)
+    return entries
+
+
+def parse_experience(html):
+    return parse_entries(html)
+
+
+def parse_education(html):
+    return parse_entries(html, every_line_is_entry=True)
+
+
+def parse_skills(html):
+    seen, skills = set(), []
+    for text, _bullet, _emphasized in lines_of(html):
+        for skill in SKILL_SPLIT_RE.split(text):
+            skill = skill.strip(" .")
+            if skill and skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return skills
+
+
+# Section name -> parser over its compiled HTML
+SECTION_PARSERS = {
+    "skills": parse_skills,
+    "experience": parse_experience,
+    "education": parse_education,
+}
+
+
+def build(sections):
+    """Full structured model from ``{section: compiled_html}``."""
+    return {
+        name: parser(sections.get(name, ""))
+        for name, parser in SECTION_PARSERS.items()
+    }
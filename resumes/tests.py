@@ -1,3 +1,633 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from . import pdf, registry
+from .models import PdfJob, Resume
+from .pdf_jobs import claim_next_job, enqueue_pdf_job, requeue_stale_jobs, run_job
+from .render_cache import RenderCache, render_cache, render_resume
+from .richtext import compile_html
+from .structure import parse_education, parse_experience, parse_skills
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(
+            user=self.user,
+            full_name="Ada Lovelace",
+            email="ada@example.com",
+            summary="<p>Analyst</p>",
+        )
+        self.client.force_login(self.user)
+
+    def preview(self, template, **headers):
+        url = reverse("resumes:resume_preview", args=[self.resume.id])
+        return self.client.get(url, {"template": template}, headers=headers)
+
+    def test_public_page_revalidates_with_304(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(second.status_code, 304)
+
+    def test_public_etag_changes_after_edit(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        first = self.client.get(url)
+
+        self.resume.summary = "<p>Engineer</p>"
+        self.resume.save()
+
+        second = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, "Engineer")
+
+    def test_preview_unchanged_template_is_304(self):
+        # The first visit sets the CSRF cookie that the ETag covers
+        self.preview("modern")
+        first = self.preview("modern")
+        second = self.preview("modern", if_none_match=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+
+    def test_preview_template_switch_is_never_skipped(self):
+        self.preview("modern")
+        modern = self.preview("modern")
+        self.preview("executive")
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.template, "executive")
+
+        # An old validator must not turn the switch back into a no-op
+        response = self.preview("modern", if_none_match=modern["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.template, "modern")
+
+
+class TemplateRegistryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(
+            user=self.user, full_name="Ada Lovelace", email="ada@example.com"
+        )
+        self.client.force_login(self.user)
+
+    def test_model_choices_come_from_registry(self):
+        self.assertEqual(Resume.TEMPLATE_CHOICES, registry.template_choices())
+        self.assertEqual(dict(Resume.TEMPLATE_CHOICES)["executive"], "Executive Resume")
+
+    def test_unknown_key_falls_back_to_default(self):
+        self.assertIsNone(registry.get_resume_template("fancy"))
+        self.assertEqual(registry.resolve("fancy").key, registry.DEFAULT_TEMPLATE)
+
+    def test_warm_compiles_every_layout(self):
+        registry.warm()
+        for resume_template in registry.RESUME_TEMPLATES.values():
+            self.assertIsNotNone(resume_template.template)
+
+    def test_premium_follows_tier(self):
+        self.resume.template = "creative"
+        self.assertTrue(self.resume.is_premium_template())
+        self.resume.template = "simple"
+        self.assertFalse(self.resume.is_premium_template())
+
+    def test_public_render_records_timings(self):
+        before = registry.resolve("professional").timings()["renders"]
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        self.client.get(url, {"template": "professional"})
+        after = registry.resolve("professional").timings()
+        self.assertEqual(after["renders"], before + 1)
+        self.assertIsNotNone(after["avg_ms"])
+
+    def test_premium_pdf_needs_unlock(self):
+        url = reverse("resumes:resume_pdf", args=[self.resume.id])
+        response = self.client.get(url, {"template": "executive"})
+        self.assertRedirects(
+            response,
+            reverse("resumes:resume_preview", args=[self.resume.id]),
+            fetch_redirect_response=False,
+        )
+
+    def test_preview_picker_lists_registry(self):
+        url = reverse("resumes:resume_preview", args=[self.resume.id])
+        response = self.client.get(url, {"template": "minimalist"})
+        for key in registry.RESUME_TEMPLATES:
+            self.assertContains(response, f"?template={key}")
+        self.assertContains(response, "Unlock Premium")
+
+    def test_stats_are_staff_only(self):
+        url = reverse("resumes:template_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get(url).json()
+        self.assertEqual(set(stats), set(registry.RESUME_TEMPLATES))
+        self.assertEqual(stats["creative"]["tier"], registry.PREMIUM)
+
+
+class RichTextTests(TestCase):
+
+    def test_ckeditor_noise_is_stripped(self):
+        raw = (
+            '<p><span style="color:red"><b>Led</b>  the   team</span></p>\n'
+            "<p>&nbsp;</p><p><br></p>"
+        )
+        self.assertEqual(compile_html(raw), "<p><strong>Led</strong> the team</p>")
+
+    def test_unsafe_markup_is_dropped(self):
+        raw = (
+            '<script>alert(1)</script><p onclick="x">Hi '
+            '<a href="javascript:alert(1)">bad</a> '
+            '<a href="https://example.com" target="_blank">site</a></p>'
+            '<img src=x onerror="alert(1)">'
+        )
+        self.assertEqual(
+            compile_html(raw), '<p>Hi bad <a href="https://example.com">site</a></p>'
+        )
+
+    def test_text_is_escaped(self):
+        self.assertEqual(compile_html("<p>a &lt; b & c</p>"), "<p>a &lt; b &amp; c</p>")
+
+    def test_lists_lose_formatting_whitespace(self):
+        raw = "<ul>\n  <li>One</li>\n  <li><p>Two<br></p></li>\n</ul>"
+        self.assertEqual(compile_html(raw), "<ul><li>One</li><li><p>Two</p></li></ul>")
+
+    def test_plain_lines_keep_their_breaks(self):
+        self.assertEqual(
+            compile_html("Python\n  Django\n\nC & C++"), "Python<br>Django<br>C &amp; C++"
+        )
+        self.assertEqual(compile_html("  \n "), "")
+
+
+class CompiledSectionsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(
+            user=self.user,
+            full_name="Ada Lovelace",
+            email="ada@example.com",
+            summary='<p><span style="font-size:12px">Analyst</span></p>',
+            skills="<p>&nbsp;</p>",
+        )
+
+    def test_sections_compile_on_create(self):
+        self.assertEqual(self.resume.summary_html, "<p>Analyst</p>")
+        self.assertEqual(self.resume.skills_html, "")
+
+    def test_only_changed_sections_recompile(self):
+        resume = Resume.objects.get(id=self.resume.id)
+        resume.experience = "<p>Engineer</p>"
+        with mock.patch("resumes.models.compile_html", wraps=compile_html) as compile:
+            resume.save()
+        compile.assert_called_once_with("<p>Engineer</p>")
+
+        with mock.patch("resumes.models.compile_html", wraps=compile_html) as compile:
+            resume.save()
+        compile.assert_not_called()
+
+    def test_update_fields_also_writes_compiled_column(self):
+        resume = Resume.objects.get(id=self.resume.id)
+        resume.summary = "<p><i>Engineer</i></p>"
+        resume.save(update_fields=["summary", "updated_at"])
+
+        resume.refresh_from_db()
+        self.assertEqual(resume.summary_html, "<p><em>Engineer</em></p>")
+
+    def test_deferred_sections_are_left_alone(self):
+        resume = Resume.objects.only("id", "user", "template").get(id=self.resume.id)
+        resume.template = "simple"
+        resume.save()
+
+        resume.refresh_from_db()
+        self.assertEqual(resume.summary_html, "<p>Analyst</p>")
+
+    def test_templates_render_compiled_sections(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        response = self.client.get(url)
+        self.assertContains(response, "<p>Analyst</p>")
+        self.assertNotContains(response, "font-size:12px")
+
+
+class StructuredModelTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(
+            user=self.user,
+            full_name="Ada Lovelace",
+            email="ada@example.com",
+            skills="Python, Django\npython\nSQL",
+            experience=(
+                "Engineer at Initech (Jan 2018 - Present)\n"
+                "- Shipped v2\n"
+                "Data Analyst | Globex | 2015–2017\n"
+                "Built dashboards"
+            ),
+            education="B.Sc Computer Science, MIT, 2015-2019",
+        )
+
+    def test_skills_are_split_and_deduplicated(self):
+        html = compile_html("<ul><li>Go; Rust</li><li>go</li></ul>")
+        self.assertEqual(parse_skills(html), ["Go", "Rust"])
+
+    def test_experience_headings_and_bullets(self):
+        first, second = self.resume.structured["experience"]
+        self.assertEqual(
+            (first["title"], first["org"], first["dates"], first["bullets"]),
+            ("Engineer", "Initech", "Jan 2018 - Present", ["Shipped v2"]),
+        )
+        self.assertEqual((second["title"], second["org"]), ("Data Analyst", "Globex"))
+        self.assertEqual(second["bullets"], ["Built dashboards"])
+
+    def test_emphasized_line_starts_an_entry(self):
+        html = compile_html("<p><b>Team Lead</b></p><ul><li>Hired four</li></ul>")
+        [entry] = parse_experience(html)
+        self.assertEqual((entry["title"], entry["bullets"]), ("Team Lead", ["Hired four"]))
+
+    def test_every_education_line_is_an_entry(self):
+        [entry] = self.resume.structured["education"]
+        self.assertEqual(
+            (entry["title"], entry["org"], entry["dates"]),
+            ("B.Sc Computer Science", "MIT", "2015-2019"),
+        )
+        self.assertEqual(len(parse_education(compile_html("School A\nSchool B"))), 2)
+
+    def test_prose_lines_are_kept_verbatim(self):
+        lines = (
+            "I built x.com, used by 2000 people.",
+            "Grew the team from 3 to 12 engineers, 2021 hiring plan owner.",
+        )
+        html = compile_html(
+            '<p>I built <a href="https://x.com">x.com</a>, used by 2000 people.</p>'
+            "<p>Grew the team from 3 to 12 engineers, 2021 hiring plan owner.</p>"
+        )
+        [entry] = parse_experience(html)
+        self.assertEqual((entry["title"], entry["bullets"]), ("", list(lines)))
+
+        for entry, line in zip(parse_education(html), lines):
+            self.assertEqual((entry["title"], entry["org"], entry["dates"]), (line, "", ""))
+
+    def test_only_dates_that_open_or_close_a_heading_count(self):
+        [entry] = parse_education(compile_html("From 2019 to 2021 I led the platform team"))
+        self.assertEqual((entry["title"], entry["dates"]), ("From 2019 to 2021 I led the platform team", ""))
+
+        [entry] = parse_education(compile_html("Harvard, 2019"))
+        self.assertEqual((entry["title"], entry["dates"]), ("Harvard", "2019"))
+
+        [entry] = parse_education(compile_html("B.Sc, MIT"))
+        self.assertEqual((entry["title"], entry["org"]), ("B.Sc, MIT", ""))
+
+    def test_only_the_changed_section_is_reparsed(self):
+        resume = Resume.objects.get(id=self.resume.id)
+        resume.skills = "Go"
+        with mock.patch("resumes.models.SECTION_PARSERS", {
+            "skills": mock.Mock(return_value=["Go"]),
+            "experience": mock.Mock(),
+            "education": mock.Mock(),
+        }) as parsers:
+            resume.save(update_fields=["skills", "updated_at"])
+        parsers["experience"].assert_not_called()
+
+        resume.refresh_from_db()
+        self.assertEqual(resume.structured["skills"], ["Go"])
+        self.assertEqual(len(resume.structured["experience"]), 2)
+
+    def test_layouts_render_the_structured_model(self):
+        url = reverse("resumes:resume_public", args=[self.resume.id])
+        for key in registry.RESUME_TEMPLATES:
+            response = self.client.get(url, {"template": key})
+            self.assertContains(response, "<strong>Engineer</strong>, Initech", msg_prefix=key)
+            self.assertContains(response, "<li>Shipped v2</li>", msg_prefix=key)
+            self.assertContains(response, "<li>SQL</li>", msg_prefix=key)
+
+    def test_create_page_gets_the_model_as_json(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("resumes:create_resume"))
+        self.assertContains(response, 'id="resumeStructured"')
+        self.assertContains(response, "B.Sc Computer Science, MIT, 2015-2019")
+
+
+@override_settings(RESUME_LIST_PAGE_SIZE=2)
+class MyResumesPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.ids = [
+            Resume.objects.create(user=self.user, full_name=f"Resume {n}", email="a@b.c").id
+            for n in range(5)
+        ]
+        other = User.objects.create_user("bob", "bob@example.com", "pw")
+        Resume.objects.create(user=other, full_name="Not mine", email="b@b.c")
+        self.client.force_login(self.user)
+
+    def page(self, **params):
+        return self.client.get(reverse("resumes:my_resumes"), params)
+
+    def test_pages_walk_newest_first_without_overlap(self):
+        seen, params = [], {}
+        while True:
+            response = self.page(**params)
+            seen += [r.id for r in response.context["resumes"]]
+            cursor = response.context["next_cursor"]
+            if cursor is None:
+                break
+            params = {"after": cursor}
+        self.assertEqual(seen, sorted(self.ids, reverse=True))
+
+    def test_cards_load_only_card_columns(self):
+        response = self.page()
+        resume = response.context["resumes"][0]
+        self.assertIn("experience", resume.get_deferred_fields())
+        self.assertIn("structured", resume.get_deferred_fields())
+        self.assertNotContains(response, "Not mine")
+
+    def test_each_page_is_one_query(self):
+        self.page()  # session and user lookups warm up
+        with self.assertNumQueries(3):
+            # session, user, one page of resumes
+            self.page(after=self.ids[3])
+
+    def test_partial_returns_cards_and_next_cursor(self):
+        response = self.page(after=self.ids[2], partial=1)
+        self.assertContains(response, "Resume 1")
+        self.assertContains(response, "Resume 0")
+        self.assertNotContains(response, "<html")
+        self.assertEqual(response["X-Next-Cursor"], "")
+
+    def test_bad_cursor_starts_from_the_top(self):
+        response = self.page(after="oops")
+        self.assertEqual(response.context["resumes"][0].id, self.ids[-1])
+
+
+class FakeHTML:
+    """Stands in for weasyprint.HTML, which needs pango to import."""
+
+    renders = 0
+
+    def __init__(self, string, base_url=None):
+        self.string = string
+
+    def write_pdf(self):
+        FakeHTML.renders += 1
+        return b"%PDF-1.7\n" + self.string.encode()[:64] + b"\n%%EOF\n"
+
+
+class PdfTestMixin:
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch("resumes.pdf.get_weasyprint", return_value=FakeHTML)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        FakeHTML.renders = 0
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(
+            user=self.user, full_name="Ada Lovelace", email="ada@example.com", color="#123456"
+        )
+
+
+class PdfCacheTests(PdfTestMixin, TestCase):
+
+    def test_repeat_renders_are_served_from_disk(self):
+        first = pdf.render_resume_pdf(self.resume, "modern")
+        second = pdf.render_resume_pdf(self.resume, "modern")
+        self.assertEqual(first, second)
+        self.assertEqual(FakeHTML.renders, 1)
+        self.assertTrue(first.read_bytes().startswith(b"%PDF-"))
+
+    def test_template_and_color_get_their_own_files(self):
+        modern = pdf.render_resume_pdf(self.resume, "modern")
+        simple = pdf.render_resume_pdf(self.resume, "simple")
+        self.resume.color = "#654321"
+        recolored = pdf.render_resume_pdf(self.resume, "modern")
+        self.assertEqual(len({modern, simple, recolored}), 3)
+        self.assertEqual(FakeHTML.renders, 3)
+
+    def test_an_edit_renders_again_and_prunes_the_old_version(self):
+        old = pdf.render_resume_pdf(self.resume, "modern")
+        self.resume.summary = "<p>Engineer</p>"
+        self.resume.save()
+
+        new = pdf.render_resume_pdf(self.resume, "modern")
+        self.assertNotEqual(old, new)
+        self.assertEqual(FakeHTML.renders, 2)
+        self.assertFalse(old.exists())
+        self.assertEqual(list(new.parent.glob("*.pdf")), [new])
+
+    def test_truncated_or_corrupt_files_are_rendered_again(self):
+        path = pdf.pdf_cache_path(self.resume, "modern")
+        path.parent.mkdir(parents=True)
+        for junk in (b"", b"%PDF-1.7\npartial", b"<html>not a pdf</html>\n%%EOF"):
+            path.write_bytes(junk)
+            self.assertIsNone(pdf.cached_pdf(self.resume, "modern"))
+            self.assertEqual(pdf.render_resume_pdf(self.resume, "modern"), path)
+            self.assertTrue(path.read_bytes().endswith(b"%%EOF\n"))
+        self.assertEqual(FakeHTML.renders, 3)
+
+    def test_view_downloads_the_cached_file(self):
+        self.client.force_login(self.user)
+        url = reverse("resumes:resume_pdf", args=[self.resume.id])
+        for _ in range(2):
+            response = self.client.get(url, {"template": "modern"})
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            self.assertIn('attachment; filename="Ada Lovelace.pdf"', response["Content-Disposition"])
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF-"))
+            response.close()
+        self.assertEqual(FakeHTML.renders, 1)
+
+
+class PdfJobQueueTests(PdfTestMixin, TestCase):
+
+    def enqueue(self, template="modern"):
+        return enqueue_pdf_job(self.user, self.resume, template)
+
+    def test_claims_oldest_first_with_skip_locked(self):
+        first, second = self.enqueue(), self.enqueue("simple")
+        with mock.patch.object(
+            PdfJob.objects, "select_for_update", wraps=PdfJob.objects.select_for_update
+        ) as select_for_update:
+            claimed = claim_next_job()
+        select_for_update.assert_called_once_with(skip_locked=True)
+        self.assertEqual((claimed.id, claimed.status), (first.id, PdfJob.STATUS_RUNNING))
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(claim_next_job().id, second.id)
+        self.assertIsNone(claim_next_job())
+
+    def test_a_job_claimed_by_another_worker_meanwhile_is_not_taken(self):
+        job = self.enqueue()
+        first = QuerySet.first
+
+        def lose_the_race(queryset):
+            found = first(queryset)
+            PdfJob.objects.filter(pk=job.pk).update(status=PdfJob.STATUS_RUNNING)
+            return found
+
+        with mock.patch.object(QuerySet, "first", lose_the_race):
+            self.assertIsNone(claim_next_job())
+
+    def test_run_job_stores_the_file(self):
+        self.enqueue()
+        job = run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.STATUS_DONE)
+        self.assertEqual(job.file_path, str(pdf.pdf_cache_path(self.resume, "modern")))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_render_errors_mark_the_job_failed(self):
+        self.enqueue()
+        with mock.patch("resumes.pdf_jobs.render_resume_pdf", side_effect=OSError("no fonts")), \
+                self.assertLogs("resumes.pdf_jobs", "ERROR"):
+            job = run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (PdfJob.STATUS_FAILED, "no fonts"))
+
+    def test_jobs_of_a_dead_worker_are_requeued(self):
+        stale, fresh = self.enqueue(), self.enqueue("simple")
+        PdfJob.objects.filter(pk=stale.pk).update(
+            status=PdfJob.STATUS_RUNNING, started_at=timezone.now() - timezone.timedelta(minutes=10)
+        )
+        PdfJob.objects.filter(pk=fresh.pk).update(status=PdfJob.STATUS_RUNNING, started_at=timezone.now())
+
+        self.assertEqual(requeue_stale_jobs(older_than=300), 1)
+        self.assertEqual(claim_next_job().id, stale.id)
+
+    def test_already_rendered_pdfs_skip_the_queue(self):
+        pdf.render_resume_pdf(self.resume, "modern")
+        job = self.enqueue()
+        self.assertEqual(job.status, PdfJob.STATUS_DONE)
+        self.assertIsNone(claim_next_job())
+
+
+class PdfJobViewTests(PdfTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def create(self, **data):
+        return self.client.post(
+            reverse("resumes:pdf_job_create"),
+            json.dumps({"resume_id": self.resume.id, **data}),
+            content_type="application/json",
+        )
+
+    def test_create_poll_and_download(self):
+        response = self.create(template="modern")
+        self.assertEqual(response.status_code, 202)
+        payload = response.json()
+        self.assertEqual(payload["status"], PdfJob.STATUS_QUEUED)
+        self.assertNotIn("download_url", payload)
+
+        run_job(claim_next_job())
+        payload = self.client.get(payload["status_url"]).json()
+        self.assertEqual(payload["status"], PdfJob.STATUS_DONE)
+
+        download = self.client.get(payload["download_url"])
+        self.assertEqual(download["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(download.streaming_content).startswith(b"%PDF-"))
+        download.close()
+
+    def test_failed_jobs_report_a_generic_error(self):
+        status_url = self.create(template="modern").json()["status_url"]
+        with mock.patch("resumes.pdf_jobs.render_resume_pdf", side_effect=OSError("/srv/secret")), \
+                self.assertLogs("resumes.pdf_jobs", "ERROR"):
+            run_job(claim_next_job())
+        payload = self.client.get(status_url).json()
+        self.assertEqual((payload["status"], payload["error"]), (PdfJob.STATUS_FAILED, "PDF rendering failed"))
+
+    def test_pruned_files_answer_410(self):
+        payload = self.create(template="modern").json()
+        job = run_job(claim_next_job())
+        os.unlink(job.file_path)
+        response = self.client.get(reverse("resumes:pdf_job_download", args=[payload["job_id"]]))
+        self.assertEqual(response.status_code, 410)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.create(template="nope").status_code, 400)
+        self.assertEqual(self.create(template="executive").status_code, 403)
+        response = self.client.post(
+            reverse("resumes:pdf_job_create"), "{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_users_cannot_see_a_job(self):
+        payload = self.create(template="modern").json()
+        self.client.force_login(User.objects.create_user("eve", "eve@example.com", "pw"))
+        self.assertEqual(self.client.get(payload["status_url"]).status_code, 404)
+
+
+class RenderCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "pw")
+        self.resume = Resume.objects.create(user=self.user, full_name="Ada Lovelace")
+        render_cache.clear()
+        self.addCleanup(render_cache.clear)
+
+    def cached_keys(self):
+        return list(render_cache._entries)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = RenderCache(max_entries=2)
+        cache.set((1, "t", "modern", False), "a")
+        cache.set((2, "t", "modern", False), "b")
+        cache.get((1, "t", "modern", False))
+        cache.set((3, "t", "modern", False), "c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get((2, "t", "modern", False)))
+        self.assertEqual(cache.get((1, "t", "modern", False)), "a")
+        self.assertNotIn(2, cache._keys_by_resume)
+
+    def test_second_render_is_served_from_memory(self):
+        html = render_resume(self.resume, "modern", False)
+        with mock.patch("resumes.render_cache.resolve") as resolve:
+            self.assertEqual(render_resume(self.resume, "modern", False), html)
+        resolve.assert_not_called()
+
+    def test_key_covers_version_template_and_visibility(self):
+        render_resume(self.resume, "modern", False)
+        render_resume(self.resume, "simple", False)
+        render_resume(self.resume, "modern", True)
+        self.assertEqual(len(render_cache), 3)
+
+        # A newer updated_at misses even if the receiver never ran
+        stale = self.resume.updated_at
+        self.resume.updated_at = stale + timezone.timedelta(seconds=1)
+        render_resume(self.resume, "modern", False)
+        self.assertEqual(len(render_cache), 4)
+        self.assertEqual({key[1] for key in self.cached_keys()}, {stale, self.resume.updated_at})
+
+    def test_save_invalidates_the_resume(self):
+        other = Resume.objects.create(user=self.user, full_name="Grace Hopper")
+        render_resume(self.resume, "modern", False)
+        render_resume(other, "modern", False)
+
+        self.resume.full_name = "Ada King"
+        self.resume.save()
+        self.assertEqual([key[0] for key in self.cached_keys()], [other.id])
+        self.assertIn("Ada King", render_resume(self.resume, "modern", False))
+
+    def test_delete_invalidates_the_resume(self):
+        render_resume(self.resume, "modern", False)
+        self.resume.delete()
+        self.assertEqual(len(render_cache), 0)
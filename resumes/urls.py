@@ -9,6 +9,7 @@ urlpatterns = [
     path("preview/<int:id>/", views.resume_preview, name="resume_preview"),
    
     path("public/<int:id>/", views.resume_public, name="resume_public"),
+    path("templates/stats/", views.template_stats, name="template_stats"),
     path("my/", views.my_resumes, name="my_resumes"),
     path("save-field/<int:id>/", views.save_resume_field, name="save_resume_field"),
 
@@ -18,5 +19,9 @@ urlpatterns = [
     path("checkout/", views.create_checkout_session, name="checkout"),
     path("payment-success/", views.payment_success, name="payment_success"),
     path("paid-print/<int:id>/", views.paid_print, name="paid_print"),
+    path("pdf/<int:id>/", views.resume_pdf, name="resume_pdf"),
+    path("pdf/jobs/", views.pdf_job_create, name="pdf_job_create"),
+    path("pdf/jobs/<int:job_id>/", views.pdf_job_status, name="pdf_job_status"),
+    path("pdf/jobs/<int:job_id>/download/", views.pdf_job_download, name="pdf_job_download"),
     
 ]
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import re
 
@@ -5,60 +6,71 @@ from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.urls import reverse
-from django.views.decorators.http import require_POST
-
-from .models import Resume
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+
+from ai_resume.completion_cache import get_completion, normalize_text
+from ai_resume.providers import get_provider
+from ai_resume.ratelimit import rate_limit
+from ai_resume.service import (
+    DEFAULT_PROMPT,
+    EMPTY_TEXT,
+    PROMPTS,
+    cache_key,
+    complete_by,
+    deadline,
+    degraded,
+)
+
+from .models import PdfJob, Resume
 from .forms import ResumeForm
+from .pdf import render_resume_pdf
+from .pdf_jobs import enqueue_pdf_job
+from .registry import (
+    FREE,
+    PREMIUM,
+    get_resume_template,
+    render_timings,
+    resolve,
+    templates_by_tier,
+)
+from .render_cache import get_rendered, render_resume
 
 
 @require_POST
 @login_required
+@rate_limit(scope="ai")
 def improve(request):
     try:
         data = json.loads(request.body)
     except Exception:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    text = (data.get("text") or "").strip()
+    text = normalize_text(data.get("text") or "")
     field = data.get("field", "general")
 
-    # Allow empty input (skills / education start empty)
     if not text:
-        text = "Generate professional resume content."
+        text = EMPTY_TEXT
 
-    PROMPTS = {
-        "skills": (
-            "Generate a clean ATS-friendly list of professional resume skills. "
-            "Each skill must be on a new line."
-        ),
-        "education": (
-            "Rewrite the education section in a professional resume format. "
-            "Each entry should be on a new line."
-        ),
-        "experience": (
-            "Rewrite work experience using strong action verbs and achievements."
-        ),
-        "summary": (
-            "Write a concise professional resume summary (3–4 lines)."
-        ),
-    }
+    system_prompt = PROMPTS.get(field, DEFAULT_PROMPT)
 
-    system_prompt = PROMPTS.get(
-        field,
-        "Rewrite the resume content to be professional and ATS-friendly."
-    )
+    provider = get_provider()
+    key = cache_key(provider, field, text, system_prompt)
+    cached = get_completion(key)
+    if cached is not None:
+        return JsonResponse({"result": cached, "cached": True})
 
     try:
-        result = ai_improve_text(
-            text=text,
-            system_prompt=system_prompt
-        )
+        result = complete_by(deadline(), provider, key, field, system_prompt, text)
         return JsonResponse({"result": result})
 
-    except Exception:
-        return JsonResponse({"error": "AI failed"}, status=500)
+    except Exception as e:
+        return JsonResponse(degraded(field, text, e))
 
 
 
@@ -74,13 +86,6 @@ def get_stripe():
     return stripe
 
 
-# ===============================
-# TEMPLATES
-# ===============================
-FREE_TEMPLATES = ["modern", "professional", "simple"]
-PREMIUM_TEMPLATES = ["creative", "executive", "minimalist"]
-
-
 # ==================================================
 # STRIPE CHECKOUT
 # ==================================================
@@ -138,42 +143,115 @@ from .models import Resume
 
 @login_required
 def paid_print(request, id):
+    # Premium purchases land here after Stripe; the PDF itself is built
+    # server-side by resume_pdf.
+    template_key = request.GET.get("template", "")
+    url = reverse("resumes:resume_pdf", args=[id])
+    if template_key:
+        url = f"{url}?{urlencode({'template': template_key})}"
+    return redirect(url)
+
+
+# ==================================================
+# DOWNLOAD PDF (WEASYPRINT, CACHED ON DISK)
+# ==================================================
+@login_required
+def resume_pdf(request, id):
     resume = get_object_or_404(Resume, id=id)
 
     # Get selected template (from URL or saved resume)
     template_key = request.GET.get("template", resume.template)
+    resume_template = get_resume_template(template_key)
+
+    # Safety fallback
+    if resume_template is None:
+        return redirect("resumes:resume_preview", id=id)
+
+    # 🔒 Block premium templates if not paid
+    if resume_template.is_premium:
+        if not request.session.get("premium_unlocked"):
+            return redirect("resumes:resume_preview", id=id)
 
-    # All available templates
-    template_map = {
-        "modern": "modern.html",
-        "professional": "professional.html",
-        "simple": "simple.html",
-        "creative": "creative.html",
-        "executive": "executive.html",
-        "minimalist": "minimalist.html",
+    path = render_resume_pdf(
+        resume,
+        template_key,
+        base_url=request.build_absolute_uri("/"),
+    )
+
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=f"{resume.full_name or 'resume'}.pdf",
+        content_type="application/pdf",
+    )
+
+
+# ==================================================
+# PDF JOBS (RENDERED BY manage.py pdf_worker)
+# ==================================================
+def _pdf_job_payload(job):
+    payload = {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": reverse("resumes:pdf_job_status", args=[job.id]),
     }
+    if job.status == PdfJob.STATUS_DONE:
+        payload["download_url"] = reverse("resumes:pdf_job_download", args=[job.id])
+    if job.status == PdfJob.STATUS_FAILED:
+        payload["error"] = "PDF rendering failed"
+    return payload
+
+
+@require_POST
+@login_required
+def pdf_job_create(request):
+    try:
+        data = json.loads(request.body)
+    except Exception:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    # Premium templates list
-    premium_templates = ["creative", "executive", "minimalist"]
+    resume = get_object_or_404(Resume, id=data.get("resume_id"))
+    template_key = data.get("template") or resume.template
+
+    resume_template = get_resume_template(template_key)
+    if resume_template is None:
+        return JsonResponse({"error": "Unknown template"}, status=400)
 
     # 🔒 Block premium templates if not paid
-    if template_key in premium_templates:
+    if resume_template.is_premium:
         if not request.session.get("premium_unlocked"):
-            return redirect("resumes:resume_preview", id=id)
+            return JsonResponse({"error": "Premium template locked"}, status=403)
 
-    template_file = template_map.get(template_key)
+    job = enqueue_pdf_job(request.user, resume, template_key)
+    return JsonResponse(_pdf_job_payload(job), status=202)
 
-    # Safety fallback
-    if not template_file:
-        return redirect("resumes:resume_preview", id=id)
 
-    return render(
-        request,
-        "resumes/paid_print.html",
-        {
-            "resume": resume,
-            "template_file": template_file,
-        }
+@login_required
+def pdf_job_status(request, job_id):
+    job = get_object_or_404(PdfJob, id=job_id, user=request.user)
+    return JsonResponse(_pdf_job_payload(job))
+
+
+@login_required
+def pdf_job_download(request, job_id):
+    job = get_object_or_404(
+        PdfJob.objects.select_related("resume"),
+        id=job_id,
+        user=request.user,
+        status=PdfJob.STATUS_DONE,
+    )
+
+    try:
+        pdf_file = open(job.file_path, "rb")
+    except FileNotFoundError:
+        # Pruned after the resume changed; the client should enqueue again
+        return JsonResponse({"error": "PDF expired"}, status=410)
+
+    return FileResponse(
+        pdf_file,
+        as_attachment=True,
+        filename=f"{job.resume.full_name or 'resume'}.pdf",
+        content_type="application/pdf",
     )
 
 
@@ -234,30 +312,110 @@ def save_resume_field(request, id):
 
         resume.template = data.get("template", resume.template)
         resume.color = data.get("color", resume.color)
-        resume.save()
+        resume.save(update_fields=["template", "color", "updated_at"])
 
         return JsonResponse({"status": "ok"})
 
+# ==================================================
+# CONDITIONAL GET (ETag / Last-Modified)
+# ==================================================
+def _resume_version(request, id):
+    # Shared by the ETag/Last-Modified checks and the view body, so a 304
+    # costs a single primary-key lookup of three narrow columns.
+    if not hasattr(request, "_resume_version"):
+        request._resume_version = (
+            Resume.objects.filter(id=id)
+            .values_list("updated_at", "template", "color")
+            .first()
+        )
+    return request._resume_version
+
+
+def _public_template(request, saved_template):
+    template = request.GET.get("template", saved_template).strip().lower()
+    return resolve(template).key
+
+
+def _resume_etag(id, updated_at, template, color, *extra):
+    parts = [id, updated_at.isoformat(), template, color, *extra]
+    return hashlib.sha256(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def resume_last_modified(request, id):
+    version = _resume_version(request, id)
+    return version[0] if version else None
+
+
+def resume_public_etag(request, id):
+    version = _resume_version(request, id)
+    if version is None:
+        return None
+
+    updated_at, saved_template, color = version
+    return _resume_etag(id, updated_at, _public_template(request, saved_template), color)
+
+
+def _preview_template(request, saved_template):
+    return resolve(request.GET.get("template") or saved_template).key
+
+
+def resume_preview_last_modified(request, id):
+    version = _resume_version(request, id)
+    if version is None:
+        return None
+
+    updated_at, saved_template, _color = version
+    if _preview_template(request, saved_template) != saved_template:
+        # The view persists the newly picked template; never skip it with a 304
+        return None
+    return updated_at
+
+
+def resume_preview_etag(request, id):
+    version = _resume_version(request, id)
+    if version is None:
+        return None
+
+    updated_at, saved_template, color = version
+    active = _preview_template(request, saved_template)
+    if active != saved_template:
+        return None
+
+    # The preview page embeds the viewer's nav and CSRF token; any masked
+    # token is valid while the CSRF cookie secret is unchanged.
+    return _resume_etag(
+        id,
+        updated_at,
+        active,
+        color,
+        request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    )
+
+
 # ==================================================
 # PREVIEW RESUME
 # ==================================================
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=resume_preview_etag, last_modified_func=resume_preview_last_modified)
 def resume_preview(request, id):
-    resume = get_object_or_404(Resume, id=id)
+    # Rich-text columns are only needed when the render cache misses
+    resume = get_object_or_404(
+        Resume.objects.only("id", "template", "updated_at"),
+        id=id,
+    )
 
-    active = request.GET.get("template") or resume.template or "modern"
+    active = _preview_template(request, resume.template)
 
     if active != resume.template:
         resume.template = active
-        resume.save(update_fields=["template"])
-
-    template_map = {
-        "modern": "modern.html",
-        "professional": "professional.html",
-        "simple": "simple.html",
-        "creative": "creative.html",
-        "executive": "executive.html",
-        "minimalist": "minimalist.html",
-    }
+        # Bump updated_at too so cached pages and validators see the change
+        resume.save(update_fields=["template", "updated_at"])
+
+    resume_html = get_rendered(resume.id, resume.updated_at, active, False)
+    if resume_html is None:
+        resume = get_object_or_404(Resume, id=id)
+        resume_html = render_resume(resume, active, is_public=False)
 
     return render(
         request,
@@ -265,15 +423,12 @@ def resume_preview(request, id):
         {
             "resume": resume,
             "active": active,
-            "active_template": template_map.get(active, "modern.html"),
-            "free_templates": FREE_TEMPLATES,
-            "premium_templates": PREMIUM_TEMPLATES,
+            "resume_html": mark_safe(resume_html),
+            "active_template": resolve(active),
+            "free_templates": templates_by_tier(FREE),
+            "premium_templates": templates_by_tier(PREMIUM),
         },
     )
-# ==================================================
-# DOWNLOAD PDF (WEASYPRINT – RENDER SAFE) ✅
-
-
 # ==================================================
 # RESUME CUSTOMIZE
 # ==================================================
@@ -299,32 +454,30 @@ def resume_customize(request, id):
 # ==================================================
 # PUBLIC RESUME VIEW
 # ==================================================
+@cache_control(no_cache=True)
+@condition(etag_func=resume_public_etag, last_modified_func=resume_last_modified)
 def resume_public(request, id):
-    resume = get_object_or_404(Resume, id=id)
+    # One indexed lookup decides whether the cached HTML is still current
+    version = _resume_version(request, id)
+    if version is None:
+        raise Http404("Resume not found")
 
-    template_map = {
-        "modern": "modern.html",
-        "professional": "professional.html",
-        "simple": "simple.html",
-        "creative": "creative.html",
-        "executive": "executive.html",
-        "minimalist": "minimalist.html",
-    }
+    updated_at, saved_template, _color = version
 
     # ✅ READ template from query string
-    template = request.GET.get("template", resume.template)
-    template = template.strip().lower()
+    template = _public_template(request, saved_template)
 
-    template_file = template_map.get(template, "modern.html")
+    html = get_rendered(id, updated_at, template, True)
+    if html is None:
+        resume = get_object_or_404(Resume, id=id)
+        html = render_resume(resume, template, is_public=True)
 
-    return render(
-        request,
-        template_file,
-        {
-            "resume": resume,
-            "is_public": True,
-        },
-    )
+    return HttpResponse(html)
+
+
+@staff_member_required
+def template_stats(request):
+    return JsonResponse(render_timings())
 
 
 # ==================================================
@@ -332,8 +485,26 @@ def resume_public(request, id):
 # ==================================================
 @login_required
 def my_resumes(request):
-    resumes = Resume.objects.filter(user=request.user).order_by("-id")
-    return render(request, "resumes/list.html", {
-        "resumes": resumes
-    })
-
+    # Keyset pagination: each page is one range scan of the
+    # (user, -id) index, however many resumes came before it.
+    resumes = (
+        Resume.objects.filter(user=request.user)
+        .only("id", "full_name", "email")
+        .order_by("-id")
+    )
+    after = request.GET.get("after", "")
+    if after.isdigit():
+        resumes = resumes.filter(id__lt=int(after))
+
+    page_size = settings.RESUME_LIST_PAGE_SIZE
+    page = list(resumes[:page_size + 1])
+    next_cursor = page[page_size - 1].id if len(page) > page_size else None
+    page = page[:page_size]
+
+    context = {"resumes": page, "next_cursor": next_cursor}
+    if request.GET.get("partial"):
+        # "Load more" fetches just the next cards
+        response = render(request, "resumes/_resume_cards.html", context)
+        response["X-Next-Cursor"] = next_cursor or ""
+        return response
+    return render(request, "resumes/list.html", context)